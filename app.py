@@ -9,27 +9,233 @@ EcoScore v4:
 - Subscore combinado para evitar multicolinearidade
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response
 import requests
 import os
+import json
 from dotenv import load_dotenv
 import math
+import time
+import threading
 import urllib3
+import click
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-# Desabilitar aviso SSL (necessário para desenvolvimento local)
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from cache import (GeocodeCache, RouteCache, TwoTierCache, normalize_address,
+                   departure_slot, parse_freshness_windows)
+from corridors import (CorridorIndex, CorridorLog, learn_corridors, read_corridors_file,
+                       next_departures)
+from google_client import GoogleMapsClient
+import ecoscore_engine
+import emissions
+from emissions import emission_factor
+from elevation import ElevationService, GoogleElevationProvider, SRTMTileProvider
+from road_analysis import analyze_steps
+from singleflight import SingleFlight, AsyncSingleFlight
+import metrics
+import polyline
+import profiling
+import responses
+import scoring
+from ratelimit import (RateLimiter, RateLimitExceeded, LocalBucketStore,
+                       FileBucketStore, RedisBucketStore)
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
+# Verificação TLS ligada por padrão; desligar apenas em desenvolvimento local
+# (ex.: proxy corporativo com certificado próprio)
+GOOGLE_MAPS_VERIFY_SSL = os.getenv('GOOGLE_MAPS_VERIFY_SSL', 'true').lower() not in ('0', 'false', 'no')
+if not GOOGLE_MAPS_VERIFY_SSL:
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
 app = Flask(__name__)
 
 # Configuração da API Google Maps
 GOOGLE_MAPS_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY', '')
 
+def build_rate_limiter():
+    """
+    Cria o limitador de taxa das APIs do Google conforme RATE_LIMIT_BACKEND
+    
+    Returns:
+        RateLimiter: Limitador configurado ou None ('none', padrão)
+    """
+    backend = os.getenv('RATE_LIMIT_BACKEND', 'none').lower()
+    
+    if backend == 'local':
+        store = LocalBucketStore()
+    elif backend == 'file':
+        store = FileBucketStore(os.getenv('RATE_LIMIT_FILE', '/tmp/ecorouter_ratelimit'))
+    elif backend == 'redis':
+        store = RedisBucketStore(os.getenv('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0'))
+    else:
+        return None
+    
+    budgets = {}
+    for api in ('geocode', 'directions', 'elevation', 'distancematrix'):
+        prefix = f'RATE_LIMIT_{api.upper()}'
+        # Distance Matrix: até 100 elementos por requisição (Google: 1000 elementos/s)
+        rate = float(os.getenv(f'{prefix}_QPS', 10 if api == 'distancematrix' else 50))
+        budgets[api] = {
+            'rate': rate,
+            'burst': float(os.getenv(f'{prefix}_BURST', rate)),
+            'daily_quota': int(os.getenv(f'{prefix}_DAILY', 0))
+        }
+    
+    return RateLimiter(store, budgets, max_wait=float(os.getenv('RATE_LIMIT_MAX_WAIT', 2.0)))
+
+# Cliente HTTP compartilhado (pool keep-alive + retry com backoff + limite de taxa)
+maps_client = GoogleMapsClient(
+    api_key=GOOGLE_MAPS_API_KEY,
+    base_url=os.getenv('GOOGLE_MAPS_BASE_URL', 'https://maps.googleapis.com/maps/api'),
+    pool_size=int(os.getenv('GOOGLE_MAPS_POOL_SIZE', 20)),
+    max_retries=int(os.getenv('GOOGLE_MAPS_MAX_RETRIES', 3)),
+    timeout=float(os.getenv('GOOGLE_MAPS_TIMEOUT', 10)),
+    verify=GOOGLE_MAPS_VERIFY_SSL,
+    async_pool_size=int(os.getenv('GOOGLE_MAPS_ASYNC_POOL_SIZE', 100)),
+    rate_limiter=build_rate_limiter()
+)
+
+# Cache de geocodificação (LRU em memória + SQLite em disco)
+# GEOCODE_CACHE_PATH vazio desativa o nível em disco
+geocode_cache = GeocodeCache(
+    path=os.getenv('GEOCODE_CACHE_PATH', 'ecorouter_cache.sqlite3'),
+    ttl=int(os.getenv('GEOCODE_CACHE_TTL', 30 * 24 * 3600)),
+    maxsize=int(os.getenv('GEOCODE_CACHE_SIZE', 4096))
+)
+
+# Cache de rotas (payload bruto da Directions API por corredor + faixa horária)
+# Rotas com tráfego são servidas "stale" até ROUTE_CACHE_MAX_STALE enquanto
+# uma atualização roda em segundo plano
+route_cache = RouteCache(
+    path=os.getenv('ROUTE_CACHE_PATH', 'ecorouter_cache.sqlite3'),
+    ttl=int(os.getenv('ROUTE_CACHE_TTL', 6 * 3600)),
+    traffic_ttl=int(os.getenv('ROUTE_CACHE_TRAFFIC_TTL', 300)),
+    grid_meters=float(os.getenv('ROUTE_CACHE_GRID_METERS', 50)),
+    bucket_minutes=int(os.getenv('ROUTE_CACHE_BUCKET_MINUTES', 30)),
+    maxsize=int(os.getenv('ROUTE_CACHE_SIZE', 1024)),
+    max_stale=int(os.getenv('ROUTE_CACHE_MAX_STALE', 1800)),
+    freshness_windows=parse_freshness_windows(os.getenv('ROUTE_CACHE_FRESHNESS', ''))
+)
+
+# Índice pré-calculado dos corredores mais pedidos (flask --app app precompute-corridors)
+corridor_index = CorridorIndex(
+    path=os.getenv('CORRIDOR_INDEX_PATH', 'ecorouter_cache.sqlite3'),
+    ttl=int(os.getenv('CORRIDOR_INDEX_TTL', 24 * 3600)),
+    bucket_minutes=route_cache.bucket_minutes
+)
+# Registro JSONL das requisições de /calculate, de onde os corredores são aprendidos
+corridor_log = CorridorLog(os.getenv('CORRIDOR_LOG_PATH', ''))
+CORRIDOR_DEPARTURES = os.getenv('CORRIDOR_DEPARTURES', '06:30-09:30,16:30-19:30')
+CORRIDOR_TOP = int(os.getenv('CORRIDOR_TOP', 200))
+
+# Respostas de /calculate já serializadas e comprimidas (só em memória), para
+# repetições do mesmo corredor/faixa horária; RESPONSE_CACHE_TTL=0 desativa
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 60))
+response_cache = TwoTierCache(
+    path=None,
+    table='responses',
+    ttl=max(RESPONSE_CACHE_TTL, 1),
+    maxsize=int(os.getenv('RESPONSE_CACHE_SIZE', 2048))
+)
+# Tolerância (metros) da polyline simplificada do modo compacto
+COMPACT_POLYLINE_TOLERANCE = float(os.getenv('COMPACT_POLYLINE_TOLERANCE', 15))
+
+# Provedor de elevação (desligado por padrão)
+ELEVATION_PROVIDER = os.getenv('ELEVATION_PROVIDER', 'none').lower()
+
+def build_elevation_service():
+    """
+    Cria o serviço de elevação conforme ELEVATION_PROVIDER
+    
+    Returns:
+        ElevationService: Serviço configurado ou None ('none', padrão)
+    """
+    if ELEVATION_PROVIDER == 'google':
+        provider = GoogleElevationProvider(maps_client)
+    elif ELEVATION_PROVIDER == 'srtm':
+        provider = SRTMTileProvider(os.getenv('ELEVATION_SRTM_DIR', 'srtm'))
+    else:
+        return None
+    
+    return ElevationService(provider, max_samples=int(os.getenv('ELEVATION_SAMPLES', 64)))
+
+# Ganho de elevação das rotas: criado no primeiro uso (ou no aquecimento do worker)
+_elevation_service = None
+_elevation_lock = threading.Lock()
+
+def get_elevation_service():
+    """
+    Returns:
+        ElevationService: Serviço do processo atual ou None (ELEVATION_PROVIDER=none)
+    """
+    global _elevation_service
+    if _elevation_service is None and ELEVATION_PROVIDER != 'none':
+        with _elevation_lock:
+            if _elevation_service is None:
+                _elevation_service = build_elevation_service()
+    return _elevation_service
+
+# Coalescência de chamadas idênticas em andamento (threads e asyncio)
+upstream_flight = SingleFlight()
+async_upstream_flight = AsyncSingleFlight()
+
+# Pool de threads compartilhado para chamadas concorrentes ao Google Maps
+UPSTREAM_WORKERS = int(os.getenv('UPSTREAM_WORKERS', 8))
+upstream_executor = ThreadPoolExecutor(max_workers=UPSTREAM_WORKERS, thread_name_prefix='upstream')
+
+# Pool separado para atualizar rotas stale sem bloquear as requisições
+ROUTE_REFRESH_WORKERS = int(os.getenv('ROUTE_REFRESH_WORKERS', 2))
+refresh_executor = ThreadPoolExecutor(max_workers=ROUTE_REFRESH_WORKERS, thread_name_prefix='route-refresh')
+_refresh_lock = threading.Lock()
+_refreshing = set()
+refresh_stats = {'scheduled': 0, 'completed': 0, 'failed': 0}
+
+# Arquivo JSONL opcional com as respostas da Directions API (para reprocessamento offline)
+DIRECTIONS_ARCHIVE_PATH = os.getenv('DIRECTIONS_ARCHIVE_PATH', '')
+_archive_lock = threading.Lock()
+
+# Cabeçalho Server-Timing com as etapas de cada requisição (desligado por padrão)
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'false').lower() in ('1', 'true', 'yes')
+
+# Limites do endpoint /calculate/batch
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', 500))
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 8))
+
+# Configuração versionada do EcoScore: pesos e faixas de emissão (ver scoring.py)
+SCORING_CONFIG = scoring.load_config(os.getenv('SCORING_CONFIG_PATH', ''))
+SCORING_VERSION = SCORING_CONFIG['version']
+emissions.configure_bands(SCORING_CONFIG['ecoscore_bands'], SCORING_CONFIG['band_factors'])
+
+# Perfis de combustível adicionais (JSON) e limite de POST /emissions/bulk
+if os.getenv('FUEL_PROFILES_PATH'):
+    emissions.load_fuel_profiles(os.getenv('FUEL_PROFILES_PATH'))
+BULK_MAX_ROWS = int(os.getenv('BULK_MAX_ROWS', 1000000))
+
+# Máximo de paradas intermediárias por rota (a Directions API aceita até 25)
+MAX_WAYPOINTS = int(os.getenv('MAX_WAYPOINTS', 8))
+
+# Limites do endpoint /calculate/matrix (muitas origens × muitos destinos)
+MATRIX_MAX_ELEMENTS = int(os.getenv('MATRIX_MAX_ELEMENTS', 2500))
+MATRIX_TOP_K = int(os.getenv('MATRIX_TOP_K', 3))
+MATRIX_CONCURRENCY = int(os.getenv('MATRIX_CONCURRENCY', 8))
+
+# Limites da Distance Matrix API por requisição
+MATRIX_TILE_SIDE = 25        # Origens ou destinos
+MATRIX_TILE_ELEMENTS = 100   # Origens × destinos
+
+# Limites do endpoint /calculate/sweep (melhor horário de partida)
+SWEEP_MAX_POINTS = int(os.getenv('SWEEP_MAX_POINTS', 24))
+SWEEP_CONCURRENCY = int(os.getenv('SWEEP_CONCURRENCY', 8))
+SWEEP_DEADLINE = float(os.getenv('SWEEP_DEADLINE', 8))
+
+@metrics.timed('geocode')
 def geocode_address(address):
     """
     Geocodifica endereço usando Google Maps Geocoding API
+    Consulta o cache antes de chamar a API
     
     Args:
         address (str): Endereço para geocodificar
@@ -40,123 +246,254 @@ def geocode_address(address):
     if not GOOGLE_MAPS_API_KEY:
         raise ValueError("GOOGLE_MAPS_API_KEY não configurada")
     
+    cached = geocode_cache.get(address)
+    if cached is not None:
+        return cached
+    
+    # Requisições simultâneas do mesmo endereço compartilham uma chamada
+    return upstream_flight.do(
+        geocode_flight_key(address), _geocode_uncached, address
+    )
+
+def geocode_flight_key(address):
+    return f"geocode:{normalize_address(address)}"
+
+def _geocode_uncached(address):
     try:
-        url = "https://maps.googleapis.com/maps/api/geocode/json"
         params = {
-            'address': address,
-            'key': GOOGLE_MAPS_API_KEY
+            'address': address
         }
         
-        response = requests.get(url, params=params, timeout=10, verify=False)
-        response.raise_for_status()
-        data = response.json()
-        
-        if data.get('status') != 'OK' or not data.get('results'):
-            raise ValueError(f"Endereço não encontrado: {address}")
+        data = maps_client.get_json('geocode', params)
         
-        location = data['results'][0]['geometry']['location']
-        formatted_address = data['results'][0]['formatted_address']
+        result = parse_geocode_response(address, data)
+        geocode_cache.set(address, result)
         
-        return {
-            'lat': location['lat'],
-            'lng': location['lng'],
-            'address': formatted_address
-        }
+        return result
     
     except requests.exceptions.RequestException as e:
         raise ValueError(f"Erro ao geocodificar {address}: {str(e)}")
 
-def calculate_ecoscore(route, all_routes_data):
+def parse_geocode_response(address, data):
     """
-    Calcula EcoScore v4 para uma rota (0-100)
+    Extrai coordenadas da resposta da Geocoding API
     
-    EcoScore v4 = 0.35 * fluidez + 0.20 * elevacao + 0.25 * distancia + 0.15 * via + 0.05
+    Args:
+        address (str): Endereço consultado
+        data (dict): JSON da Geocoding API
+        
+    Returns:
+        dict: Coordenadas lat/lng e endereço formatado
+    """
+    if data.get('status') != 'OK' or not data.get('results'):
+        raise ValueError(f"Endereço não encontrado: {address}")
+    
+    location = data['results'][0]['geometry']['location']
+    formatted_address = data['results'][0]['formatted_address']
+    
+    return {
+        'lat': location['lat'],
+        'lng': location['lng'],
+        'address': formatted_address
+    }
+
+def geocode_many(addresses):
+    """
+    Geocodifica vários endereços em paralelo
     
     Args:
-        route: Dados da rota do Google Maps
-        all_routes_data: Lista com dados de todas as rotas (para normalização dinâmica)
+        addresses (list): Endereços para geocodificar
         
     Returns:
-        dict: EcoScore e scores individuais
+        list: Coordenadas na mesma ordem dos endereços
+    """
+    if len(addresses) < 2:
+        return [geocode_address(address) for address in addresses]
+    
+    # Cada thread recebe uma cópia do contexto (etapas medidas para o Server-Timing)
+    futures = [
+        upstream_executor.submit(contextvars.copy_context().run, geocode_address, address)
+        for address in addresses
+    ]
+    
+    # result() propaga o ValueError do primeiro endereço que falhar
+    return [future.result() for future in futures]
+
+# Pesos do EcoScore v4 (SCORING_CONFIG_PATH; padrão em scoring.DEFAULT_CONFIG)
+ECOSCORE_WEIGHTS = SCORING_CONFIG['weights']
+
+# Pesos do subscore de Fluidez: (Tempo × 0.8 + Tráfego × 0.3 + Paradas × 0.2) / 1.3
+FLUIDEZ_WEIGHTS = SCORING_CONFIG['fluidez_weights']
+
+def get_elevation_gains(routes):
+    """
+    Ganho de elevação (m) de cada rota, consultado em um único lote
+    
+    Args:
+        routes: Rotas da Directions API
+        
+    Returns:
+        list: Ganho de elevação de cada rota (0 se ELEVATION_PROVIDER=none)
     """
+    service = get_elevation_service()
+    if service is None:
+        return [0] * len(routes)
     
-    # Extrair dados da rota
-    summary = route['legs'][0]
-    distance_km = summary['distance']['value'] / 1000
-    duration_min = summary['duration']['value'] / 60
-    duration_in_traffic_min = summary.get('duration_in_traffic', {}).get('value', summary['duration']['value']) / 60
+    return service.routes_gain(routes)
+
+def extract_route_factors(route, elevation_gain=None):
+    """
+    Extrai os fatores brutos de uma rota usados no EcoScore
     
-    # Estimar elevação (aproximadamente por latitude/longitude) - usar 0 por agora
-    # Em produção, usar Google Elevation API
-    elevation_gain = 0  # TODO: Integrar com Google Elevation API
+    Args:
+        route: Dados da rota do Google Maps
+        elevation_gain: Ganho de elevação já calculado (None = calcular)
+        
+    Returns:
+        dict: Distância, duração, elevação, paradas, tráfego e tipo de via
+              (somados em todas as legs) e legs (totais por trecho)
+    """
+    # Totais de todas as legs, tipos de via e paradas: uma única passada pelos steps
+    steps = analyze_steps(route)
+    duration_min = steps['duration_min']
+    duration_in_traffic_min = steps['duration_in_traffic_min']
     
-    # Estimar paradas por tipo de via (placeholder)
-    estimated_stops = estimate_stops(route)
+    # Ganho de elevação ao longo da overview_polyline
+    if elevation_gain is None:
+        elevation_gain = get_elevation_gains([route])[0]
     
     # Obter tipo de tráfego
     traffic_model = classify_traffic(duration_min, duration_in_traffic_min)
     
-    # Obter tipo de via (aproximação)
-    road_type = get_dominant_road_type(route)
-    
-    # PASSO 1: Normalizar cada fator dinamicamente (0-100)
-    score_tempo = normalize_factor(
-        duration_min,
-        [r['duration_min'] for r in all_routes_data],
-        descending=True  # Menos tempo = melhor (invertido)
-    )
-    
-    score_elevacao = 100 * math.exp(-elevation_gain / 200)
+    return {
+        'distance_km': steps['distance_km'],
+        'duration_min': duration_min,
+        'duration_in_traffic_min': duration_in_traffic_min,
+        'elevation_gain': elevation_gain,
+        'estimated_stops': steps['estimated_stops'],
+        'traffic_model': traffic_model,
+        'road_type': steps['road_type'],
+        'score_trafego': get_traffic_score(traffic_model),
+        'score_via': get_weighted_road_score(steps),
+        'legs': steps['legs'],
+        'route': route
+    }
+
+def format_ecoscore_details(factors, scores):
+    """
+    Monta o dict de detalhes do EcoScore de uma rota
     
-    score_paradas = normalize_factor(
-        estimated_stops,
-        [r['estimated_stops'] for r in all_routes_data],
-        descending=True
-    )
+    Args:
+        factors: Resultado de extract_route_factors
+        scores: EcoScore e scores individuais (não arredondados)
+        
+    Returns:
+        dict: EcoScore e scores individuais arredondados
+    """
+    return {
+        'ecoscore': round(min(scores['ecoscore'], 100), 1),  # Limitar a 100
+        'score_tempo': round(scores['score_tempo'], 1),
+        'score_elevacao': round(scores['score_elevacao'], 1),
+        'score_paradas': round(scores['score_paradas'], 1),
+        'score_trafego': round(scores['score_trafego'], 1),
+        'score_distancia': round(scores['score_distancia'], 1),
+        'score_via': round(scores['score_via'], 1),
+        'score_fluidez': round(scores['score_fluidez'], 1),
+        'distance_km': round(factors['distance_km'], 2),
+        'duration_min': round(factors['duration_min'], 1),
+        'elevation_gain': factors['elevation_gain'],
+        'estimated_stops': factors['estimated_stops'],
+        'traffic_model': factors['traffic_model'],
+        'road_type': factors['road_type']
+    }
+
+def route_factor_scores(factors, all_routes_data):
+    """
+    PASSO 1 do EcoScore: scores por fator (0-100) de uma rota, normalizados
+    dinamicamente no conjunto de rotas (não dependem dos pesos)
     
-    score_trafego = get_traffic_score(traffic_model)
+    Args:
+        factors: Resultado de extract_route_factors
+        all_routes_data: Fatores de todas as rotas (para normalização dinâmica)
+        
+    Returns:
+        dict: score_tempo, score_elevacao, score_paradas, score_trafego,
+              score_distancia e score_via (não arredondados)
+    """
+    return {
+        'score_tempo': normalize_factor(
+            factors['duration_min'],
+            [r['duration_min'] for r in all_routes_data],
+            descending=True  # Menos tempo = melhor (invertido)
+        ),
+        'score_elevacao': 100 * math.exp(-factors['elevation_gain'] / 200),
+        'score_paradas': normalize_factor(
+            factors['estimated_stops'],
+            [r['estimated_stops'] for r in all_routes_data],
+            descending=True
+        ),
+        'score_trafego': factors['score_trafego'],
+        'score_distancia': normalize_factor(
+            factors['distance_km'],
+            [r['distance_km'] for r in all_routes_data],
+            descending=True
+        ),
+        'score_via': factors['score_via']
+    }
+
+def weigh_scores(scores, weights=None, fluidez_weights=None):
+    """
+    PASSOS 2 e 3 do EcoScore: subscore de Fluidez e soma ponderada
     
-    score_distancia = normalize_factor(
-        distance_km,
-        [r['distance_km'] for r in all_routes_data],
-        descending=True
-    )
+    Parte apenas dos scores por fator: repesar um resultado armazenado não
+    reextrai nem renormaliza as rotas.
     
-    score_via = get_road_type_score(road_type)
+    Args:
+        scores: Resultado de route_factor_scores (ou ecoscore_engine.factor_scores)
+        weights: Pesos finais (padrão: ECOSCORE_WEIGHTS)
+        fluidez_weights: Pesos da fluidez (padrão: FLUIDEZ_WEIGHTS)
+        
+    Returns:
+        dict: Scores por fator, score_fluidez e ecoscore (não arredondados)
+    """
+    weights = weights or ECOSCORE_WEIGHTS
+    fluidez_weights = fluidez_weights or FLUIDEZ_WEIGHTS
     
-    # PASSO 2: Calcular subscore de Fluidez
-    # Fluidez = (Tempo × 0.8 + Tráfego × 0.3 + Paradas × 0.2) / 1.3
     score_fluidez = (
-        (score_tempo * 0.8) +
-        (score_trafego * 0.3) +
-        (score_paradas * 0.2)
-    ) / 1.3
+        (scores['score_tempo'] * fluidez_weights['tempo']) +
+        (scores['score_trafego'] * fluidez_weights['trafego']) +
+        (scores['score_paradas'] * fluidez_weights['paradas'])
+    ) / fluidez_weights['divisor']
     
-    # PASSO 3: Calcular EcoScore Final
     ecoscore = (
-        (0.35 * score_fluidez) +
-        (0.20 * score_elevacao) +
-        (0.25 * score_distancia) +
-        (0.15 * score_via) +
-        0.05  # Margem/reserva
+        (weights['fluidez'] * score_fluidez) +
+        (weights['elevacao'] * scores['score_elevacao']) +
+        (weights['distancia'] * scores['score_distancia']) +
+        (weights['via'] * scores['score_via']) +
+        weights['reserva']
     )
     
-    return {
-        'ecoscore': round(min(ecoscore, 100), 1),  # Limitar a 100
-        'score_tempo': round(score_tempo, 1),
-        'score_elevacao': round(score_elevacao, 1),
-        'score_paradas': round(score_paradas, 1),
-        'score_trafego': round(score_trafego, 1),
-        'score_distancia': round(score_distancia, 1),
-        'score_via': round(score_via, 1),
-        'score_fluidez': round(score_fluidez, 1),
-        'distance_km': round(distance_km, 2),
-        'duration_min': round(duration_min, 1),
-        'elevation_gain': elevation_gain,
-        'estimated_stops': estimated_stops,
-        'traffic_model': traffic_model,
-        'road_type': road_type
-    }
+    return dict(scores, score_fluidez=score_fluidez, ecoscore=ecoscore)
+
+def calculate_ecoscore(route, all_routes_data, weights=None, fluidez_weights=None):
+    """
+    Calcula EcoScore v4 para uma rota (0-100)
+    
+    EcoScore v4 = 0.35 * fluidez + 0.20 * elevacao + 0.25 * distancia + 0.15 * via + 0.05
+    (pesos padrão; ver SCORING_CONFIG_PATH)
+    
+    Args:
+        route: Dados da rota do Google Maps
+        all_routes_data: Lista com dados de todas as rotas (para normalização dinâmica)
+        weights: Pesos finais (padrão: ECOSCORE_WEIGHTS)
+        fluidez_weights: Pesos da fluidez (padrão: FLUIDEZ_WEIGHTS)
+        
+    Returns:
+        dict: EcoScore e scores individuais
+    """
+    factors = extract_route_factors(route)
+    scores = weigh_scores(route_factor_scores(factors, all_routes_data), weights, fluidez_weights)
+    return format_ecoscore_details(factors, scores)
 
 def normalize_factor(value, all_values, descending=False):
     """
@@ -202,14 +539,9 @@ def estimate_stops(route):
     Returns:
         int: Número estimado de paradas
     """
-    # Aproximação: usar número de steps da rota
-    # Em produção, usar dados de semáforos do Google
-    total_steps = sum(len(leg.get('steps', [])) for leg in route.get('legs', []))
-    
-    # Estimar: ~1 parada por 2-3 steps em cidade
-    estimated = total_steps // 2 if total_steps > 0 else 0
-    
-    return max(0, estimated)
+    # Manobras com parada (conversões, retornos, rotatórias) +
+    # semáforos/cruzamentos estimados por km conforme o tipo de via
+    return analyze_steps(route)['estimated_stops']
 
 def classify_traffic(duration_normal, duration_traffic):
     """
@@ -236,7 +568,7 @@ def classify_traffic(duration_normal, duration_traffic):
 
 def get_dominant_road_type(route):
     """
-    Obtém o tipo de via dominante da rota
+    Obtém o tipo de via dominante da rota (maior parte da distância)
     
     Args:
         route: Dados da rota
@@ -244,10 +576,7 @@ def get_dominant_road_type(route):
     Returns:
         str: Tipo de via ('trunk', 'primary', 'secondary', etc)
     """
-    # Buscar nas properties da rota (se disponível)
-    # Por enquanto, retornar padrão
-    # Em produção, analisar os segments da rota
-    return 'secondary'
+    return analyze_steps(route)['road_type']
 
 def get_traffic_score(traffic_model):
     """
@@ -284,7 +613,26 @@ def get_road_type_score(road_type):
     }
     return scores.get(road_type, 50)
 
-def analyze_routes(data):
+def get_weighted_road_score(steps):
+    """
+    Score de tipo de via ponderado pela distância percorrida em cada tipo
+    
+    Args:
+        steps: Resultado de analyze_steps
+        
+    Returns:
+        float: Score 0-100 (score do tipo dominante se não houver steps)
+    """
+    if not steps['road_shares']:
+        return get_road_type_score(steps['road_type'])
+    
+    return sum(
+        share * get_road_type_score(road_type)
+        for road_type, share in steps['road_shares'].items()
+    )
+
+@metrics.timed('analyze')
+def analyze_routes(data, weights=None, fluidez_weights=None, elevation_gains=None):
     """
     Analisa múltiplas rotas usando EcoScore v4
     
@@ -292,6 +640,11 @@ def analyze_routes(data):
     
     Args:
         data: Response do Google Maps Directions API
+        weights: Pesos finais (padrão: ECOSCORE_WEIGHTS)
+        fluidez_weights: Pesos da fluidez (padrão: FLUIDEZ_WEIGHTS)
+        elevation_gains: Ganho de elevação (m) de cada rota, já conhecido
+                         (None = consultar ELEVATION_PROVIDER; processamento
+                         offline passa os ganhos arquivados ou zeros)
         
     Returns:
         tuple: (rota_padrão, rota_eco, análise_dict)
@@ -300,167 +653,487 @@ def analyze_routes(data):
     if not routes:
         raise ValueError("Nenhuma rota encontrada")
     
-    # Se tiver apenas uma rota, usar a mesma para ambas
-    if len(routes) == 1:
-        route = routes[0]
-        analysis = {
+    # Uma rota só (ex.: viagens com paradas) passa pelo mesmo cálculo: os
+    # fatores normalizados ficam neutros (50) e o EcoScore reflete os fatores
+    # absolutos (elevação, tráfego, tipo de via); rank_routes a usa para ambas
+    
+    # Preparar dados para normalização (uma extração por rota,
+    # elevação de todas as rotas em um único lote)
+    if elevation_gains is None:
+        elevation_gains = get_elevation_gains(routes)
+    elif len(elevation_gains) != len(routes):
+        raise ValueError(f"elevation_gains tem {len(elevation_gains)} valores para {len(routes)} rotas")
+    routes_data = [
+        extract_route_factors(route, elevation_gain)
+        for route, elevation_gain in zip(routes, elevation_gains)
+    ]
+    
+    # Scores por fator de todas as rotas
+    # Com NumPy: uma passada vetorizada; sem NumPy: rota a rota
+    if ecoscore_engine.available():
+        all_scores = ecoscore_engine.factor_scores(routes_data)
+    else:
+        all_scores = [route_factor_scores(r, routes_data) for r in routes_data]
+    
+    entries = [
+        route_entry(index, route_data['route'], route_data, scores)
+        for index, (route_data, scores) in enumerate(zip(routes_data, all_scores))
+    ]
+    analysis = rank_routes(entries, weights, fluidez_weights)
+    
+    return routes[analysis['std_index']], routes[analysis['eco_index']], analysis
+
+# Fatores brutos guardados por rota (detalhes do EcoScore ao repesar)
+ROUTE_FACTOR_FIELDS = ('distance_km', 'duration_min', 'elevation_gain',
+                       'estimated_stops', 'traffic_model', 'road_type')
+
+def route_entry(index, route, summary, scores=None):
+    """
+    Uma rota analisada, sem o payload do Google: o suficiente para repesar
+    e montar route_data sem reextrair nem renormalizar
+    
+    Args:
+        index: Posição da rota na resposta da Directions API
+        route: Rota da Directions API
+        summary: Resultado de extract_route_factors
+        scores: Scores por fator
+        
+    Returns:
+        dict: index, summary, polyline, waypoint_order, totals, factors e scores
+    """
+    return {
+        'index': index,
+        'summary': route.get('summary', ''),
+        'polyline': route.get('overview_polyline', {}).get('points', ''),
+        'waypoint_order': route.get('waypoint_order', []),
+        'totals': route_totals(summary),
+        'factors': {key: summary[key] for key in ROUTE_FACTOR_FIELDS} if scores is not None else None,
+        'scores': scores
+    }
+
+def scoring_version(weights=None, fluidez_weights=None):
+    """
+    Versão da configuração de EcoScore correspondente a um conjunto de pesos
+    """
+    if weights in (None, ECOSCORE_WEIGHTS) and fluidez_weights in (None, FLUIDEZ_WEIGHTS):
+        return SCORING_VERSION
+    return scoring.custom_version(
+        SCORING_CONFIG, weights or ECOSCORE_WEIGHTS, fluidez_weights or FLUIDEZ_WEIGHTS
+    )
+
+def rank_routes(entries, weights=None, fluidez_weights=None):
+    """
+    Pesa as rotas analisadas e escolhe a eco (maior EcoScore) e a padrão (menor)
+    
+    Usado por analyze_routes e, com os scores por fator armazenados, para
+    repesar resultados de outra versão (reweight_route_data)
+    
+    Args:
+        entries: Resultado de route_entry de cada rota, na ordem da Directions API
+        weights: Pesos finais (padrão: ECOSCORE_WEIGHTS)
+        fluidez_weights: Pesos da fluidez (padrão: FLUIDEZ_WEIGHTS)
+        
+    Returns:
+        dict: Análise (EcoScores, detalhes, totais, alternativas, eco_index,
+              std_index, routes e ecoscore_version)
+    """
+    version = scoring_version(weights, fluidez_weights)
+    
+    if len(entries) == 1:
+        # Rota eco = rota padrão: EcoScore absoluto, sem comparação nem economia
+        entry = entries[0]
+        totals = entry['totals']
+        details = {}
+        ecoscore = 50  # Resultados armazenados antes dos scores por fator
+        if entry['scores'] is not None:
+            details = format_ecoscore_details(
+                entry['factors'], weigh_scores(entry['scores'], weights, fluidez_weights)
+            )
+            ecoscore = details['ecoscore']
+        return {
             'strategy': 'single_route',
-            'message': 'Apenas uma rota disponível',
-            'ecoscore_eco': 50,
-            'ecoscore_std': 50
+            'ecoscore_scale': 'absolute',
+            'message': f"Apenas uma rota disponível (EcoScore absoluto: {ecoscore})",
+            'ecoscore_eco': ecoscore,
+            'ecoscore_std': ecoscore,
+            'ecoscore_difference': 0,
+            'eco_details': details,
+            'std_details': details,
+            'eco_totals': totals,
+            'std_totals': totals,
+            'alternatives': [route_alternative(entry, ecoscore, totals)],
+            'eco_index': entry['index'],
+            'std_index': entry['index'],
+            'routes': entries,
+            'ecoscore_version': version
         }
-        return route, route, analysis
-    
-    # Preparar dados para normalização
-    routes_data = []
-    for route in routes:
-        summary = route['legs'][0]
-        routes_data.append({
-            'distance_km': summary['distance']['value'] / 1000,
-            'duration_min': summary['duration']['value'] / 60,
-            'estimated_stops': estimate_stops(route),
-            'route': route
-        })
-    
-    # Calcular EcoScore para cada rota
-    ecoscore_results = []
-    for route_data in routes_data:
-        score = calculate_ecoscore(route_data['route'], routes_data)
-        ecoscore_results.append({
-            'route': route_data['route'],
-            'ecoscore': score['ecoscore'],
-            'details': score
-        })
+    
+    ecoscore_results = [
+        (format_ecoscore_details(entry['factors'], weigh_scores(entry['scores'], weights, fluidez_weights)), entry)
+        for entry in entries
+    ]
     
     # Ordenar por EcoScore (maior = melhor)
-    ecoscore_results.sort(key=lambda x: x['ecoscore'], reverse=True)
+    ecoscore_results.sort(key=lambda x: x[0]['ecoscore'], reverse=True)
     
-    eco_result = ecoscore_results[0]      # Maior EcoScore
-    std_result = ecoscore_results[-1]     # Menor EcoScore
+    eco_details, eco_entry = ecoscore_results[0]      # Maior EcoScore
+    std_details, std_entry = ecoscore_results[-1]     # Menor EcoScore
+    eco_score, std_score = eco_details['ecoscore'], std_details['ecoscore']
     
-    analysis = {
+    return {
         'strategy': 'ecoscore_v4',
-        'ecoscore_eco': eco_result['ecoscore'],
-        'ecoscore_std': std_result['ecoscore'],
-        'ecoscore_difference': round(eco_result['ecoscore'] - std_result['ecoscore'], 1),
-        'message': f"EcoScore Eco: {eco_result['ecoscore']} | EcoScore Padrão: {std_result['ecoscore']} ({eco_result['ecoscore'] - std_result['ecoscore']:.0f}% melhor)",
-        'eco_details': eco_result['details'],
-        'std_details': std_result['details']
+        'ecoscore_scale': 'relative',  # Normalizado entre as alternativas
+        'ecoscore_eco': eco_score,
+        'ecoscore_std': std_score,
+        'ecoscore_difference': round(eco_score - std_score, 1),
+        'message': f"EcoScore Eco: {eco_score} | EcoScore Padrão: {std_score} ({eco_score - std_score:.0f}% melhor)",
+        'eco_details': eco_details,
+        'std_details': std_details,
+        'eco_totals': eco_entry['totals'],
+        'std_totals': std_entry['totals'],
+        'alternatives': [
+            route_alternative(entry, details['ecoscore'], entry['totals'])
+            for details, entry in ecoscore_results
+        ],
+        'eco_index': eco_entry['index'],
+        'std_index': std_entry['index'],
+        'routes': entries,
+        'ecoscore_version': version
+    }
+
+def route_totals(summary):
+    """
+    Totais de uma rota somados em todas as legs (de analyze_steps ou
+    extract_route_factors), com a divisão por leg
+    """
+    return {
+        'distance_km': summary['distance_km'],
+        'duration_min': summary['duration_min'],
+        'duration_in_traffic_min': summary['duration_in_traffic_min'],
+        'estimated_stops': summary['estimated_stops'],
+        'legs': summary['legs']
     }
+
+def route_alternative(route, ecoscore, totals):
+    """
+    Resumo de uma rota alternativa: EcoScore, distância, duração com trânsito e CO₂
+    
+    Args:
+        route: Rota da Directions API ou route_entry (usa apenas 'summary')
+    """
+    distance_km = totals['distance_km']
     
-    return std_result['route'], eco_result['route'], analysis
+    return {
+        'summary': route.get('summary', ''),
+        'ecoscore': ecoscore,
+        'distance_km': round(distance_km, 2),
+        'duration_min': round(totals['duration_in_traffic_min'], 1),
+        'co2_kg': round(distance_km * emission_factor(ecoscore), 3)
+    }
 
-def get_route(origin_coords, dest_coords):
+@metrics.timed('directions')
+def fetch_directions(origin_coords, dest_coords, departure_time=None, waypoints=None, optimize_waypoints=False):
     """
-    Obtém múltiplas rotas usando Google Maps Directions API
-    Calcula EcoScore v4 para cada uma e retorna ambas
+    Busca rotas alternativas na Google Maps Directions API
+    Consulta o cache de rotas antes de chamar a API; uma rota stale é
+    devolvida na hora e atualizada em segundo plano
     
     Args:
         origin_coords: Dict com lat/lng da origem
         dest_coords: Dict com lat/lng do destino
+        departure_time: Horário de partida (timestamp; None = agora)
+        waypoints: Coordenadas das paradas intermediárias, em ordem
+        optimize_waypoints: Deixar o Google reordenar as paradas
         
     Returns:
-        dict: Dados das rotas (padrão e eco)
+        tuple: (payload bruto da Directions API, freshness)
     """
     if not GOOGLE_MAPS_API_KEY:
         raise ValueError("GOOGLE_MAPS_API_KEY não configurada")
     
+    stops = (waypoints, optimize_waypoints)
+    cached = route_cache.lookup(origin_coords, dest_coords, departure_time, *stops)
+    if cached is not None:
+        if cached[1]['status'] == 'stale':
+            schedule_refresh(origin_coords, dest_coords, departure_time, *stops)
+        return cached
+    
+    # Requisições simultâneas do mesmo corredor compartilham uma chamada
+    data = upstream_flight.do(
+        directions_flight_key(origin_coords, dest_coords, departure_time, *stops),
+        _fetch_directions_uncached, origin_coords, dest_coords, departure_time, *stops
+    )
+    return data, {'status': 'fresh', 'age_seconds': 0}
+
+def schedule_refresh(origin_coords, dest_coords, departure_time=None, waypoints=None, optimize_waypoints=False):
+    """
+    Agenda a atualização de uma rota stale (uma por corredor por vez)
+    
+    Returns:
+        bool: False se a rota já está sendo atualizada
+    """
+    key = directions_flight_key(origin_coords, dest_coords, departure_time, waypoints, optimize_waypoints)
+    with _refresh_lock:
+        if key in _refreshing:
+            return False
+        _refreshing.add(key)
+        refresh_stats['scheduled'] += 1
+    
+    refresh_executor.submit(_refresh_directions, key, origin_coords, dest_coords,
+                            departure_time, waypoints, optimize_waypoints)
+    return True
+
+def _refresh_directions(key, origin_coords, dest_coords, departure_time=None, waypoints=None, optimize_waypoints=False):
     try:
-        url = "https://maps.googleapis.com/maps/api/directions/json"
-        
-        origin = f"{origin_coords['lat']},{origin_coords['lng']}"
-        destination = f"{dest_coords['lat']},{dest_coords['lng']}"
-        
-        params = {
-            'origin': origin,
-            'destination': destination,
-            'mode': 'driving',
-            'key': GOOGLE_MAPS_API_KEY,
-            'alternatives': 'true'  # Retornar rotas alternativas
-        }
-        
-        response = requests.get(url, params=params, timeout=10, verify=False)
-        response.raise_for_status()
-        data = response.json()
-        
-        if data.get('status') != 'OK':
-            raise ValueError(f"Google Maps API error: {data.get('status')}")
-        
-        # Usar EcoScore v4 para selecionar rotas
-        std_route, eco_route, analysis = analyze_routes(data)
+        # Grava a nova resposta no cache; o EcoScore é recalculado a partir dela
+        upstream_flight.do(key, _fetch_directions_uncached, origin_coords, dest_coords,
+                           departure_time, waypoints, optimize_waypoints)
+        outcome = 'completed'
+    except Exception:
+        outcome = 'failed'  # A entrada stale continua válida até max_stale
+    
+    with _refresh_lock:
+        _refreshing.discard(key)
+        refresh_stats[outcome] += 1
+
+def directions_flight_key(origin_coords, dest_coords, departure_time=None, waypoints=None, optimize_waypoints=False):
+    key = route_cache.make_key(origin_coords, dest_coords, departure_time, waypoints, optimize_waypoints)
+    return f"directions:{key}"
+
+def _fetch_directions_uncached(origin_coords, dest_coords, departure_time=None, waypoints=None, optimize_waypoints=False):
+    try:
+        data = maps_client.get_json('directions', directions_params(
+            origin_coords, dest_coords, departure_time, waypoints, optimize_waypoints
+        ))
         
-        std_summary = std_route['legs'][0]
-        eco_summary = eco_route['legs'][0]
+        store_directions(origin_coords, dest_coords, data, departure_time, waypoints, optimize_waypoints)
         
-        return {
-            'distance_standard': std_summary['distance']['value'] / 1000,
-            'distance_eco': eco_summary['distance']['value'] / 1000,
-            'duration_standard': std_summary['duration']['value'] / 60,
-            'duration_eco': eco_summary['duration']['value'] / 60,
-            'analysis': analysis,
-            'polyline': eco_route.get('overview_polyline', {}).get('points', '')
-        }
+        return data
     
     except requests.exceptions.RequestException as e:
         raise ValueError(f"Erro ao calcular rota: {str(e)}")
 
-def calculate_emissions(distance_standard, distance_eco, ecoscore_eco, frequency):
+def directions_params(origin_coords, dest_coords, departure_time=None, waypoints=None, optimize_waypoints=False):
     """
-    Calcula emissões de CO₂ usando gasolina como combustível padrão
+    Parâmetros da Directions API para um par origem/destino
     
-    Fator de emissão dinâmico baseado em EcoScore:
-    - EcoScore ≥ 80: 0.115 kg/km (Fluxo Ideal)
-    - EcoScore 65-79: 0.122 kg/km (Fluxo Muito Bom)
-    - EcoScore 50-64: 0.135 kg/km (Fluxo Normal)
-    - EcoScore 35-49: 0.148 kg/km (Fluxo Moderado)
-    - EcoScore < 35: 0.165 kg/km (Congestionado)
+    Com departure_time, o Google devolve duration_in_traffic previsto
+    para aquele horário. Com paradas intermediárias, a resposta tem uma
+    leg por trecho (e o Google não devolve rotas alternativas).
+    """
+    origin = f"{origin_coords['lat']},{origin_coords['lng']}"
+    destination = f"{dest_coords['lat']},{dest_coords['lng']}"
+    
+    params = {
+        'origin': origin,
+        'destination': destination,
+        'mode': 'driving',
+        'alternatives': 'true'  # Retornar rotas alternativas
+    }
+    if departure_time:
+        params['departure_time'] = int(departure_time)
+    if waypoints:
+        points = [f"{point['lat']},{point['lng']}" for point in waypoints]
+        if optimize_waypoints:
+            points.insert(0, 'optimize:true')
+        params['waypoints'] = '|'.join(points)
+    return params
+
+def parse_departure_time(value):
+    """
+    Valida o campo departure_time de uma requisição
     
     Args:
-        distance_standard: Distância da rota padrão em km
-        distance_eco: Distância da rota eco em km
-        ecoscore_eco: EcoScore da rota eco
-        frequency: Frequência semanal de deslocamento
+        value: Timestamp Unix, 'now' ou vazio
         
     Returns:
-        dict: Dados de emissões e economia
+        int: Timestamp da partida ou None (agora)
     """
+    if value in (None, '', 'now'):
+        return None
+    try:
+        departure_time = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("departure_time deve ser um timestamp Unix ou 'now'")
     
-    # COMBUSTÍVEL: GASOLINA (0.115 kg CO₂/km base)
-    EMISSION_FACTOR_BASE = 0.115  # kg CO₂/km (fluxo ideal)
-    FUEL_CONSUMPTION_PER_KM = 1 / 9.6  # Litros por km (9,6 km/litro)
-    FUEL_PRICE = 6.50  # R$/litro
-    
-    # Determinar fator de emissão baseado em EcoScore
-    if ecoscore_eco >= 80:
-        emission_factor_eco = 0.115  # Ideal
-    elif ecoscore_eco >= 65:
-        emission_factor_eco = 0.122  # Muito Bom
-    elif ecoscore_eco >= 50:
-        emission_factor_eco = 0.135  # Normal
-    elif ecoscore_eco >= 35:
-        emission_factor_eco = 0.148  # Moderado
-    else:
-        emission_factor_eco = 0.165  # Congestionado
+    # A Directions API só aceita partidas no futuro
+    if departure_time < time.time() - 60:
+        raise ValueError("departure_time deve estar no futuro")
+    return departure_time
+
+def store_directions(origin_coords, dest_coords, data, departure_time=None, waypoints=None, optimize_waypoints=False):
+    """
+    Valida uma resposta da Directions API e a guarda no cache e no arquivo
+    """
+    if data.get('status') != 'OK':
+        raise ValueError(f"Google Maps API error: {data.get('status')}")
     
-    # Fator padrão é sempre o máximo (pior caso)
-    emission_factor_standard = 0.165  # kg CO₂/km (congestionado)
+    route_cache.set(origin_coords, dest_coords, data, departure_time, waypoints, optimize_waypoints)
+    archive_directions(origin_coords, dest_coords, data)
+
+def archive_directions(origin_coords, dest_coords, data):
+    """
+    Acrescenta uma resposta da Directions API ao arquivo JSONL (se configurado)
     
-    # Cálculo anual (52 semanas)
-    total_standard = distance_standard * emission_factor_standard * frequency * 52
-    total_eco = distance_eco * emission_factor_eco * frequency * 52
-    savings = total_standard - total_eco
+    Usado por rescore.py para reavaliar o EcoScore sem chamar o Google novamente.
+    Com ELEVATION_PROVIDER ativo, o registro leva o ganho de elevação de cada
+    rota (elevation_gains), o mesmo que o pipeline usa em seguida (o serviço
+    de elevação guarda o resultado em cache por polyline).
+    """
+    if not DIRECTIONS_ARCHIVE_PATH:
+        return
     
-    # Dados adicionais
-    distance_diff = distance_standard - distance_eco
-    fuel_saved = distance_diff * FUEL_CONSUMPTION_PER_KM * frequency * 52
-    money_saved = fuel_saved * FUEL_PRICE
+    record = {
+        'ts': int(time.time()),
+        'origin': origin_coords,
+        'destination': dest_coords,
+        'directions': data
+    }
+    if ELEVATION_PROVIDER != 'none':
+        try:
+            record['elevation_gains'] = get_elevation_gains(data.get('routes', []))
+        except Exception:
+            pass  # Sem elevação o registro continua útil (rescore.py usa zero)
+    line = json.dumps(record, ensure_ascii=False)
     
-    # Comparações educativas
-    trees_equivalent = round(savings / 21) if savings > 0 else 0  # ~21kg CO₂/árvore/ano
-    km_car_equivalent = round(savings / emission_factor_standard) if savings > 0 else 0
+    try:
+        with _archive_lock, open(DIRECTIONS_ARCHIVE_PATH, 'a', encoding='utf-8') as archive:
+            archive.write(line + '\n')
+    except OSError:
+        pass  # Arquivamento é best-effort
+
+def get_route(origin_coords, dest_coords, departure_time=None, waypoints=None, optimize_waypoints=False):
+    """
+    Obtém múltiplas rotas usando Google Maps Directions API
+    Calcula EcoScore v4 para cada uma e retorna ambas
     
-    return {
-        'total_standard': round(total_standard, 2),
+    Args:
+        origin_coords: Dict com lat/lng da origem
+        dest_coords: Dict com lat/lng do destino
+        departure_time: Horário de partida (timestamp; None = agora)
+        waypoints: Coordenadas das paradas intermediárias, em ordem
+        optimize_waypoints: Deixar o Google reordenar as paradas
+        
+    Returns:
+        dict: Dados das rotas (padrão e eco), somados em todas as legs
+    """
+    data, freshness = fetch_directions(
+        origin_coords, dest_coords, departure_time, waypoints, optimize_waypoints
+    )
+    
+    route_data = build_route_data(data)
+    route_data['freshness'] = freshness
+    return route_data
+
+def build_route_data(data):
+    """
+    Seleciona as rotas padrão e eco de uma resposta da Directions API
+    
+    Args:
+        data: Payload da Directions API
+        
+    Returns:
+        dict: Dados das rotas (padrão e eco)
+    """
+    # Usar EcoScore v4 para selecionar rotas
+    # (recalculado a cada chamada, mesmo com payload em cache)
+    _, _, analysis = analyze_routes(data)
+    return route_data_from_analysis(analysis)
+
+def route_data_from_analysis(analysis):
+    """
+    Dados das rotas padrão e eco a partir da análise (analyze_routes ou rank_routes)
+    """
+    eco_route = analysis['routes'][analysis['eco_index']]
+    
+    # Totais somados em todas as legs (rotas com paradas intermediárias)
+    std_totals = analysis['std_totals']
+    eco_totals = analysis['eco_totals']
+    
+    return {
+        'distance_standard': std_totals['distance_km'],
+        'distance_eco': eco_totals['distance_km'],
+        'duration_standard': std_totals['duration_min'],
+        'duration_eco': eco_totals['duration_min'],
+        'legs': eco_totals['legs'],
+        'waypoint_order': eco_route['waypoint_order'],
+        'analysis': analysis,
+        'polyline': eco_route['polyline']
+    }
+
+def reweight_route_data(route_data):
+    """
+    Reaplica a configuração de EcoScore atual a um resultado armazenado
+    
+    Só a soma ponderada e a escolha eco/padrão são refeitas, a partir dos
+    scores por fator guardados na análise: sem Directions, elevação nem
+    renormalização.
+    
+    Returns:
+        dict: route_data na versão atual (o próprio, se já estiver nela), ou
+              None se o resultado for anterior aos scores por fator
+    """
+    analysis = route_data['analysis']
+    if analysis.get('ecoscore_version') == SCORING_VERSION:
+        return route_data
+    if 'routes' not in analysis:
+        return None
+    
+    return dict(route_data, **route_data_from_analysis(rank_routes(analysis['routes'])))
+
+@metrics.timed('emissions')
+def calculate_emissions(distance_standard, distance_eco, ecoscore_eco, frequency, fuel=None,
+                        same_route=False):
+    """
+    Calcula emissões de CO₂ usando gasolina como combustível padrão
+    
+    Fator de emissão dinâmico baseado em EcoScore:
+    - EcoScore ≥ 80: 0.115 kg/km (Fluxo Ideal)
+    - EcoScore 65-79: 0.122 kg/km (Fluxo Muito Bom)
+    - EcoScore 50-64: 0.135 kg/km (Fluxo Normal)
+    - EcoScore 35-49: 0.148 kg/km (Fluxo Moderado)
+    - EcoScore < 35: 0.165 kg/km (Congestionado)
+    
+    Args:
+        distance_standard: Distância da rota padrão em km
+        distance_eco: Distância da rota eco em km
+        ecoscore_eco: EcoScore da rota eco
+        frequency: Frequência semanal de deslocamento
+        fuel: Perfil de combustível (padrão: gasolina)
+        same_route: Rota eco = rota padrão (rota única): mesmo fator, economia zero
+        
+    Returns:
+        dict: Dados de emissões e economia
+    """
+    
+    # COMBUSTÍVEL: GASOLINA por padrão (perfis em emissions.FUEL_PROFILES)
+    profile = emissions.fuel_profile(fuel)
+    FUEL_CONSUMPTION_PER_KM = 1 / profile['km_per_liter']  # Litros por km
+    FUEL_PRICE = profile['price']  # R$/litro
+    
+    # Determinar fator de emissão baseado em EcoScore
+    emission_factor_eco = emission_factor(ecoscore_eco, fuel)
+    
+    # Fator padrão é sempre o máximo (pior caso), exceto se for a própria rota eco
+    emission_factor_standard = emission_factor_eco if same_route else profile['standard_factor']
+    
+    # Cálculo anual (52 semanas)
+    # (emissions.emission_columns repete estas operações, na mesma ordem, em lote)
+    total_standard = distance_standard * emission_factor_standard * frequency * 52
+    total_eco = distance_eco * emission_factor_eco * frequency * 52
+    savings = total_standard - total_eco
+    
+    # Dados adicionais
+    distance_diff = distance_standard - distance_eco
+    fuel_saved = distance_diff * FUEL_CONSUMPTION_PER_KM * frequency * 52
+    money_saved = fuel_saved * FUEL_PRICE
+    
+    # Comparações educativas
+    trees_equivalent = round(savings / 21) if savings > 0 else 0  # ~21kg CO₂/árvore/ano
+    km_car_equivalent = round(savings / emission_factor_standard) if savings > 0 else 0
+    
+    return {
+        'total_standard': round(total_standard, 2),
         'total_eco': round(total_eco, 2),
         'savings': round(max(savings, 0), 2),
         'trees_equivalent': max(trees_equivalent, 0),
@@ -491,96 +1164,1287 @@ def get_impact_message(savings):
     else:
         return "Pequenas ações fazem grande diferença! 💚"
 
+def validate_trip(origin, destination, frequency):
+    """
+    Valida os dados de um deslocamento
+    
+    Returns:
+        str: Mensagem de erro ou None se válido
+    """
+    if not origin or not destination:
+        return 'Por favor, preencha origem e destino'
+    
+    if frequency < 1 or frequency > 7:
+        return 'Frequência deve ser entre 1 e 7 vezes por semana'
+    
+    return None
+
+def parse_waypoints(value):
+    """
+    Valida as paradas intermediárias de uma requisição
+    
+    Args:
+        value: Lista de endereços (ex.: escola antes do trabalho) ou vazio
+        
+    Returns:
+        list: Endereços das paradas, em ordem
+    """
+    if not value:
+        return []
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError("waypoints deve ser uma lista de endereços")
+    
+    waypoints = [item.strip() for item in value if item.strip()]
+    if len(waypoints) > MAX_WAYPOINTS:
+        raise ValueError(f"Máximo de {MAX_WAYPOINTS} paradas intermediárias")
+    return waypoints
+
+def build_result(origin, destination, origin_coords, dest_coords, route_data, frequency):
+    """
+    Monta a resposta de um deslocamento: emissões, impacto e EcoScore
+    
+    Args:
+        origin, destination: Endereços informados
+        origin_coords, dest_coords: Resultado de geocode_address
+        route_data: Resultado de get_route
+        frequency: Frequência semanal
+        
+    Returns:
+        dict: Dados da rota, EcoScore e economia
+    """
+    distance_standard = route_data['distance_standard']
+    distance_eco = route_data['distance_eco']
+    
+    # Extrair análise com EcoScore
+    analysis = route_data['analysis']
+    ecoscore_eco = analysis['ecoscore_eco']
+    
+    # Calcular emissões com EcoScore dinâmico
+    emissions = calculate_emissions(
+        distance_standard,
+        distance_eco,
+        ecoscore_eco,
+        frequency,
+        same_route=analysis['eco_index'] == analysis['std_index']
+    )
+    
+    # Mensagem de impacto
+    impact_message = get_impact_message(emissions['savings'])
+    
+    return {
+        'origin': origin_coords.get('address', origin),
+        'destination': dest_coords.get('address', destination),
+        'origin_coords': {'lat': origin_coords['lat'], 'lng': origin_coords['lng']},
+        'dest_coords': {'lat': dest_coords['lat'], 'lng': dest_coords['lng']},
+        'distance_standard': round(distance_standard, 2),
+        'distance_eco': round(distance_eco, 2),
+        'duration_standard': round(route_data['duration_standard'], 0),
+        'duration_eco': round(route_data['duration_eco'], 0),
+        'frequency': frequency,
+        'emissions': emissions,
+        'impact_message': impact_message,
+        'eco_polyline': route_data.get('polyline', ''),
+        'legs': format_legs(route_data.get('legs', []), ecoscore_eco),
+        'waypoint_order': route_data.get('waypoint_order', []),
+        'analysis_message': analysis.get('message', ''),
+        # 'stale': dados de tráfego aproximados (atualização em andamento)
+        'freshness': route_data.get('freshness', {'status': 'fresh', 'age_seconds': 0}),
+        'ecoscore': {
+            'eco': analysis['ecoscore_eco'],
+            'standard': analysis['ecoscore_std'],
+            'difference': analysis.get('ecoscore_difference', 0),
+            # 'absolute' (rota única) ou 'relative' (comparado às alternativas)
+            'scale': analysis.get('ecoscore_scale', 'relative'),
+            'eco_details': analysis.get('eco_details', {})
+        },
+        'ecoscore_version': analysis.get('ecoscore_version', SCORING_VERSION)
+    }
+
+def format_legs(legs, ecoscore_eco):
+    """
+    Divisão por trecho da rota eco (uma leg por parada), com o CO₂ de cada trecho
+    
+    Args:
+        legs: route_data['legs']
+        ecoscore_eco: EcoScore da rota eco
+        
+    Returns:
+        list: Distância, duração, paradas e CO₂ (kg por viagem) de cada leg
+    """
+    factor = emission_factor(ecoscore_eco)
+    return [
+        {
+            'start_address': leg['start_address'],
+            'end_address': leg['end_address'],
+            'distance_km': round(leg['distance_km'], 2),
+            'duration_min': round(leg['duration_min'], 0),
+            'duration_in_traffic_min': round(leg['duration_in_traffic_min'], 0),
+            'estimated_stops': leg['estimated_stops'],
+            'co2_kg': round(leg['distance_km'] * factor, 3)
+        }
+        for leg in legs
+    ]
+
+# Campos de emissions que o modo compacto omite (constantes da configuração)
+COMPACT_DROPPED_EMISSIONS = ('emission_factor_standard', 'emission_factor_eco', 'fuel_consumption_rate')
+
+def compact_result(result):
+    """
+    Versão compacta de build_result (?compact=1): sem fatores de emissão nem
+    detalhes do EcoScore, com polyline simplificada e legs só quando há paradas
+    
+    Args:
+        result: Resultado de build_result
+    
+    Returns:
+        dict: Campos usados pela interface, com a mesma estrutura
+    """
+    compact = {
+        key: value for key, value in result.items()
+        if key not in ('eco_polyline', 'legs', 'waypoint_order')
+    }
+    compact['emissions'] = {
+        key: value for key, value in result['emissions'].items()
+        if key not in COMPACT_DROPPED_EMISSIONS
+    }
+    compact['ecoscore'] = {
+        key: value for key, value in result['ecoscore'].items() if key != 'eco_details'
+    }
+    
+    if result['eco_polyline']:
+        compact['eco_polyline'] = polyline.simplify_encoded(
+            result['eco_polyline'], COMPACT_POLYLINE_TOLERANCE
+        )
+    
+    # Rota sem paradas: a única leg repete os totais
+    if len(result['legs']) > 1:
+        compact['legs'] = [
+            {key: leg[key] for key in ('distance_km', 'duration_in_traffic_min', 'co2_kg')}
+            for leg in result['legs']
+        ]
+        compact['waypoint_order'] = result['waypoint_order']
+    
+    return compact
+
+def response_cache_key(origin, destination, frequency, departure_time=None,
+                       waypoints=(), optimize_waypoints=False, compact=False):
+    """
+    Chave de response_cache: endereços normalizados, frequência, faixa horária
+    de partida (a mesma do cache de rotas), paradas e modo da resposta
+    """
+    slot = departure_slot(departure_time or time.time(), route_cache.bucket_minutes)
+    stops = ';'.join(normalize_address(w) for w in waypoints)
+    return (f"{normalize_address(origin)}|{normalize_address(destination)}|{frequency}|{slot}|"
+            f"{stops}|{int(optimize_waypoints)}|{'compact' if compact else 'full'}")
+
+def encode_result(result, cache_key=None):
+    """
+    Serializa um resultado de /calculate uma única vez
+    
+    Resultados com tráfego atual (fresh ou precomputed) são guardados em
+    response_cache já comprimidos: repetições não serializam nem comprimem
+    
+    Returns:
+        responses.EncodedResponse
+    """
+    with metrics.stage('serialize'):
+        encoded = responses.EncodedResponse(result)
+        
+        status = result['freshness']['status']
+        if cache_key and RESPONSE_CACHE_TTL > 0 and status in ('fresh', 'precomputed'):
+            response_cache.set_key(cache_key, encoded.precompress())
+    
+    return encoded
+
+def encoded_response(encoded):
+    """
+    Resposta HTTP com o corpo já serializado, na codificação aceita pelo cliente
+    """
+    encoding, body = encoded.encoded(
+        responses.negotiate_encoding(request.headers.get('Accept-Encoding'))
+    )
+    response = Response(body, mimetype='application/json')
+    response.headers['Vary'] = 'Accept, Accept-Encoding'
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+def prepare_calculate(data, compact=False):
+    """
+    Etapas de /calculate anteriores à busca da rota, comuns aos modos WSGI e
+    ASGI: validação, log de corredores, response_cache e índice de corredores
+    
+    Args:
+        data: Corpo JSON da requisição
+        compact: Modo compacto (compact_result)
+        
+    Returns:
+        dict: Dados validados da viagem, cache_key, cached (EncodedResponse
+              pronto ou None) e precomputed (resultado de lookup_corridor ou None)
+        
+    Raises:
+        ValueError: Dados inválidos
+    """
+    origin = data.get('origin', '').strip()
+    destination = data.get('destination', '').strip()
+    frequency = int(data.get('frequency', 0))
+    departure_time = parse_departure_time(data.get('departure_time'))
+    waypoints = parse_waypoints(data.get('waypoints'))
+    optimize_waypoints = bool(data.get('optimize_waypoints', False))
+    
+    # Validações
+    error = validate_trip(origin, destination, frequency)
+    if error:
+        raise ValueError(error)
+    
+    if not waypoints:
+        corridor_log.append(origin, destination, departure_time)
+    
+    trip = {
+        'origin': origin,
+        'destination': destination,
+        'frequency': frequency,
+        'departure_time': departure_time,
+        'waypoints': waypoints,
+        'optimize_waypoints': optimize_waypoints,
+        'compact': compact,
+        'cache_key': response_cache_key(
+            origin, destination, frequency, departure_time, waypoints, optimize_waypoints, compact
+        ),
+        'precomputed': None
+    }
+    trip['cached'] = response_cache.get_key(trip['cache_key'])
+    
+    # Corredores frequentes (sem paradas) são respondidos pelo índice, sem chamar o Google
+    if trip['cached'] is None and not waypoints:
+        trip['precomputed'] = lookup_corridor(origin, destination, departure_time)
+    
+    return trip
+
+def finish_calculate(trip, origin_coords, dest_coords, route_data):
+    """
+    Etapas de /calculate posteriores à busca da rota, comuns aos modos WSGI e
+    ASGI: resultado, modo compacto, serialização e response_cache
+    
+    Args:
+        trip: Resultado de prepare_calculate
+        origin_coords, dest_coords: Coordenadas geocodificadas
+        route_data: Resultado de get_route (ou do índice de corredores)
+        
+    Returns:
+        responses.EncodedResponse
+    """
+    result = build_result(trip['origin'], trip['destination'], origin_coords,
+                          dest_coords, route_data, trip['frequency'])
+    if trip['compact']:
+        result = compact_result(result)
+    
+    return encode_result(result, trip['cache_key'])
+
+def lookup_corridor(origin, destination, departure_time=None):
+    """
+    Consulta o índice pré-calculado de corredores
+    
+    Returns:
+        tuple: (origin_coords, dest_coords, route_data) ou None
+    """
+    entry = corridor_index.get(origin, destination, departure_time)
+    if entry is None:
+        return None
+    
+    # Pesos ou faixas mudaram desde o pré-cálculo: repesar (sem chamar o Google)
+    route_data = reweight_route_data(entry['route_data'])
+    if route_data is None:
+        return None
+    
+    route_data = dict(route_data, freshness={
+        'status': 'precomputed',
+        'age_seconds': int(time.time() - entry['computed_at'])
+    })
+    return entry['origin_coords'], entry['dest_coords'], route_data
+
+def precompute_corridor(origin, destination, departure_time):
+    """
+    Roda o pipeline completo de um corredor e grava o resultado no índice
+    
+    As emissões dependem da frequência informada em cada requisição e são
+    recalculadas por build_result; o índice guarda geocodificação e rotas
+    já analisadas.
+    """
+    origin_coords, dest_coords = geocode_many([origin, destination])
+    route_data = get_route(origin_coords, dest_coords, departure_time)
+    route_data.pop('freshness', None)
+    
+    entry = {
+        'origin_coords': origin_coords,
+        'dest_coords': dest_coords,
+        'route_data': route_data,
+        'departure_time': departure_time,
+        'computed_at': int(time.time())
+    }
+    corridor_index.set(origin, destination, departure_time, entry)
+    return entry
+
+def sweep_window(start=None, end=None, interval_minutes=None):
+    """
+    Horários de partida de uma varredura
+    
+    Args:
+        start: Timestamp inicial (padrão: agora)
+        end: Timestamp final (padrão: start + 3 horas)
+        interval_minutes: Intervalo entre partidas (padrão: faixa do cache de rotas)
+        
+    Returns:
+        list: Timestamps de partida, em ordem
+    """
+    now = int(time.time())
+    try:
+        start = max(int(start), now) if start not in (None, '', 'now') else now
+        end = int(end) if end not in (None, '') else start + 3 * 3600
+        interval = int(interval_minutes or route_cache.bucket_minutes)
+    except (TypeError, ValueError):
+        raise ValueError("start, end e interval_minutes devem ser números")
+    
+    if interval < 1:
+        raise ValueError("interval_minutes deve ser positivo")
+    if end < start:
+        raise ValueError("end deve ser posterior a start")
+    
+    departures = list(range(start, end + 1, interval * 60))
+    if len(departures) > SWEEP_MAX_POINTS:
+        raise ValueError(f"Máximo de {SWEEP_MAX_POINTS} horários por varredura (aumente interval_minutes)")
+    return departures
+
+def sweep_departures(origin_coords, dest_coords, departures,
+                     deadline=SWEEP_DEADLINE, concurrency=SWEEP_CONCURRENCY):
+    """
+    Consulta as rotas de vários horários de partida em paralelo
+    
+    Cada horário passa por get_route (cache de rotas + single-flight), então
+    horários repetidos ou já consultados não chamam o Google. Horários que não
+    terminam dentro do prazo são marcados como 'timeout', mas não são
+    cancelados: os em andamento e os ainda na fila continuam (no máximo
+    `concurrency` por vez) e alimentam o cache para a próxima varredura.
+    
+    Args:
+        origin_coords, dest_coords: Resultado de geocode_address
+        departures: Timestamps de partida
+        deadline: Prazo total em segundos
+        concurrency: Máximo de chamadas simultâneas
+        
+    Returns:
+        list: Um ponto por horário, em ordem cronológica, com 'rank' (1 = menor CO₂)
+    """
+    now = time.time()
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='sweep')
+    try:
+        futures = {
+            executor.submit(
+                contextvars.copy_context().run, get_route, origin_coords, dest_coords,
+                departure if departure > now + 60 else None  # Primeiro horário = agora
+            ): departure
+            for departure in departures
+        }
+        done, _ = wait(futures, timeout=deadline)
+    finally:
+        # Sem cancel_futures: os horários restantes terminam em segundo plano
+        executor.shutdown(wait=False)
+    
+    points = []
+    rate_limited = None
+    for future, departure in futures.items():
+        point = {'departure_time': departure}
+        if future not in done:
+            point['status'] = 'timeout'
+        elif future.exception() is not None:
+            error = future.exception()
+            if isinstance(error, RateLimitExceeded):
+                rate_limited = error
+            point.update(status='error', error=str(error))
+        else:
+            route_data = future.result()
+            alternatives = route_data['analysis']['alternatives']
+            best = alternatives[0]  # Maior EcoScore
+            point.update(
+                status='ok',
+                ecoscore=best['ecoscore'],
+                co2_kg=best['co2_kg'],
+                duration_min=best['duration_min'],
+                distance_km=best['distance_km'],
+                freshness=route_data.get('freshness'),
+                alternatives=alternatives
+            )
+        points.append(point)
+    
+    if rate_limited is not None and not any(p['status'] == 'ok' for p in points):
+        raise rate_limited
+    
+    ranked = sorted(
+        (p for p in points if p['status'] == 'ok'),
+        key=lambda p: (p['co2_kg'], -p['ecoscore'], p['duration_min'])
+    )
+    for rank, point in enumerate(ranked, start=1):
+        point['rank'] = rank
+    
+    return sorted(points, key=lambda p: p['departure_time'])
+
+def matrix_tiles(n_origins, n_destinations, max_elements=MATRIX_TILE_ELEMENTS, max_side=MATRIX_TILE_SIDE):
+    """
+    Divide uma matriz origens × destinos em blocos aceitos pela Distance Matrix API
+    
+    Returns:
+        list: (origem_inicial, origem_final, destino_inicial, destino_final) por bloco
+    """
+    tiles = []
+    cols = min(max_side, max_elements)
+    for col in range(0, n_destinations, cols):
+        col_end = min(col + cols, n_destinations)
+        # Blocos de destinos mais estreitos (o último) comportam mais origens
+        rows = max(1, min(max_side, max_elements // (col_end - col)))
+        tiles.extend(
+            (row, min(row + rows, n_origins), col, col_end)
+            for row in range(0, n_origins, rows)
+        )
+    return tiles
+
+def fetch_matrix_tile(origins, destinations, departure_time=None):
+    """
+    Uma chamada à Distance Matrix API
+    
+    Args:
+        origins, destinations: Listas de coordenadas (resultado de geocode_address)
+        departure_time: Horário de partida (timestamp; None = sem trânsito)
+        
+    Returns:
+        list: Linhas da resposta (uma por origem, com um elemento por destino)
+    """
+    params = {
+        'origins': '|'.join(f"{c['lat']},{c['lng']}" for c in origins),
+        'destinations': '|'.join(f"{c['lat']},{c['lng']}" for c in destinations),
+        'mode': 'driving'
+    }
+    if departure_time:
+        params['departure_time'] = int(departure_time)
+    
+    try:
+        data = maps_client.get_json('distancematrix', params)
+    except requests.exceptions.RequestException as e:
+        raise ValueError(f"Erro ao consultar matriz de distâncias: {str(e)}")
+    
+    if data.get('status') != 'OK':
+        raise ValueError(f"Google Maps API error: {data.get('status')}")
+    return data['rows']
+
+def matrix_element(element):
+    """
+    Distância e duração de um elemento da Distance Matrix API
+    """
+    if element.get('status') != 'OK':
+        return {'status': element.get('status', 'UNKNOWN_ERROR')}
+    
+    duration = element.get('duration_in_traffic', element['duration'])['value']
+    return {
+        'status': 'OK',
+        'distance_km': element['distance']['value'] / 1000,
+        'duration_min': duration / 60
+    }
+
+def prescore_candidates(candidates):
+    """
+    Pré-classificação dos destinos de uma origem com os fatores de distância
+    e tempo do EcoScore (normalização dinâmica entre os candidatos)
+    
+    Preenche 'prescore' (0-100) em cada candidato com status OK
+    """
+    reachable = [c for c in candidates if c['status'] == 'OK']
+    if not reachable:
+        return
+    
+    weights = (ECOSCORE_WEIGHTS['distancia'], ECOSCORE_WEIGHTS['fluidez'])
+    columns = {name: [c[name] for c in reachable] for name in ('distance_km', 'duration_min')}
+    bounds = {name: (min(values), max(values)) for name, values in columns.items()}
+    
+    for candidate in reachable:
+        # Mesmo resultado de normalize_factor(..., descending=True), com min/max calculados uma vez
+        scores = []
+        for name in ('distance_km', 'duration_min'):
+            min_val, max_val = bounds[name]
+            if len(reachable) < 2 or min_val == max_val:
+                scores.append(50)
+            else:
+                scores.append(max(0, min(100, ((max_val - candidate[name]) / (max_val - min_val)) * 100)))
+        candidate['prescore'] = round(
+            (weights[0] * scores[0] + weights[1] * scores[1]) / sum(weights), 1
+        )
+
+def score_matrix(origins, destinations, frequency, top_k=MATRIX_TOP_K,
+                 departure_time=None, concurrency=MATRIX_CONCURRENCY):
+    """
+    Avalia todas as combinações origens × destinos com poucas chamadas ao Google
+    
+    1. Geocodifica cada endereço distinto uma vez
+    2. Consulta a Distance Matrix API em blocos (ex.: 4 × 25, 10 × 10), em paralelo
+    3. Pré-classifica os destinos de cada origem por distância e tempo
+    4. Roda get_route (rotas alternativas + analyze_routes) e build_result só
+       para os top_k destinos de cada origem
+    
+    Args:
+        origins, destinations: Listas de endereços
+        frequency: Frequência semanal
+        top_k: Destinos avaliados com o EcoScore completo por origem
+        departure_time: Horário de partida (timestamp; None = agora)
+        concurrency: Máximo de chamadas simultâneas
+        
+    Returns:
+        dict: results (uma entrada por origem, candidatos em ordem de rank),
+              unresolved (endereços não encontrados) e summary
+    """
+    summary = {'origins': len(origins), 'destinations': len(destinations), 'geocode_calls': 0,
+               'matrix_calls': 0, 'matrix_errors': 0, 'routes_evaluated': 0, 'route_errors': 0}
+    
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='matrix')
+    try:
+        # 1. Geocodificação (uma vez por endereço distinto)
+        addresses = {normalize_address(a): a for a in [*origins, *destinations]}
+        geocode_futures = {
+            key: executor.submit(contextvars.copy_context().run, geocode_address, address)
+            for key, address in addresses.items()
+        }
+        summary['geocode_calls'] = len(geocode_futures)
+        
+        geocoded, unresolved = {}, []
+        for key, future in geocode_futures.items():
+            try:
+                geocoded[key] = future.result()
+            except ValueError as e:
+                unresolved.append({'address': addresses[key], 'error': str(e)})
+        
+        origin_list = [a for a in origins if normalize_address(a) in geocoded]
+        dest_list = [a for a in destinations if normalize_address(a) in geocoded]
+        origin_coords = [geocoded[normalize_address(a)] for a in origin_list]
+        dest_coords = [geocoded[normalize_address(a)] for a in dest_list]
+        
+        # 2. Distance Matrix em blocos paralelos
+        elements = [[{'status': 'NOT_REQUESTED'}] * len(dest_list) for _ in origin_list]
+        tiles = matrix_tiles(len(origin_list), len(dest_list)) if origin_list and dest_list else []
+        tile_futures = {
+            executor.submit(
+                contextvars.copy_context().run, fetch_matrix_tile,
+                origin_coords[r0:r1], dest_coords[c0:c1], departure_time
+            ): (r0, r1, c0, c1)
+            for r0, r1, c0, c1 in tiles
+        }
+        summary['matrix_calls'] = len(tile_futures)
+        
+        for future, (r0, r1, c0, c1) in tile_futures.items():
+            try:
+                rows = future.result()
+            except ValueError:
+                # Bloco sem resposta: seus pares ficam sem pré-classificação
+                summary['matrix_errors'] += 1
+                for i in range(r0, r1):
+                    elements[i][c0:c1] = [{'status': 'ERROR'}] * (c1 - c0)
+                continue
+            for i, row in enumerate(rows):
+                elements[r0 + i][c0:c1] = [matrix_element(e) for e in row['elements']]
+        
+        # 3. Pré-classificação por origem
+        results = []
+        route_futures = {}
+        for i, origin in enumerate(origin_list):
+            candidates = [
+                dict(element, destination=destination)
+                for destination, element in zip(dest_list, elements[i])
+            ]
+            prescore_candidates(candidates)
+            candidates.sort(key=lambda c: c.get('prescore', -1), reverse=True)
+            
+            for rank, candidate in enumerate(candidates, start=1):
+                if 'prescore' not in candidate:
+                    break
+                candidate['rank'] = rank
+                # 4. EcoScore completo só para os melhores destinos
+                if rank <= top_k:
+                    dest = geocoded[normalize_address(candidate['destination'])]
+                    future = executor.submit(
+                        contextvars.copy_context().run, get_route,
+                        origin_coords[i], dest, departure_time
+                    )
+                    route_futures[future] = (origin, candidate, origin_coords[i], dest)
+            
+            results.append({'origin': origin, 'candidates': candidates})
+        
+        for future, (origin, candidate, o_coords, d_coords) in route_futures.items():
+            try:
+                candidate['result'] = build_result(
+                    origin, candidate['destination'], o_coords, d_coords, future.result(), frequency
+                )
+                summary['routes_evaluated'] += 1
+            except RateLimitExceeded:
+                raise
+            except Exception as e:
+                candidate['error'] = str(e)
+                summary['route_errors'] += 1
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    # Chamadas à Directions API evitadas em relação a uma por par
+    summary['routes_skipped'] = len(origin_list) * len(dest_list) - len(route_futures)
+    
+    return {'results': results, 'unresolved': unresolved, 'summary': summary}
+
+def iter_batch_results(items, concurrency=BATCH_CONCURRENCY):
+    """
+    Processa um lote de deslocamentos, gerando resultados à medida que ficam prontos
+    
+    Endereços iguais são geocodificados uma única vez e pares de coordenadas
+    iguais consultam a Directions API uma única vez. No máximo `concurrency`
+    chamadas ao Google Maps ficam em andamento ao mesmo tempo.
+    
+    Args:
+        items: Lista de dicts com origin, destination, frequency (e id opcional)
+        concurrency: Máximo de chamadas simultâneas
+        
+    Yields:
+        dict: {'index', 'id', 'result'} ou {'index', 'id', 'error'} por item,
+              e por fim {'summary': {...}}
+    """
+    summary = {'total': len(items), 'ok': 0, 'errors': 0, 'geocode_calls': 0, 'route_calls': 0}
+    
+    def item_line(index, item, **payload):
+        summary['ok' if 'result' in payload else 'errors'] += 1
+        return {'index': index, 'id': item.get('id'), **payload}
+    
+    trips = {}              # index -> (item, origin, destination, frequency)
+    waiting = {}            # chave de endereço -> [índices aguardando]
+    geocoded = {}           # chave de endereço -> coordenadas ou exceção
+    geocode_futures = {}    # future -> chave de endereço
+    route_futures = {}      # future -> par de coordenadas
+    route_waiting = {}      # par de coordenadas -> [índices aguardando]
+    
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='batch')
+    try:
+        # Validar itens e disparar geocodificações (uma por endereço distinto)
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                yield item_line(index, {}, error='Item inválido')
+                continue
+            
+            origin = str(item.get('origin', '')).strip()
+            destination = str(item.get('destination', '')).strip()
+            try:
+                frequency = int(item.get('frequency', 0))
+            except (TypeError, ValueError):
+                frequency = 0
+            
+            error = validate_trip(origin, destination, frequency)
+            if error:
+                yield item_line(index, item, error=error)
+                continue
+            
+            trips[index] = (item, origin, destination, frequency)
+            addresses = {normalize_address(a): a for a in (destination, origin)}
+            for key, address in addresses.items():
+                if key not in waiting:
+                    waiting[key] = []
+                    geocode_futures[executor.submit(geocode_address, address)] = key
+                    summary['geocode_calls'] += 1
+                waiting[key].append(index)
+        
+        def trip_coords(index):
+            _, origin, destination, _ = trips[index]
+            return geocoded.get(normalize_address(origin)), geocoded.get(normalize_address(destination))
+        
+        pending = set(geocode_futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            
+            for future in done:
+                if future in geocode_futures:
+                    key = geocode_futures.pop(future)
+                    try:
+                        geocoded[key] = future.result()
+                    except Exception as e:
+                        geocoded[key] = e
+                    
+                    # Itens cuja origem e destino já foram resolvidos
+                    for index in waiting.pop(key):
+                        if index not in trips:
+                            continue
+                        origin_coords, dest_coords = trip_coords(index)
+                        if origin_coords is None or dest_coords is None:
+                            continue
+                        
+                        failure = next(
+                            (c for c in (origin_coords, dest_coords) if isinstance(c, Exception)),
+                            None
+                        )
+                        if failure is not None:
+                            item = trips.pop(index)[0]
+                            yield item_line(index, item, error=str(failure))
+                            continue
+                        
+                        pair = (origin_coords['lat'], origin_coords['lng'],
+                                dest_coords['lat'], dest_coords['lng'])
+                        if pair not in route_waiting:
+                            route_waiting[pair] = []
+                            route_future = executor.submit(get_route, origin_coords, dest_coords)
+                            route_futures[route_future] = pair
+                            pending.add(route_future)
+                            summary['route_calls'] += 1
+                        route_waiting[pair].append(index)
+                else:
+                    pair = route_futures.pop(future)
+                    try:
+                        route_data = future.result()
+                        failure = None
+                    except Exception as e:
+                        route_data, failure = None, e
+                    
+                    for index in route_waiting.pop(pair):
+                        origin_coords, dest_coords = trip_coords(index)
+                        item, origin, destination, frequency = trips.pop(index)
+                        if failure is not None:
+                            yield item_line(index, item, error=str(failure))
+                            continue
+                        try:
+                            result = build_result(origin, destination, origin_coords,
+                                                  dest_coords, route_data, frequency)
+                        except Exception as e:
+                            yield item_line(index, item, error=f'Erro ao calcular rota: {str(e)}')
+                            continue
+                        yield item_line(index, item, result=result)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    yield {'summary': summary}
+
+def rate_limited_response(error):
+    """
+    Resposta HTTP 429 com Retry-After para RateLimitExceeded
+    """
+    response = jsonify({'error': str(error), 'retry_after': error.retry_after})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
+
+def collect_app_metrics():
+    """
+    Métricas lidas dos caches, do single-flight e do limitador a cada coleta
+    """
+    caches = {'geocode': geocode_cache.stats(), 'route': route_cache.stats(),
+              'response': response_cache.stats()}
+    flights = {'threaded': upstream_flight.stats(), 'async': async_upstream_flight.stats()}
+    quota = maps_client.quota_stats()
+    
+    yield ('ecorouter_cache_lookups_total', 'counter', 'Consultas aos caches por resultado', [
+        ({'cache': name, 'result': result}, stats[result])
+        for name, stats in caches.items()
+        for result in ('memory_hits', 'disk_hits', 'misses')
+    ])
+    yield ('ecorouter_cache_hit_ratio', 'gauge', 'Fração de consultas atendidas pelo cache', [
+        ({'cache': name}, stats['hit_ratio']) for name, stats in caches.items()
+    ])
+    yield ('ecorouter_cache_memory_entries', 'gauge', 'Entradas no LRU em memória', [
+        ({'cache': name}, stats['memory_size']) for name, stats in caches.items()
+    ])
+    yield ('ecorouter_singleflight_coalesced_total', 'counter', 'Chamadas coalescidas', [
+        ({'mode': mode}, stats['coalesced']) for mode, stats in flights.items()
+    ])
+    if quota:
+        yield ('ecorouter_quota_requests_total', 'counter', 'Tokens do limite de taxa por resultado', [
+            ({'api': api, 'result': result}, stats[result])
+            for api, stats in quota.items()
+            for result in ('granted', 'delayed', 'shed')
+        ])
+        yield ('ecorouter_quota_used_today', 'gauge', 'Chamadas consumidas da cota do dia', [
+            ({'api': api}, stats['used_today']) for api, stats in quota.items()
+        ])
+
+metrics.REGISTRY.register_collector(collect_app_metrics)
+
+# Prontidão do processo (GET /healthz): pronto quando os caches estão aquecidos
+_ready = threading.Event()
+_worker_pid = None
+_worker_lock = threading.Lock()
+warm_up_stats = {}
+
+def warm_up_worker():
+    """
+    Carrega as entradas recentes dos caches em disco para a memória e cria os
+    componentes opcionais (elevação) fora do caminho das requisições
+    """
+    started = time.perf_counter()
+    try:
+        warm_up_stats['entries'] = {
+            'geocode': geocode_cache.warm_up(),
+            'route': route_cache.warm_up(),
+            'corridor_index': corridor_index.warm_up()
+        }
+        get_elevation_service()
+    except Exception as e:
+        # Cache frio não impede o atendimento: as consultas vão ao disco/Google
+        warm_up_stats['error'] = str(e)
+    finally:
+        warm_up_stats['seconds'] = round(time.perf_counter() - started, 3)
+        _ready.set()
+
+def init_worker():
+    """
+    Inicializa o processo atual: gunicorn (post_fork), ASGI (lifespan) ou a
+    primeira requisição em qualquer outro servidor
+
+    O app pode ser importado no processo mestre (preload) e herdado pelo fork;
+    cada worker cria aqui os próprios pools de threads e aquece os caches em
+    segundo plano, aceitando conexões imediatamente. A sessão HTTP e as
+    conexões SQLite já são recriadas por processo (pid).
+    """
+    global _worker_pid, upstream_executor, refresh_executor
+    
+    with _worker_lock:
+        if _worker_pid == os.getpid():
+            return
+        # Threads não sobrevivem ao fork: pools de um processo pai já
+        # inicializado (e portanto possivelmente em uso) são recriados
+        if _worker_pid is not None:
+            upstream_executor = ThreadPoolExecutor(
+                max_workers=UPSTREAM_WORKERS, thread_name_prefix='upstream'
+            )
+            refresh_executor = ThreadPoolExecutor(
+                max_workers=ROUTE_REFRESH_WORKERS, thread_name_prefix='route-refresh'
+            )
+            _refreshing.clear()
+        _worker_pid = os.getpid()
+        
+        _ready.clear()
+        warm_up_stats.clear()
+        threading.Thread(target=warm_up_worker, name='warm-up', daemon=True).start()
+
+def create_app():
+    """
+    Entrada de produção do WSGI (gunicorn -c gunicorn.conf.py 'app:create_app()')
+    
+    Nunca em modo debug: o debugger do Werkzeug executa código arbitrário.
+    Os workers são inicializados por init_worker após o fork.
+    
+    Returns:
+        Flask: Aplicação configurada
+    """
+    app.debug = False
+    app.config['DEBUG'] = False
+    return app
+
+@app.before_request
+def start_request_metrics():
+    if _worker_pid != os.getpid():
+        init_worker()
+    request.environ['ecorouter.started'] = time.perf_counter()
+    if SERVER_TIMING:
+        request.environ['ecorouter.timings'] = metrics.start_request_timing()
+
+@app.after_request
+def record_request_metrics(response):
+    started = request.environ.get('ecorouter.started')
+    if started is None:
+        return response
+    
+    elapsed = time.perf_counter() - started
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, code=response.status_code)
+    
+    # Respostas em streaming (NDJSON) não têm tamanho conhecido aqui
+    if not response.is_streamed:
+        metrics.RESPONSE_BYTES.observe(response.calculate_content_length() or 0, endpoint=endpoint)
+    
+    timings = request.environ.get('ecorouter.timings')
+    if timings is not None:
+        response.headers['Server-Timing'] = metrics.server_timing_header(timings, elapsed)
+    
+    return response
+
 @app.route('/')
 def index():
     """Página inicial do EcoRouter"""
     return render_template('index.html')
 
+@app.route('/stats')
+def stats():
+    """
+    Métricas operacionais: caches e latência das APIs do Google Maps
+    """
+    return jsonify({
+        'geocode_cache': geocode_cache.stats(),
+        'route_cache': route_cache.stats(),
+        'corridor_index': corridor_index.stats(),
+        'response_cache': response_cache.stats(),
+        'upstream': maps_client.stats(),
+        'quota': maps_client.quota_stats(),
+        'route_refresh': dict(refresh_stats, in_flight=len(_refreshing)),
+        'singleflight': {
+            'threaded': upstream_flight.stats(),
+            'async': async_upstream_flight.stats()
+        }
+    })
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """
+    Métricas no formato texto do Prometheus
+    """
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/healthz')
+def healthz():
+    """
+    Prontidão do worker: 200 com os caches aquecidos, 503 enquanto aquecem
+    """
+    if not _ready.is_set():
+        return jsonify({'status': 'warming', 'pid': os.getpid()}), 503
+    return jsonify({'status': 'ready', 'pid': os.getpid(), 'warm_up': warm_up_stats})
+
 @app.route('/calculate', methods=['POST'])
 def calculate():
     """
     Endpoint para calcular rota ecológica usando EcoScore v4
     Usa APIs reais do Google Maps
     
+    Modo compacto: ?compact=1 ou Accept: application/vnd.ecorouter.compact+json
+    
     Returns:
-        JSON com dados da rota, EcoScore e economia
+        JSON (gzip/br conforme Accept-Encoding) com dados da rota, EcoScore e economia
     """
     try:
         # Receber dados do formulário
-        data = request.get_json()
-        origin = data.get('origin', '').strip()
-        destination = data.get('destination', '').strip()
-        frequency = int(data.get('frequency', 0))
+        compact = responses.wants_compact(request.args.get('compact'), request.headers.get('Accept'))
+        trip = prepare_calculate(request.get_json(), compact)
         
-        # Validações
-        if not origin or not destination:
-            return jsonify({'error': 'Por favor, preencha origem e destino'}), 400
-        
-        if frequency < 1 or frequency > 7:
-            return jsonify({'error': 'Frequência deve ser entre 1 e 7 vezes por semana'}), 400
-        
-        # Geocodificar endereços
-        origin_coords = geocode_address(origin)
-        dest_coords = geocode_address(destination)
+        # Repetição recente: corpo pronto, sem pipeline nem serialização
+        if trip['cached'] is not None:
+            return encoded_response(trip['cached'])
         
-        # Obter rotas do Google Maps
-        route_data = get_route(origin_coords, dest_coords)
+        if trip['precomputed'] is not None:
+            origin_coords, dest_coords, route_data = trip['precomputed']
+        else:
+            # Geocodificar endereços e paradas (em paralelo)
+            origin_coords, *waypoint_coords, dest_coords = geocode_many(
+                [trip['origin'], *trip['waypoints'], trip['destination']]
+            )
+            
+            # Obter rotas do Google Maps assim que todas as coordenadas estiverem prontas
+            route_data = get_route(
+                origin_coords, dest_coords, trip['departure_time'], waypoint_coords, trip['optimize_waypoints']
+            )
         
-        distance_standard = route_data['distance_standard']
-        distance_eco = route_data['distance_eco']
+        return encoded_response(finish_calculate(trip, origin_coords, dest_coords, route_data))
+    
+    except RateLimitExceeded as e:
+        return rate_limited_response(e)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Erro ao calcular rota: {str(e)}'}), 500
+
+@app.route('/calculate/sweep', methods=['POST'])
+def calculate_sweep():
+    """
+    Endpoint para encontrar o horário de partida mais verde
+    
+    Corpo: {origin, destination, start?, end?, interval_minutes?}
+    (timestamps Unix; padrão: de agora até 3 horas depois)
+    
+    Returns:
+        JSON com a curva de EcoScore e CO₂ por horário e o melhor horário
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        origin = str(data.get('origin', '')).strip()
+        destination = str(data.get('destination', '')).strip()
         
-        # Extrair análise com EcoScore
-        analysis = route_data['analysis']
-        ecoscore_eco = analysis['ecoscore_eco']
+        if not origin or not destination:
+            return jsonify({'error': 'Origem e destino são obrigatórios'}), 400
         
-        # Calcular emissões com EcoScore dinâmico
-        emissions = calculate_emissions(
-            distance_standard,
-            distance_eco,
-            ecoscore_eco,
-            frequency
-        )
+        departures = sweep_window(data.get('start'), data.get('end'), data.get('interval_minutes'))
         
-        # Mensagem de impacto
-        impact_message = get_impact_message(emissions['savings'])
+        started = time.monotonic()
+        origin_coords, dest_coords = geocode_many([origin, destination])
+        remaining = max(0.0, SWEEP_DEADLINE - (time.monotonic() - started))
+        curve = sweep_departures(origin_coords, dest_coords, departures, deadline=remaining)
         
-        # Preparar resposta
+        ranked = [p for p in curve if p['status'] == 'ok']
         result = {
             'origin': origin_coords.get('address', origin),
             'destination': dest_coords.get('address', destination),
-            'origin_coords': {'lat': origin_coords['lat'], 'lng': origin_coords['lng']},
-            'dest_coords': {'lat': dest_coords['lat'], 'lng': dest_coords['lng']},
-            'distance_standard': round(distance_standard, 2),
-            'distance_eco': round(distance_eco, 2),
-            'duration_standard': round(route_data['duration_standard'], 0),
-            'duration_eco': round(route_data['duration_eco'], 0),
-            'frequency': frequency,
-            'emissions': emissions,
-            'impact_message': impact_message,
-            'eco_polyline': route_data.get('polyline', ''),
-            'analysis_message': analysis.get('message', ''),
-            'ecoscore': {
-                'eco': analysis['ecoscore_eco'],
-                'standard': analysis['ecoscore_std'],
-                'difference': analysis['ecoscore_difference'],
-                'eco_details': analysis['eco_details']
+            'best': min(ranked, key=lambda p: p['rank']) if ranked else None,
+            'curve': curve,
+            'ecoscore_version': SCORING_VERSION,
+            'summary': {
+                'points': len(curve),
+                'ok': len(ranked),
+                'timeout': sum(1 for p in curve if p['status'] == 'timeout'),
+                'errors': sum(1 for p in curve if p['status'] == 'error'),
+                'elapsed_ms': round((time.monotonic() - started) * 1000, 1)
             }
         }
         
-        return jsonify(result)
+        with metrics.stage('serialize'):
+            return jsonify(result)
     
+    except RateLimitExceeded as e:
+        return rate_limited_response(e)
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
-        return jsonify({'error': f'Erro ao calcular rota: {str(e)}'}), 500
+        return jsonify({'error': f'Erro ao calcular horários: {str(e)}'}), 500
+
+@app.route('/calculate/matrix', methods=['POST'])
+def calculate_matrix():
+    """
+    Endpoint para avaliar muitas origens × muitos destinos (depósitos e
+    clientes, casas e escritórios)
+    
+    Corpo: {origins: [...], destinations: [...], frequency, top_k?, departure_time?}
+    
+    Returns:
+        JSON com os destinos de cada origem em ordem de pré-classificação;
+        os top_k de cada origem trazem o resultado completo de /calculate
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        origins = data.get('origins')
+        destinations = data.get('destinations')
+        frequency = int(data.get('frequency', 0))
+        top_k = int(data.get('top_k', MATRIX_TOP_K))
+        departure_time = parse_departure_time(data.get('departure_time'))
+        
+        for name, addresses in (('origins', origins), ('destinations', destinations)):
+            if (not isinstance(addresses, list) or not addresses
+                    or not all(isinstance(a, str) and a.strip() for a in addresses)):
+                return jsonify({'error': f'Envie uma lista de endereços em "{name}"'}), 400
+        
+        if len(origins) * len(destinations) > MATRIX_MAX_ELEMENTS:
+            return jsonify({'error': f'Máximo de {MATRIX_MAX_ELEMENTS} pares origem × destino'}), 400
+        
+        if frequency < 1 or frequency > 7:
+            return jsonify({'error': 'Frequência deve ser entre 1 e 7 vezes por semana'}), 400
+        
+        result = score_matrix(
+            [a.strip() for a in origins], [a.strip() for a in destinations],
+            frequency, top_k=max(0, top_k), departure_time=departure_time
+        )
+        
+        with metrics.stage('serialize'):
+            return jsonify(result)
+    
+    except RateLimitExceeded as e:
+        return rate_limited_response(e)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Erro ao calcular matriz: {str(e)}'}), 500
+
+@app.route('/emissions/bulk', methods=['POST'])
+def emissions_bulk():
+    """
+    Endpoint para totais anuais de emissões de uma frota ou cenário
+    
+    Corpo em colunas (listas do mesmo tamanho): distance_standard, distance_eco,
+    ecoscore_eco, frequency (lista ou número), fuel e fuel_price (opcionais;
+    lista ou valor único)
+    
+    Returns:
+        JSON com os totais somados em todas as linhas
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Envie as colunas em um objeto JSON'}), 400
+    
+    try:
+        columns = [data.get(name) for name in ('distance_standard', 'distance_eco', 'ecoscore_eco')]
+        if not all(isinstance(column, list) for column in columns):
+            raise ValueError("distance_standard, distance_eco e ecoscore_eco devem ser listas")
+        if len(columns[0]) > BULK_MAX_ROWS:
+            raise ValueError(f"Máximo de {BULK_MAX_ROWS} linhas por chamada")
+        
+        totals = emissions.bulk_emissions(
+            *columns,
+            data.get('frequency', 1),
+            fuel=data.get('fuel'),
+            fuel_price=data.get('fuel_price')
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Versão da configuração (faixas de emissão) usada nos totais
+    return jsonify(dict(totals, ecoscore_version=SCORING_VERSION))
+
+@app.route('/calculate/batch', methods=['POST'])
+def calculate_batch():
+    """
+    Endpoint para calcular vários deslocamentos de uma vez (frotas, matriz de deslocamentos)
+    
+    Corpo: lista de {origin, destination, frequency, id?} ou {"items": [...]}
+    
+    Returns:
+        NDJSON (uma linha por item, na ordem em que ficam prontos) e uma
+        linha final com o resumo do lote
+    """
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else data
+    
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Envie uma lista de deslocamentos em "items"'}), 400
+    
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({'error': f'Máximo de {BATCH_MAX_ITEMS} deslocamentos por lote'}), 400
+    
+    def generate():
+        for line in iter_batch_results(items):
+            yield json.dumps(line, ensure_ascii=False) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.cli.command('warm-geocode')
+@click.argument('addresses_file', type=click.File('r', encoding='utf-8'))
+def warm_geocode(addresses_file):
+    """
+    Pré-aquece o cache de geocodificação com endereços frequentes
+    
+    Uso: flask --app app warm-geocode enderecos.txt (um endereço por linha)
+    """
+    loaded, failed = 0, 0
+    for line in addresses_file:
+        address = line.strip()
+        if not address or address.startswith('#'):
+            continue
+        try:
+            geocode_address(address)
+            loaded += 1
+        except ValueError as e:
+            failed += 1
+            click.echo(f"⚠️  {e}", err=True)
+    
+    click.echo(f"✓ {loaded} endereços em cache ({failed} falhas)")
+    click.echo(f"  {geocode_cache.stats()}")
+
+@app.cli.command('precompute-corridors')
+@click.option('--corridors', 'corridors_file', type=click.Path(exists=True, dir_okay=False),
+              help='Arquivo com uma linha "origem | destino" por corredor')
+@click.option('--log', 'log_paths', multiple=True, type=click.Path(exists=True, dir_okay=False),
+              help='Registro de requisições (CORRIDOR_LOG_PATH) para aprender os corredores')
+@click.option('--top', type=int, default=CORRIDOR_TOP, show_default=True)
+@click.option('--min-count', type=int, default=2, show_default=True)
+@click.option('--departures', default=CORRIDOR_DEPARTURES, show_default=True,
+              help='Horários de partida, ex.: "06:30-09:30,12:00"')
+@click.option('--workers', type=int, default=4, show_default=True)
+def precompute_corridors(corridors_file, log_paths, top, min_count, departures, workers):
+    """
+    Pré-calcula os corredores mais pedidos em vários horários de partida
+    
+    Uso: flask --app app precompute-corridors --log requisicoes.jsonl
+    """
+    if not corridor_index.disk:
+        raise click.ClickException("CORRIDOR_INDEX_PATH não configurado")
+    
+    corridors = read_corridors_file(corridors_file) if corridors_file else []
+    if log_paths or (not corridors and corridor_log.path and os.path.exists(corridor_log.path)):
+        corridors += learn_corridors(log_paths or [corridor_log.path], top=top, min_count=min_count)
+    corridors = list(dict.fromkeys(corridors))[:top]
+    if not corridors:
+        raise click.ClickException("Nenhum corredor: use --corridors ou --log")
+    
+    try:
+        times = next_departures(departures, corridor_index.bucket_minutes)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    
+    # Pool próprio: precompute_corridor já usa upstream_executor na geocodificação
+    stored, failed = 0, 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='precompute') as pool:
+        futures = {
+            pool.submit(precompute_corridor, origin, destination, departure): (origin, destination)
+            for origin, destination in corridors
+            for departure in times
+        }
+        for future in futures:
+            try:
+                future.result()
+                stored += 1
+            except Exception as e:
+                failed += 1
+                origin, destination = futures[future]
+                click.echo(f"⚠️  {origin} → {destination}: {e}", err=True)
+    
+    click.echo(f"✓ {stored} resultados pré-calculados ({len(corridors)} corredores × "
+               f"{len(times)} horários, {failed} falhas)")
+    click.echo(f"  {corridor_index.stats()}")
+
+@app.cli.command('reweight-corridors')
+def reweight_corridors():
+    """
+    Repesa o índice de corredores com a configuração de EcoScore atual
+    
+    Só a soma ponderada é refeita, a partir dos scores por fator guardados:
+    sem chamar o Google. A validade das entradas é mantida; entradas sem
+    scores por fator são removidas (serão pré-calculadas de novo).
+    
+    Uso: flask --app app reweight-corridors
+    """
+    if not corridor_index.disk:
+        raise click.ClickException("CORRIDOR_INDEX_PATH não configurado")
+    
+    updated, current, removed = 0, 0, 0
+    for key, entry, expires_at in list(corridor_index.disk.items()):
+        route_data = reweight_route_data(entry['route_data'])
+        if route_data is entry['route_data']:
+            current += 1
+        elif route_data is None:
+            corridor_index.disk.delete(key)
+            removed += 1
+        else:
+            corridor_index.disk.set(key, dict(entry, route_data=route_data), expires_at=expires_at)
+            updated += 1
+    
+    click.echo(f"✓ {updated} resultados repesados para a versão {SCORING_VERSION} "
+               f"({current} já atualizados, {removed} removidos)")
+
+@app.cli.command('profile-token')
+def profile_token():
+    """
+    Gera o cabeçalho X-EcoRouter-Profile (válido por 5 minutos)
+    
+    Uso: curl -H "X-EcoRouter-Profile: $(flask --app app profile-token)" ...
+    """
+    if not PROFILE_SECRET:
+        raise click.ClickException("PROFILE_SECRET não configurado")
+    click.echo(profiling.make_token(PROFILE_SECRET))
+
+# Profiling sob demanda: por amostragem (PROFILE_ENABLED) e/ou por cabeçalho
+# assinado (PROFILE_SECRET). Desligado, o middleware nem é instalado.
+PROFILE_ENABLED = os.getenv('PROFILE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+PROFILE_SECRET = os.getenv('PROFILE_SECRET', '')
+if PROFILE_ENABLED or PROFILE_SECRET:
+    app.wsgi_app = profiling.ProfilingMiddleware(
+        app.wsgi_app,
+        directory=os.getenv('PROFILE_DIR', 'profiles'),
+        sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', 0.01)) if PROFILE_ENABLED else 0.0,
+        secret=PROFILE_SECRET,
+        profiler=os.getenv('PROFILE_FORMAT', 'cprofile'),
+        paths=os.getenv('PROFILE_PATHS', '/calculate').split(',')
+    )
 
 if __name__ == '__main__':
-    # Rodar servidor Flask em modo debug
+    # Servidor de desenvolvimento; em produção use gunicorn (gunicorn.conf.py)
+    debug = os.getenv('FLASK_DEBUG', 'false').lower() in ('1', 'true', 'yes')
+    
+    # Carregar entradas recentes do disco para a memória
+    _worker_pid = os.getpid()
+    warm_up_worker()
+    
     print("\n" + "="*60)
     print("🌍 EcoRouter - Sistema de Rotas Ecológicas")
     print("="*60)
     print("🚀 Servidor rodando em: http://127.0.0.1:5000")
+    print(f"🔧 Modo debug: {'ligado (FLASK_DEBUG)' if debug else 'desligado'}")
     print("💚 Pressione Ctrl+C para parar o servidor")
     print("="*60 + "\n")
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=debug, host='0.0.0.0', port=int(os.getenv('PORT', 5000)))
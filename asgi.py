@@ -0,0 +1,266 @@
+"""
+EcoRouter - Modo de serviço assíncrono (ASGI)
+O pipeline de /calculate roda no event loop com httpx (pool de conexões),
+então poucos processos atendem milhares de requisições aguardando o Google.
+As demais rotas continuam sendo servidas pelo app Flask (via WsgiToAsgi).
+
+Uso:
+    uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 2
+
+O modo síncrono (python app.py / WSGI) continua disponível.
+"""
+
+import asyncio
+import json
+import time
+from urllib.parse import parse_qs
+
+import httpx
+from asgiref.wsgi import WsgiToAsgi
+
+import app as ecorouter
+import metrics
+import responses
+from ratelimit import RateLimitExceeded
+
+flask_application = WsgiToAsgi(ecorouter.app)
+
+# Limite do corpo aceito em /calculate (bytes)
+MAX_BODY_SIZE = 64 * 1024
+
+
+@metrics.timed('geocode')
+async def geocode_address(address):
+    """
+    Versão assíncrona de app.geocode_address (mesmo cache)
+    """
+    if not ecorouter.GOOGLE_MAPS_API_KEY:
+        raise ValueError("GOOGLE_MAPS_API_KEY não configurada")
+
+    # Caches em SQLite (e o limitador de taxa em arquivo) fazem I/O bloqueante:
+    # rodam em uma thread para não travar o event loop
+    cached = await asyncio.to_thread(ecorouter.geocode_cache.get, address)
+    if cached is not None:
+        return cached
+
+    # Requisições simultâneas do mesmo endereço compartilham uma chamada
+    return await ecorouter.async_upstream_flight.do(
+        ecorouter.geocode_flight_key(address), _geocode_uncached, address
+    )
+
+
+async def _geocode_uncached(address):
+    try:
+        data = await ecorouter.maps_client.aget_json('geocode', {'address': address})
+    except httpx.HTTPError as e:
+        raise ValueError(f"Erro ao geocodificar {address}: {str(e)}")
+
+    result = ecorouter.parse_geocode_response(address, data)
+    await asyncio.to_thread(ecorouter.geocode_cache.set, address, result)
+
+    return result
+
+
+@metrics.timed('directions')
+async def fetch_directions(origin_coords, dest_coords, departure_time=None, waypoints=None, optimize_waypoints=False):
+    """
+    Versão assíncrona de app.fetch_directions (mesmo cache de rotas)
+
+    Returns:
+        tuple: (payload bruto da Directions API, freshness)
+    """
+    if not ecorouter.GOOGLE_MAPS_API_KEY:
+        raise ValueError("GOOGLE_MAPS_API_KEY não configurada")
+
+    stops = (waypoints, optimize_waypoints)
+    cached = await asyncio.to_thread(
+        ecorouter.route_cache.lookup, origin_coords, dest_coords, departure_time, *stops
+    )
+    if cached is not None:
+        # Rota stale: servida na hora, atualizada pelo pool de refresh
+        if cached[1]['status'] == 'stale':
+            ecorouter.schedule_refresh(origin_coords, dest_coords, departure_time, *stops)
+        return cached
+
+    # Requisições simultâneas do mesmo corredor compartilham uma chamada
+    data = await ecorouter.async_upstream_flight.do(
+        ecorouter.directions_flight_key(origin_coords, dest_coords, departure_time, *stops),
+        _fetch_directions_uncached, origin_coords, dest_coords, departure_time, *stops
+    )
+    return data, {'status': 'fresh', 'age_seconds': 0}
+
+
+async def _fetch_directions_uncached(origin_coords, dest_coords, departure_time=None, waypoints=None, optimize_waypoints=False):
+    try:
+        data = await ecorouter.maps_client.aget_json('directions', ecorouter.directions_params(
+            origin_coords, dest_coords, departure_time, waypoints, optimize_waypoints
+        ))
+    except httpx.HTTPError as e:
+        raise ValueError(f"Erro ao calcular rota: {str(e)}")
+
+    await asyncio.to_thread(ecorouter.store_directions, origin_coords, dest_coords, data,
+                            departure_time, waypoints, optimize_waypoints)
+
+    return data
+
+
+async def get_route(origin_coords, dest_coords, departure_time=None, waypoints=None, optimize_waypoints=False):
+    """
+    Versão assíncrona de app.get_route
+    """
+    data, freshness = await fetch_directions(
+        origin_coords, dest_coords, departure_time, waypoints, optimize_waypoints
+    )
+
+    # EcoScore (CPU) e elevação (I/O bloqueante): em uma thread
+    route_data = await asyncio.to_thread(ecorouter.build_route_data, data)
+
+    route_data['freshness'] = freshness
+    return route_data
+
+
+async def calculate(data, compact=False):
+    """
+    Pipeline assíncrono de /calculate: as etapas antes e depois da busca da
+    rota são as do modo WSGI (app.prepare_calculate e app.finish_calculate)
+
+    Args:
+        data: Corpo JSON da requisição
+        compact: Modo compacto (app.compact_result)
+
+    Returns:
+        tuple: (status HTTP, corpo da resposta: dict de erro ou
+               responses.EncodedResponse)
+    """
+    try:
+        # Log de corredores, response_cache e índice de corredores (disco/SQLite)
+        trip = await asyncio.to_thread(ecorouter.prepare_calculate, data, compact)
+
+        # Repetição recente: corpo pronto, sem pipeline nem serialização
+        if trip['cached'] is not None:
+            return 200, trip['cached']
+
+        if trip['precomputed'] is not None:
+            origin_coords, dest_coords, route_data = trip['precomputed']
+        else:
+            # Geocodificar endereços e paradas (em paralelo)
+            origin_coords, *waypoint_coords, dest_coords = await asyncio.gather(
+                *(geocode_address(address)
+                  for address in [trip['origin'], *trip['waypoints'], trip['destination']])
+            )
+
+            route_data = await get_route(
+                origin_coords, dest_coords, trip['departure_time'], waypoint_coords,
+                trip['optimize_waypoints']
+            )
+
+        return 200, ecorouter.finish_calculate(trip, origin_coords, dest_coords, route_data)
+
+    except RateLimitExceeded as e:
+        return 429, {'error': str(e), 'retry_after': e.retry_after}
+    except ValueError as e:
+        return 400, {'error': str(e)}
+    except Exception as e:
+        return 500, {'error': f'Erro ao calcular rota: {str(e)}'}
+
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if len(body) > MAX_BODY_SIZE:
+            raise ValueError('Requisição muito grande')
+        if not message.get('more_body'):
+            return body
+
+
+async def send_json(send, status, payload, started=None, timings=None, accept_encoding=None):
+    """
+    Envia um dict (serializado aqui) ou um responses.EncodedResponse pronto,
+    na codificação aceita pelo cliente
+    """
+    if isinstance(payload, responses.EncodedResponse):
+        encoded = payload
+    else:
+        with metrics.stage('serialize'):
+            encoded = responses.EncodedResponse(payload)
+    encoding, body = encoded.encoded(responses.negotiate_encoding(accept_encoding))
+
+    headers = [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(body)).encode()),
+        (b'vary', b'Accept, Accept-Encoding')
+    ]
+    if encoding:
+        headers.append((b'content-encoding', encoding.encode()))
+    if status == 429:
+        headers.append((b'retry-after', str(payload['retry_after']).encode()))
+
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        metrics.REQUEST_SECONDS.observe(elapsed, endpoint='/calculate', code=status)
+        metrics.RESPONSE_BYTES.observe(len(body), endpoint='/calculate')
+        if timings is not None:
+            headers.append((b'server-timing', metrics.server_timing_header(timings, elapsed).encode()))
+
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': headers
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def handle_calculate(scope, receive, send):
+    started = time.perf_counter()
+    timings = metrics.start_request_timing() if ecorouter.SERVER_TIMING else None
+
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1')
+               for name, value in scope.get('headers', [])}
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    compact = responses.wants_compact((query.get('compact') or [''])[0], headers.get('accept'))
+
+    try:
+        body = await read_body(receive)
+    except ValueError as e:
+        return await send_json(send, 413, {'error': str(e)})
+
+    try:
+        data = json.loads(body or b'{}')
+    except ValueError:
+        return await send_json(send, 400, {'error': 'JSON inválido'})
+
+    if not isinstance(data, dict):
+        return await send_json(send, 400, {'error': 'JSON inválido'})
+
+    status, payload = await calculate(data, compact)
+    await send_json(send, status, payload, started, timings, headers.get('accept-encoding'))
+
+
+async def handle_lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Pools do processo e aquecimento dos caches em segundo plano
+            # (GET /healthz responde 200 quando terminar)
+            ecorouter.init_worker()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await ecorouter.maps_client.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    """
+    Aplicação ASGI: /calculate assíncrono, demais rotas pelo Flask
+    """
+    if scope['type'] == 'lifespan':
+        return await handle_lifespan(receive, send)
+
+    if (scope['type'] == 'http' and scope['path'] == '/calculate'
+            and scope['method'] == 'POST'):
+        return await handle_calculate(scope, receive, send)
+
+    return await flask_application(scope, receive, send)
@@ -0,0 +1,56 @@
+"""
+Leitura, gravação e comparação do baseline dos benchmarks (baseline.json)
+
+O arquivo tem uma seção por script ('micro', 'load'), cada uma com um
+dicionário de cenários → métricas. Ao gravar, apenas o cenário medido é
+substituído.
+"""
+
+import json
+import os
+import platform
+import time
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def load(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save(section, scenario, results, path=BASELINE_PATH):
+    data = load(path)
+    data.setdefault(section, {})[scenario] = dict(
+        results,
+        recorded_at=time.strftime('%Y-%m-%d'),
+        machine=f"{platform.machine()} {platform.python_implementation()} {platform.python_version()}"
+    )
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(section, scenario, results, lower_is_better, path=BASELINE_PATH):
+    """
+    Imprime a variação de cada métrica em relação ao baseline
+
+    Args:
+        lower_is_better: Métricas em que um valor menor é melhora (latência, CPU)
+    """
+    reference = load(path).get(section, {}).get(scenario)
+    if not reference:
+        print(f"  (sem baseline para '{scenario}'; grave com --save-baseline)")
+        return
+
+    print(f"  Comparado ao baseline de {reference.get('recorded_at', '?')} ({reference.get('machine', '?')}):")
+    for name, value in results.items():
+        before = reference.get(name)
+        if not isinstance(value, (int, float)) or not isinstance(before, (int, float)) or not before:
+            continue
+        change = (value - before) / before * 100
+        better = change < 0 if name in lower_is_better else change > 0
+        flag = 'melhor' if better else 'pior'
+        print(f"    {name:<36} {before:>10.3f} -> {value:>10.3f}  ({change:+.1f}%, {flag})")
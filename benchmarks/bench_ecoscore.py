@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks do cálculo do EcoScore sobre as respostas gravadas em
+benchmarks/fixtures/directions.json
+
+Mede analyze_routes, calculate_ecoscore, normalize_factor e, com NumPy,
+ecoscore_engine.score_routes. Com --save-baseline grava os tempos em
+benchmarks/baseline.json; nas execuções seguintes imprime a variação.
+
+Uso: python benchmarks/bench_ecoscore.py [--repeat 7] [--save-baseline]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+# Sem cache em disco nem chamadas externas durante o benchmark
+os.environ.setdefault('GEOCODE_CACHE_PATH', '')
+os.environ.setdefault('ROUTE_CACHE_PATH', '')
+os.environ.setdefault('CORRIDOR_INDEX_PATH', '')
+os.environ['ELEVATION_PROVIDER'] = 'none'
+
+import app  # noqa: E402
+import baseline  # noqa: E402
+import ecoscore_engine  # noqa: E402
+import emissions  # noqa: E402
+
+
+def bench(label, func, repeat, results):
+    """
+    Melhor tempo por chamada (µs), com número de iterações calibrado
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+    results[label] = round(best, 3)
+    print(f"  {label:<36} {best:10.2f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmarks do EcoScore')
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+
+    with open(os.path.join(BENCH_DIR, 'fixtures', 'directions.json'), encoding='utf-8') as f:
+        responses = json.load(f)
+
+    multi = [r for r in responses if len(r['routes']) > 2][0]
+    routes_data = [app.extract_route_factors(route, 0) for route in multi['routes']]
+    durations = [r['duration_min'] for r in routes_data]
+
+    print(f"\nEcoScore ({len(responses)} respostas gravadas, "
+          f"NumPy {'ativo' if ecoscore_engine.available() else 'indisponível'})\n")
+
+    results = {}
+    bench('analyze_routes (todas as fixtures)',
+          lambda: [app.analyze_routes(r) for r in responses], args.repeat, results)
+    bench('analyze_routes (3 rotas)', lambda: app.analyze_routes(multi), args.repeat, results)
+    bench('calculate_ecoscore (1 rota)',
+          lambda: app.calculate_ecoscore(multi['routes'][0], routes_data), args.repeat, results)
+    bench('normalize_factor (3 valores)',
+          lambda: app.normalize_factor(durations[0], durations, descending=True), args.repeat, results)
+    bench('extract_route_factors (1 rota)',
+          lambda: app.extract_route_factors(multi['routes'][0], 0), args.repeat, results)
+    if ecoscore_engine.available():
+        bench('score_routes (NumPy, 3 rotas)',
+              lambda: ecoscore_engine.score_routes(routes_data, app.ECOSCORE_WEIGHTS, app.FLUIDEZ_WEIGHTS),
+              args.repeat, results)
+
+    # Frota sintética: 10 mil deslocamentos (colunas)
+    fleet = [list(column) for column in zip(*(
+        (10 + i % 40, (10 + i % 40) * 0.9, (i * 7) % 100, 1 + i % 7) for i in range(10000)
+    ))]
+    bench('calculate_emissions (1 viagem)',
+          lambda: app.calculate_emissions(25.0, 22.5, 72.0, 5), args.repeat, results)
+    bench('bulk_emissions (10 mil viagens)',
+          lambda: emissions.bulk_emissions(*fleet), args.repeat, results)
+
+    print()
+    scenario = 'numpy' if ecoscore_engine.available() else 'python'
+    if args.save_baseline:
+        baseline.save('micro', scenario, results)
+        print(f"  Baseline '{scenario}' gravado em {baseline.BASELINE_PATH}")
+    else:
+        baseline.compare('micro', scenario, results, lower_is_better=set(results))
+    print()
+
+
+if __name__ == '__main__':
+    main()
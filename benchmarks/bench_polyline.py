@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark do módulo polyline
+
+Compara o decodificador ingênuo (ord() por caractere, listas de tuplas)
+com decode_array e decode_numpy, e mede encode/simplify.
+
+Uso: python benchmarks/bench_polyline.py [--points 5000] [--repeat 20]
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import polyline  # noqa: E402
+
+
+def decode_naive(encoded, precision=5):
+    """
+    Decodificador de referência: um ord() e uma lista de deltas por ponto
+    """
+    factor = 10 ** precision
+    points = []
+    index = lat = lng = 0
+
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        points.append((lat / factor, lng / factor))
+
+    return points
+
+
+def random_route(count, seed=42):
+    """
+    Trajeto sintético a partir de Sorocaba: direção que varia suavemente,
+    passos de ~10-40 m e pequeno ruído de GPS
+    """
+    rng = random.Random(seed)
+    lat, lng = -23.5015, -47.4526
+    heading = rng.uniform(0, 2 * math.pi)
+    points = []
+    for _ in range(count):
+        heading += rng.gauss(0, 0.15)
+        step = rng.uniform(0.0001, 0.0004)
+        lat += step * math.cos(heading) + rng.gauss(0, 0.00002)
+        lng += step * math.sin(heading) + rng.gauss(0, 0.00002)
+        points.append((lat, lng))
+    return points
+
+
+def bench(label, func, repeat, baseline=None):
+    best = min(timeit.repeat(func, number=1, repeat=repeat))
+    speedup = f"{baseline / best:6.1f}x" if baseline else '     -'
+    print(f"  {label:<28} {best * 1000:9.3f} ms  {speedup}")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do módulo polyline')
+    parser.add_argument('--points', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    encoded = polyline.encode(random_route(args.points))
+
+    # Sanidade: todos os decodificadores devem concordar
+    reference = decode_naive(encoded)
+    assert polyline.decode(encoded) == reference
+    if polyline.np is not None:
+        assert polyline.decode_numpy(encoded).tolist() == [list(p) for p in reference]
+
+    print(f"\nPolyline com {args.points} pontos ({len(encoded)} caracteres)\n")
+    naive = bench('decode_naive (referência)', lambda: decode_naive(encoded), args.repeat)
+    bench('decode (lista de tuplas)', lambda: polyline.decode(encoded), args.repeat, naive)
+    bench('decode_array', lambda: polyline.decode_array(encoded), args.repeat, naive)
+    if polyline.np is not None:
+        bench('decode_numpy', lambda: polyline.decode_numpy(encoded), args.repeat, naive)
+
+    print()
+    bench('encode', lambda: polyline.encode(reference), args.repeat)
+    for tolerance in (5, 20):
+        simplified = polyline.simplify(reference, tolerance)
+        bench(f'simplify ({tolerance} m -> {len(simplified)} pts)',
+              lambda: polyline.simplify(reference, tolerance), args.repeat)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Teste de carga de POST /calculate contra o mock local do Google Maps
+
+Sobe benchmarks/mock_google.py e o EcoRouter (WSGI: servidor do Flask com
+threads; ASGI: uvicorn) em subprocessos, com caches em diretório temporário,
+e dispara requisições concorrentes por um tempo fixo. Reporta RPS,
+latência p50/p95/p99, CPU do servidor por requisição e chamadas ao Google
+por requisição.
+
+Uso:
+    python benchmarks/loadgen.py --mode wsgi --concurrency 16 --duration 20
+    python benchmarks/loadgen.py --mode asgi --addresses 500 --save-baseline
+
+--addresses controla a taxa de acerto do cache: 0 usa só os endereços das
+fixtures (cache quente); valores altos forçam chamadas ao mock.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(BENCH_DIR, '..')
+
+import baseline  # noqa: E402
+
+
+def wait_until_ready(url, process, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Processo terminou ao iniciar: {' '.join(process.args)}")
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Tempo esgotado aguardando {url}")
+
+
+def process_cpu_seconds(pid):
+    """
+    CPU (usuário + sistema) consumida pelo processo, via /proc (Linux)
+
+    Returns:
+        float: Segundos de CPU ou None se indisponível
+    """
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+    except OSError:
+        return None
+    # utime e stime são os campos 14 e 15 (índices 11 e 12 após o nome)
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def percentile(samples, p):
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+
+def address_pool(size, seed):
+    with open(os.path.join(BENCH_DIR, 'fixtures', 'geocode.json'), encoding='utf-8') as f:
+        addresses = list(json.load(f))
+    rng = random.Random(seed)
+    streets = ['Rua XV de Novembro', 'Avenida Itavuvu', 'Rua da Penha', 'Avenida São Paulo',
+               'Rua Aparecida', 'Avenida Ipanema', 'Rua Barão de Tatuí', 'Avenida Dom Aguirre']
+    while len(addresses) < size:
+        addresses.append(f"{rng.choice(streets)}, {rng.randint(1, 4000)}, Sorocaba, SP")
+    return addresses
+
+
+def run_load(url, addresses, concurrency, duration, seed):
+    """
+    Dispara POST /calculate em `concurrency` threads por `duration` segundos
+
+    Returns:
+        tuple: (latências em ms ordenadas, contagem por status HTTP)
+    """
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        session = requests.Session()
+        local_latencies = []
+        local_statuses = {}
+        while time.monotonic() < stop_at:
+            origin, destination = rng.sample(addresses, 2)
+            started = time.perf_counter()
+            try:
+                response = session.post(url, json={
+                    'origin': origin, 'destination': destination, 'frequency': 5
+                }, timeout=30)
+                status = response.status_code
+            except requests.exceptions.RequestException:
+                status = 'erro'
+            local_latencies.append((time.perf_counter() - started) * 1000)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return sorted(latencies), statuses
+
+
+def upstream_requests(base_url):
+    stats = requests.get(f'{base_url}/stats', timeout=5).json()
+    return sum(endpoint['requests'] for endpoint in stats['upstream'].values())
+
+
+def start_servers(args, workdir):
+    mock = subprocess.Popen([
+        sys.executable, os.path.join(BENCH_DIR, 'mock_google.py'),
+        '--port', str(args.mock_port),
+        '--latency-ms', str(args.latency_ms),
+        '--jitter-ms', str(args.jitter_ms)
+    ], stdout=subprocess.DEVNULL)
+
+    env = dict(
+        os.environ,
+        GOOGLE_MAPS_API_KEY='benchmark',
+        GOOGLE_MAPS_BASE_URL=f'http://127.0.0.1:{args.mock_port}',
+        GEOCODE_CACHE_PATH=os.path.join(workdir, 'cache.sqlite3'),
+        ROUTE_CACHE_PATH=os.path.join(workdir, 'cache.sqlite3'),
+    )
+    if args.mode == 'asgi':
+        command = [sys.executable, '-m', 'uvicorn', 'asgi:application',
+                   '--port', str(args.port), '--log-level', 'warning']
+    else:
+        command = [sys.executable, '-m', 'flask', '--app', 'app', 'run',
+                   '--port', str(args.port), '--with-threads']
+    server = subprocess.Popen(command, cwd=ROOT_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return mock, server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga de POST /calculate')
+    parser.add_argument('--mode', choices=['wsgi', 'asgi'], default='wsgi')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20, help='Segundos de medição')
+    parser.add_argument('--warmup', type=float, default=3, help='Segundos de aquecimento (descartados)')
+    parser.add_argument('--addresses', type=int, default=0, help='Tamanho do conjunto de endereços')
+    parser.add_argument('--latency-ms', type=float, default=80)
+    parser.add_argument('--jitter-ms', type=float, default=30)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--mock-port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Grava o resultado em JSON')
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='ecorouter-bench-')
+    base_url = f'http://127.0.0.1:{args.port}'
+    mock, server = start_servers(args, workdir)
+
+    try:
+        wait_until_ready(f'http://127.0.0.1:{args.mock_port}/', mock)
+        wait_until_ready(f'{base_url}/stats', server)
+
+        addresses = address_pool(args.addresses, args.seed)
+        if args.warmup:
+            run_load(f'{base_url}/calculate', addresses, args.concurrency, args.warmup, args.seed + 1000)
+
+        cpu_before = process_cpu_seconds(server.pid)
+        upstream_before = upstream_requests(base_url)
+        started = time.monotonic()
+        latencies, statuses = run_load(
+            f'{base_url}/calculate', addresses, args.concurrency, args.duration, args.seed
+        )
+        elapsed = time.monotonic() - started
+        cpu_after = process_cpu_seconds(server.pid)
+        upstream_calls = upstream_requests(base_url) - upstream_before
+    finally:
+        for process in (server, mock):
+            process.terminate()
+            process.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    total = len(latencies)
+    results = {
+        'requests': total,
+        'rps': round(total / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50), 1),
+        'p95_ms': round(percentile(latencies, 0.95), 1),
+        'p99_ms': round(percentile(latencies, 0.99), 1),
+        'max_ms': round(latencies[-1], 1) if latencies else 0.0,
+        'error_rate': round(1 - statuses.get(200, 0) / total, 4) if total else 0.0,
+        'upstream_calls_per_request': round(upstream_calls / total, 3) if total else 0.0,
+    }
+    if cpu_before is not None and cpu_after is not None and total:
+        results['cpu_ms_per_request'] = round((cpu_after - cpu_before) * 1000 / total, 3)
+
+    scenario = (f"{args.mode}-c{args.concurrency}-a{args.addresses}"
+                f"-l{args.latency_ms:g}")
+    print(f"\nCarga {scenario}: {args.concurrency} clientes por {args.duration:g}s "
+          f"(mock {args.latency_ms:g}±{args.jitter_ms:g} ms)\n")
+    for name, value in results.items():
+        print(f"  {name:<28} {value}")
+    print(f"  {'status':<28} {statuses}\n")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(dict(results, scenario=scenario, statuses={str(k): v for k, v in statuses.items()}),
+                      f, indent=2)
+
+    if args.save_baseline:
+        baseline.save('load', scenario, results)
+        print(f"  Baseline '{scenario}' gravado em {baseline.BASELINE_PATH}\n")
+    else:
+        baseline.compare('load', scenario, results, lower_is_better={
+            'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'error_rate',
+            'cpu_ms_per_request', 'upstream_calls_per_request'
+        })
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita as APIs do Google Maps (Geocoding, Directions e
+Elevation) para benchmarks, sem chave e sem custo
+
+Responde com as respostas gravadas em benchmarks/fixtures/ (ou em um arquivo
+DIRECTIONS_ARCHIVE_PATH), com latência e jitter configuráveis. Endereços fora
+das fixtures recebem coordenadas determinísticas perto de Sorocaba, então o
+gerador de carga pode variar os endereços para medir o caminho sem cache.
+
+Uso:
+    python benchmarks/mock_google.py --port 8765 --latency-ms 80 --jitter-ms 30
+    GOOGLE_MAPS_BASE_URL=http://127.0.0.1:8765 python app.py
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import polyline  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def stable_hash(text):
+    return int.from_bytes(hashlib.sha1(text.encode('utf-8')).digest()[:8], 'big')
+
+
+def load_directions(path):
+    """
+    Carrega respostas da Directions API de um JSON (lista) ou de um arquivo
+    JSONL gravado com DIRECTIONS_ARCHIVE_PATH
+    """
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            return [json.loads(line)['directions'] for line in f if line.strip()]
+        return json.load(f)
+
+
+class Fixtures:
+    def __init__(self, directory=FIXTURES_DIR, directions_path=None):
+        with open(os.path.join(directory, 'geocode.json'), encoding='utf-8') as f:
+            self.geocode = {address.lower(): body for address, body in json.load(f).items()}
+        self.directions = [
+            json.dumps(body).encode('utf-8')
+            for body in load_directions(directions_path or os.path.join(directory, 'directions.json'))
+        ]
+
+    def geocode_body(self, address):
+        body = self.geocode.get(address.strip().lower())
+        if body is not None:
+            return json.dumps(body).encode('utf-8')
+
+        # Endereço desconhecido: posição determinística num raio de ~20 km
+        h = stable_hash(address)
+        lat = -23.5015 + ((h & 0xffff) / 0xffff - 0.5) * 0.36
+        lng = -47.4526 + (((h >> 16) & 0xffff) / 0xffff - 0.5) * 0.36
+        return json.dumps({
+            'status': 'OK',
+            'results': [{
+                'formatted_address': f'{address} - Sorocaba, SP, Brasil',
+                'geometry': {'location': {'lat': round(lat, 6), 'lng': round(lng, 6)}}
+            }]
+        }).encode('utf-8')
+
+    def directions_body(self, origin, destination, waypoints=''):
+        # O mesmo par sempre recebe a mesma resposta
+        if not waypoints:
+            return self.directions[stable_hash(f'{origin}|{destination}') % len(self.directions)]
+
+        # Com paradas: uma única rota, com uma leg (de fixture) por trecho
+        stops = waypoints.split('|')
+        optimize = stops[0] == 'optimize:true'
+        if optimize:
+            stops = stops[1:]
+        order = list(range(len(stops)))
+        if optimize:
+            order.reverse()  # Reordenação determinística
+
+        points = [origin] + [stops[i] for i in order] + [destination]
+        legs = []
+        for start, end in zip(points, points[1:]):
+            body = json.loads(self.directions_body(start, end))
+            leg = dict(body['routes'][0]['legs'][0], start_address=start, end_address=end)
+            leg.pop('duration_in_traffic', None)  # O Google não prevê trânsito com paradas
+            legs.append(leg)
+
+        return json.dumps({
+            'status': 'OK',
+            'routes': [{
+                'summary': 'Rota com paradas',
+                'legs': legs,
+                'waypoint_order': order,
+                'overview_polyline': body['routes'][0].get('overview_polyline', {})
+            }]
+        }).encode('utf-8')
+
+    def distance_matrix_body(self, origins, destinations):
+        # Distância em linha reta × 1,3 e velocidade média determinística por par
+        def point(text):
+            try:
+                lat, lng = (float(v) for v in text.split(','))
+            except ValueError:
+                location = json.loads(self.geocode_body(text))['results'][0]['geometry']['location']
+                lat, lng = location['lat'], location['lng']
+            return lat, lng
+
+        destination_points = [point(d) for d in destinations.split('|')]
+        rows = []
+        for origin in origins.split('|'):
+            lat1, lng1 = point(origin)
+            elements = []
+            for (lat2, lng2), destination in zip(destination_points, destinations.split('|')):
+                dlat, dlng = math.radians(lat2 - lat1), math.radians(lng2 - lng1)
+                a = (math.sin(dlat / 2) ** 2 +
+                     math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2)
+                meters = int(2 * 6371000 * math.asin(math.sqrt(a)) * 1.3) + 200
+                speed_kmh = 25 + stable_hash(f'{origin}|{destination}') % 50
+                elements.append({
+                    'status': 'OK',
+                    'distance': {'value': meters},
+                    'duration': {'value': int(meters / 1000 / speed_kmh * 3600) + 60}
+                })
+            rows.append({'elements': elements})
+        return json.dumps({'status': 'OK', 'rows': rows}).encode('utf-8')
+
+    def elevation_body(self, locations):
+        if locations.startswith('enc:'):
+            count = len(polyline.decode(locations[4:]))
+        else:
+            count = locations.count('|') + 1
+        h = stable_hash(locations)
+        return json.dumps({
+            'status': 'OK',
+            'results': [
+                {'elevation': 550 + 40 * ((h >> (i % 48)) & 1) + (i % 7)}
+                for i in range(count)
+            ]
+        }).encode('utf-8')
+
+
+def make_handler(fixtures, latency_ms, jitter_ms, error_rate, seed):
+    rng = random.Random(seed)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, como o Google
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+            delay = max(0.0, rng.gauss(latency_ms, jitter_ms)) / 1000 if jitter_ms else latency_ms / 1000
+            time.sleep(delay)
+
+            if error_rate and rng.random() < error_rate:
+                body = b'{"status": "OVER_QUERY_LIMIT", "results": [], "routes": []}'
+            elif url.path.endswith('/geocode/json'):
+                body = fixtures.geocode_body(query.get('address', ''))
+            elif url.path.endswith('/directions/json'):
+                body = fixtures.directions_body(
+                    query.get('origin', ''), query.get('destination', ''), query.get('waypoints', '')
+                )
+            elif url.path.endswith('/distancematrix/json'):
+                body = fixtures.distance_matrix_body(query.get('origins', ''), query.get('destinations', ''))
+            elif url.path.endswith('/elevation/json'):
+                body = fixtures.elevation_body(query.get('locations', ''))
+            else:
+                self.send_error(404)
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=UTF-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor local que imita as APIs do Google Maps')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=80, help='Latência média por resposta')
+    parser.add_argument('--jitter-ms', type=float, default=30, help='Desvio padrão da latência')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fração de respostas OVER_QUERY_LIMIT')
+    parser.add_argument('--fixtures', default=FIXTURES_DIR)
+    parser.add_argument('--directions', help='JSON ou JSONL (DIRECTIONS_ARCHIVE_PATH) com respostas gravadas')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    fixtures = Fixtures(args.fixtures, args.directions)
+    handler = make_handler(fixtures, args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+
+    print(f"Mock do Google Maps em http://{args.host}:{args.port} "
+          f"({len(fixtures.directions)} respostas da Directions API)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
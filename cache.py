@@ -0,0 +1,500 @@
+"""
+EcoRouter - Camada de cache
+Cache em dois níveis para respostas do Google Maps:
+- LRU em memória (por processo)
+- SQLite em disco (compartilhado entre processos e reinícios)
+"""
+
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_address(address):
+    """
+    Normaliza um endereço para uso como chave de cache
+
+    Args:
+        address (str): Endereço digitado pelo usuário
+
+    Returns:
+        str: Endereço em minúsculas, sem espaços/pontuação redundantes
+    """
+    normalized = re.sub(r'\s+', ' ', (address or '').strip().lower())
+    normalized = re.sub(r'\s*,\s*', ', ', normalized)
+    return normalized.strip(' ,.;')
+
+
+class LRUCache:
+    """
+    Cache LRU em memória com TTL por entrada (thread-safe)
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Retorna o valor armazenado ou None se ausente/expirado
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None, expires_at=None):
+        """
+        Armazena um valor, removendo o menos usado se o cache estiver cheio
+        """
+        if self.maxsize <= 0:
+            return
+
+        if expires_at is None:
+            ttl = self.ttl if ttl is None else ttl
+            expires_at = time.time() + ttl if ttl else None
+
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteStore:
+    """
+    Armazenamento chave/valor em SQLite com expiração
+
+    Cada thread (e cada processo, após fork) abre a sua própria conexão.
+    """
+
+    def __init__(self, path, table='cache'):
+        self.path = path
+        self.table = table
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            f'CREATE TABLE IF NOT EXISTS {self.table} ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+            'expires_at REAL, updated_at REAL NOT NULL)'
+        )
+        conn.commit()
+
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def encode(self, value):
+        return json.dumps(value)
+
+    def decode(self, raw):
+        return json.loads(raw)
+
+    def get(self, key):
+        """
+        Returns:
+            tuple: (valor, expires_at) ou None se ausente/expirado
+        """
+        row = self._connect().execute(
+            f'SELECT value, expires_at FROM {self.table} WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            return None
+
+        return self.decode(value), expires_at
+
+    def set(self, key, value, expires_at=None):
+        conn = self._connect()
+        conn.execute(
+            f'INSERT OR REPLACE INTO {self.table} (key, value, expires_at, updated_at) '
+            'VALUES (?, ?, ?, ?)',
+            (key, self.encode(value), expires_at, time.time())
+        )
+        conn.commit()
+
+    def delete(self, key):
+        conn = self._connect()
+        conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+        conn.commit()
+
+    def items(self, limit=None):
+        """
+        Itera sobre as entradas válidas, das mais recentes para as mais antigas
+
+        Yields:
+            tuple: (chave, valor, expires_at)
+        """
+        query = (
+            f'SELECT key, value, expires_at FROM {self.table} '
+            'WHERE expires_at IS NULL OR expires_at > ? ORDER BY updated_at DESC'
+        )
+        params = [time.time()]
+        if limit:
+            query += ' LIMIT ?'
+            params.append(int(limit))
+
+        for key, value, expires_at in self._connect().execute(query, params):
+            yield key, self.decode(value), expires_at
+
+    def purge_expired(self):
+        """
+        Remove entradas expiradas
+
+        Returns:
+            int: Número de entradas removidas
+        """
+        conn = self._connect()
+        cursor = conn.execute(
+            f'DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at <= ?',
+            (time.time(),)
+        )
+        conn.commit()
+        return cursor.rowcount
+
+
+class TwoTierCache:
+    """
+    Cache em dois níveis (LRU em memória + SQLite em disco) com contadores
+    """
+
+    def __init__(self, path=None, table='cache', ttl=3600, maxsize=1024):
+        self.ttl = ttl
+        self.memory = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.disk = SQLiteStore(path, table=table) if path else None
+        self._stats_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _count(self, counter):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get_key(self, key):
+        """
+        Busca uma chave no cache (memória primeiro, depois disco)
+
+        Returns:
+            Valor em cache ou None
+        """
+        value = self.memory.get(key)
+        if value is not None:
+            self._count('memory_hits')
+            return value
+
+        if self.disk is not None:
+            try:
+                item = self.disk.get(key)
+            except sqlite3.Error:
+                item = None
+            if item is not None:
+                value, expires_at = item
+                self.memory.set(key, value, expires_at=expires_at)
+                self._count('disk_hits')
+                return value
+
+        self._count('misses')
+        return None
+
+    def set_key(self, key, value, ttl=None):
+        """
+        Armazena um valor nos dois níveis
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+
+        self.memory.set(key, value, expires_at=expires_at)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value, expires_at=expires_at)
+            except sqlite3.Error:
+                pass  # Cache em disco é best-effort
+
+    def warm_up(self, limit=None):
+        """
+        Pré-carrega as entradas mais recentes do disco para a memória
+
+        Args:
+            limit (int): Máximo de entradas (padrão: capacidade do LRU)
+
+        Returns:
+            int: Número de entradas carregadas
+        """
+        if self.disk is None:
+            return 0
+
+        limit = limit or self.memory.maxsize
+        entries = list(self.disk.items(limit=limit))
+
+        # Inserir das mais antigas para as mais recentes (mantém ordem do LRU)
+        for key, value, expires_at in reversed(entries):
+            self.memory.set(key, value, expires_at=expires_at)
+
+        return len(entries)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Contadores de acertos/falhas e tamanho do cache
+        """
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+            'memory_size': len(self.memory)
+        }
+
+
+class GeocodeCache(TwoTierCache):
+    """
+    Cache de geocodificação
+
+    Chave: endereço normalizado. Valor: dict com lat/lng/address.
+    """
+
+    def __init__(self, path=None, ttl=30 * 24 * 3600, maxsize=4096):
+        super().__init__(path=path, table='geocode', ttl=ttl, maxsize=maxsize)
+
+    def get(self, address):
+        """
+        Args:
+            address (str): Endereço (normalizado internamente)
+
+        Returns:
+            dict: Coordenadas em cache ou None
+        """
+        return self.get_key(normalize_address(address))
+
+    def set(self, address, value):
+        self.set_key(normalize_address(address), value)
+
+
+def quantize_coords(lat, lng, grid_meters):
+    """
+    Ajusta coordenadas a uma grade de aproximadamente grid_meters
+
+    Args:
+        lat, lng: Coordenadas em graus
+        grid_meters: Tamanho da célula da grade em metros
+
+    Returns:
+        tuple: Índices (linha, coluna) da célula
+    """
+    lat_step = grid_meters / 111320
+    row = round(lat / lat_step)
+
+    # Longitude encolhe com o cosseno da latitude
+    lng_step = lat_step / max(math.cos(math.radians(row * lat_step)), 0.01)
+    col = round(lng / lng_step)
+
+    return row, col
+
+
+def time_bucket(timestamp, bucket_minutes):
+    """
+    Retorna o índice da faixa horária (hora local) de um timestamp
+    """
+    local = time.localtime(timestamp)
+    return (local.tm_hour * 60 + local.tm_min) // bucket_minutes
+
+
+def departure_slot(timestamp, bucket_minutes):
+    """
+    Faixa horária com a data local (ex.: "2026-10-17:16"): partidas em dias
+    diferentes não compartilham a mesma entrada de cache
+    """
+    return f"{time.strftime('%Y-%m-%d', time.localtime(timestamp))}:{time_bucket(timestamp, bucket_minutes)}"
+
+
+def has_traffic_data(payload):
+    """
+    Verifica se a resposta da Directions API contém duration_in_traffic
+    """
+    return any(
+        'duration_in_traffic' in leg
+        for route in payload.get('routes', [])
+        for leg in route.get('legs', [])
+    )
+
+
+def parse_freshness_windows(spec):
+    """
+    Interpreta janelas de validade por horário do dia
+
+    Args:
+        spec (str): Ex.: "07:00-10:00=120/900,17:00-20:00=120/900"
+                    (início-fim=fresco/máximo em segundos, hora local)
+
+    Returns:
+        list: [(minuto_inicial, minuto_final, fresh_seconds, max_stale_seconds)]
+    """
+    windows = []
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        try:
+            span, limits = item.split('=')
+            start, end = (
+                int(hour) * 60 + int(minute)
+                for hour, minute in (t.split(':') for t in span.split('-'))
+            )
+            fresh, max_stale = (int(value) for value in limits.split('/'))
+        except ValueError:
+            raise ValueError(f"Janela de validade inválida: {item!r} (use HH:MM-HH:MM=fresco/máximo)")
+        windows.append((start, end, fresh, max(fresh, max_stale)))
+    return windows
+
+
+class RouteCache(TwoTierCache):
+    """
+    Cache de respostas brutas da Directions API
+
+    Chave: origem/destino ajustados a uma grade + data e faixa horária da partida.
+    O payload bruto é armazenado para que o EcoScore possa ser recalculado.
+
+    Respostas com duration_in_traffic ficam frescas por traffic_ttl e,
+    depois disso, continuam sendo servidas como "stale" até max_stale
+    (stale-while-revalidate: o chamador dispara a atualização em segundo
+    plano). freshness_windows ajusta os dois limites por horário do dia.
+    """
+
+    def __init__(self, path=None, ttl=6 * 3600, traffic_ttl=300,
+                 grid_meters=50, bucket_minutes=30, maxsize=1024,
+                 max_stale=0, freshness_windows=()):
+        super().__init__(path=path, table='routes', ttl=ttl, maxsize=maxsize)
+        self.traffic_ttl = traffic_ttl
+        self.grid_meters = grid_meters
+        self.bucket_minutes = bucket_minutes
+        self.max_stale = max(traffic_ttl, max_stale)
+        self.freshness_windows = list(freshness_windows)
+        self.stale_hits = 0
+
+    def freshness_for(self, timestamp=None):
+        """
+        Limites de validade de respostas com tráfego no horário informado
+
+        Returns:
+            tuple: (segundos fresca, segundos máximos servindo stale)
+        """
+        local = time.localtime(timestamp or time.time())
+        minute = local.tm_hour * 60 + local.tm_min
+        for start, end, fresh, max_stale in self.freshness_windows:
+            # Janelas podem atravessar a meia-noite (ex.: 22:00-06:00)
+            inside = start <= minute < end if start <= end else minute >= start or minute < end
+            if inside:
+                return fresh, max_stale
+        return self.traffic_ttl, self.max_stale
+
+    def make_key(self, origin_coords, dest_coords, timestamp=None, waypoints=None, optimize=False):
+        """
+        Monta a chave do cache para um par origem/destino
+
+        Args:
+            origin_coords: Dict com lat/lng da origem
+            dest_coords: Dict com lat/lng do destino
+            timestamp: Horário de partida (padrão: agora)
+            waypoints: Paradas intermediárias (lista de lat/lng), em ordem
+            optimize: Paradas reordenadas pelo Google
+
+        Returns:
+            str: Chave do cache
+        """
+        origin = quantize_coords(origin_coords['lat'], origin_coords['lng'], self.grid_meters)
+        dest = quantize_coords(dest_coords['lat'], dest_coords['lng'], self.grid_meters)
+        # Com data: amanhã às 08:10 não reaproveita o tráfego ao vivo de hoje às 08:00
+        bucket = departure_slot(timestamp or time.time(), self.bucket_minutes)
+        key = f"{self.grid_meters}:{origin[0]}:{origin[1]}|{dest[0]}:{dest[1]}|{bucket}"
+        if waypoints:
+            stops = (quantize_coords(p['lat'], p['lng'], self.grid_meters) for p in waypoints)
+            key += '|' + ';'.join(f"{row}:{col}" for row, col in stops) + ('|opt' if optimize else '')
+        return key
+
+    def lookup(self, origin_coords, dest_coords, timestamp=None, waypoints=None, optimize=False):
+        """
+        Busca uma rota e informa se ela ainda está fresca
+
+        A validade é a do horário de partida pedido (a mesma usada por set),
+        não a do horário atual.
+
+        Returns:
+            tuple: (payload, {'status': 'fresh'|'stale', 'age_seconds': n}) ou None
+        """
+        entry = self.get_key(self.make_key(origin_coords, dest_coords, timestamp, waypoints, optimize))
+        if entry is None:
+            return None
+
+        # Entradas gravadas antes do stale-while-revalidate: payload puro
+        if 'payload' not in entry:
+            return entry, {'status': 'fresh', 'age_seconds': None}
+
+        now = time.time()
+        age = max(0, now - entry['fetched_at'])
+        fresh = self.freshness_for(timestamp)[0] if entry.get('traffic') else self.ttl
+
+        if age <= fresh:
+            status = 'fresh'
+        else:
+            status = 'stale'
+            self._count('stale_hits')
+
+        return entry['payload'], {'status': status, 'age_seconds': int(age)}
+
+    def get(self, origin_coords, dest_coords, timestamp=None):
+        """
+        Returns:
+            dict: Payload da Directions API em cache (fresco ou stale) ou None
+        """
+        entry = self.lookup(origin_coords, dest_coords, timestamp)
+        return entry[0] if entry is not None else None
+
+    def set(self, origin_coords, dest_coords, payload, timestamp=None, waypoints=None, optimize=False):
+        traffic = has_traffic_data(payload)
+        # Com tráfego, a entrada é mantida até o fim da janela stale do horário de partida
+        ttl = self.freshness_for(timestamp)[1] if traffic else self.ttl
+        entry = {'fetched_at': time.time(), 'traffic': traffic, 'payload': payload}
+        key = self.make_key(origin_coords, dest_coords, timestamp, waypoints, optimize)
+        self.set_key(key, entry, ttl=ttl)
+
+    def stats(self):
+        stats = super().stats()
+        stats['stale_hits'] = self.stale_hits
+        return stats
@@ -0,0 +1,185 @@
+"""
+EcoRouter - Índice pré-calculado de corredores frequentes
+A maior parte do tráfego repete poucas centenas de pares origem/destino.
+O job de pré-cálculo (flask --app app precompute-corridors) roda o pipeline
+completo desses corredores em vários horários de partida e grava o resultado
+aqui; /calculate consulta o índice antes de chamar o Google.
+
+- CorridorIndex: SQLite com JSON comprimido (zlib) + LRU em memória
+- CorridorLog: registro JSONL das requisições, de onde os corredores são aprendidos
+"""
+
+import gzip
+import json
+import threading
+import time
+import zlib
+from collections import Counter
+
+from cache import SQLiteStore, TwoTierCache, normalize_address, time_bucket
+
+
+class CompressedSQLiteStore(SQLiteStore):
+    """
+    SQLiteStore com valores em JSON comprimido (zlib)
+    """
+
+    def encode(self, value):
+        return zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'), 6)
+
+    def decode(self, raw):
+        return json.loads(zlib.decompress(raw))
+
+
+def corridor_key(origin, destination, slot):
+    return f"{normalize_address(origin)}|{normalize_address(destination)}|{slot}"
+
+
+class CorridorIndex(TwoTierCache):
+    """
+    Resultados pré-calculados por corredor (endereços normalizados) e faixa
+    horária de partida (mesma granularidade do cache de rotas)
+    """
+
+    def __init__(self, path=None, ttl=24 * 3600, bucket_minutes=30, maxsize=2048):
+        super().__init__(path=None, table='corridors', ttl=ttl, maxsize=maxsize)
+        self.disk = CompressedSQLiteStore(path, table='corridors') if path else None
+        self.bucket_minutes = bucket_minutes
+
+    def slot(self, departure_time=None):
+        return time_bucket(departure_time or time.time(), self.bucket_minutes)
+
+    def get(self, origin, destination, departure_time=None):
+        """
+        Returns:
+            dict: origin_coords, dest_coords, route_data e computed_at, ou None
+        """
+        if self.disk is None:
+            return None
+        return self.get_key(corridor_key(origin, destination, self.slot(departure_time)))
+
+    def set(self, origin, destination, departure_time, entry):
+        self.set_key(corridor_key(origin, destination, self.slot(departure_time)), entry)
+
+
+class CorridorLog:
+    """
+    Registro append-only (JSONL) dos corredores pedidos em /calculate
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, origin, destination, departure_time=None):
+        if not self.path:
+            return
+
+        line = json.dumps({
+            'ts': int(time.time()),
+            'origin': origin,
+            'destination': destination,
+            'departure_time': departure_time
+        }, ensure_ascii=False)
+
+        try:
+            with self._lock, open(self.path, 'a', encoding='utf-8') as log:
+                log.write(line + '\n')
+        except OSError:
+            pass  # Registro é best-effort
+
+
+def read_log(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def learn_corridors(paths, top=200, min_count=2, since=None):
+    """
+    Corredores mais pedidos nos registros de requisições
+
+    Args:
+        paths: Arquivos JSONL (ou .gz) de CorridorLog
+        top: Máximo de corredores
+        min_count: Mínimo de pedidos para um corredor ser considerado
+        since: Ignora registros anteriores a este timestamp
+
+    Returns:
+        list: [(origem, destino)] com a grafia mais frequente de cada endereço
+    """
+    counts = Counter()
+    spellings = {}
+
+    for path in paths:
+        for record in read_log(path):
+            if since and record.get('ts', 0) < since:
+                continue
+            origin, destination = record.get('origin'), record.get('destination')
+            if not origin or not destination:
+                continue
+            key = (normalize_address(origin), normalize_address(destination))
+            counts[key] += 1
+            spellings.setdefault(key, Counter())[(origin, destination)] += 1
+
+    return [
+        spellings[key].most_common(1)[0][0]
+        for key, count in counts.most_common(top)
+        if count >= min_count
+    ]
+
+
+def read_corridors_file(path):
+    """
+    Lista configurada de corredores: uma linha "origem | destino" por corredor
+    """
+    corridors = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            origin, separator, destination = line.partition('|')
+            if separator and origin.strip() and destination.strip():
+                corridors.append((origin.strip(), destination.strip()))
+    return corridors
+
+
+def next_departures(spec, bucket_minutes, now=None):
+    """
+    Próximas ocorrências dos horários de partida configurados
+
+    Args:
+        spec (str): Horários e intervalos, ex.: "06:30-09:30,12:00,16:30-19:30"
+                    (intervalos são percorridos de bucket_minutes em bucket_minutes)
+        bucket_minutes: Tamanho da faixa horária do índice
+        now: Timestamp de referência (padrão: agora)
+
+    Returns:
+        list: Timestamps futuros, em ordem
+    """
+    now = now or time.time()
+    local = time.localtime(now)
+    midnight = time.mktime((local.tm_year, local.tm_mon, local.tm_mday, 0, 0, 0, 0, 0, -1))
+
+    minutes = set()
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        start, _, end = item.partition('-')
+        try:
+            first = int(start.split(':')[0]) * 60 + int(start.split(':')[1])
+            last = int(end.split(':')[0]) * 60 + int(end.split(':')[1]) if end else first
+        except (IndexError, ValueError):
+            raise ValueError(f"Horário de partida inválido: {item!r} (use HH:MM ou HH:MM-HH:MM)")
+        minutes.update(range(first, last + 1, bucket_minutes))
+
+    departures = []
+    for minute in sorted(minutes):
+        departure = midnight + minute * 60
+        if departure <= now:
+            departure += 24 * 3600  # Já passou hoje: amanhã
+        departures.append(int(departure))
+    return sorted(departures)
@@ -0,0 +1,150 @@
+"""
+EcoRouter - Motor vetorizado do EcoScore
+Calcula o EcoScore v4 de todas as rotas em uma única passada com NumPy
+
+- factor_scores: normalização dos fatores (usado por analyze_routes; a soma
+  ponderada fica em app.weigh_scores, que pode ser refeita a partir dos
+  scores armazenados quando os pesos mudam)
+- score_routes: normalização, subscore de fluidez e soma ponderada
+
+Produz os mesmos valores que calculate_ecoscore rota a rota: as operações
+são feitas na mesma ordem, em float64, e o arredondamento final usa o
+round() do Python sobre floats nativos.
+"""
+
+import math
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional: sem ele, app.py usa o cálculo por rota
+    np = None
+
+
+def available():
+    """
+    Returns:
+        bool: True se o NumPy estiver instalado
+    """
+    return np is not None
+
+
+def normalize_column(values, descending=False):
+    """
+    Versão vetorizada de normalize_factor para uma coluna inteira
+
+    Args:
+        values: Array com o fator de todas as rotas
+        descending: True se valor menor = melhor
+
+    Returns:
+        array: Scores 0-100 (50 para todas se houver < 2 rotas ou min == max)
+    """
+    if len(values) < 2:
+        return np.full(len(values), 50.0)
+
+    min_val = values.min()
+    max_val = values.max()
+
+    if min_val == max_val:
+        return np.full(len(values), 50.0)
+
+    if descending:
+        score = ((max_val - values) / (max_val - min_val)) * 100
+    else:
+        score = ((values - min_val) / (max_val - min_val)) * 100
+
+    return np.clip(score, 0, 100)
+
+
+def factor_columns(factors):
+    """
+    PASSO 1 para todas as rotas de uma vez: scores por fator normalizados
+
+    Args:
+        factors: Lista de dicts (um por rota) com distance_km, duration_min,
+                 estimated_stops, elevation_gain, score_trafego e score_via
+
+    Returns:
+        dict: Uma coluna (array float64) por score (score_tempo, score_elevacao,
+              score_paradas, score_trafego, score_distancia, score_via)
+    """
+    distance = np.array([f['distance_km'] for f in factors], dtype=np.float64)
+    duration = np.array([f['duration_min'] for f in factors], dtype=np.float64)
+    stops = np.array([f['estimated_stops'] for f in factors], dtype=np.float64)
+
+    # math.exp por rota: np.exp pode diferir no último bit e mudar o arredondamento
+    score_elevacao = np.array(
+        [100 * math.exp(-f['elevation_gain'] / 200) for f in factors],
+        dtype=np.float64
+    )
+
+    # Normalização dinâmica (uma passada por coluna)
+    return {
+        'score_tempo': normalize_column(duration, descending=True),
+        'score_elevacao': score_elevacao,
+        'score_paradas': normalize_column(stops, descending=True),
+        'score_trafego': np.array([f['score_trafego'] for f in factors], dtype=np.float64),
+        'score_distancia': normalize_column(distance, descending=True),
+        'score_via': np.array([f['score_via'] for f in factors], dtype=np.float64)
+    }
+
+
+def as_rows(columns, count):
+    # tolist() devolve floats nativos (round() do Python, não o do NumPy)
+    as_lists = {name: column.tolist() for name, column in columns.items()}
+    return [
+        {name: values[i] for name, values in as_lists.items()}
+        for i in range(count)
+    ]
+
+
+def factor_scores(factors):
+    """
+    Scores por fator de todas as rotas (mesmos valores de app.route_factor_scores)
+
+    Returns:
+        list: Um dict por rota, não arredondado (entrada de app.weigh_scores)
+    """
+    return as_rows(factor_columns(factors), len(factors))
+
+
+def score_routes(factors, weights, fluidez_weights):
+    """
+    Calcula os scores do EcoScore v4 para todas as rotas de uma vez
+
+    Args:
+        factors: Lista de dicts (um por rota) com distance_km, duration_min,
+                 estimated_stops, elevation_gain, score_trafego e score_via
+        weights: Pesos finais (fluidez, elevacao, distancia, via, reserva)
+        fluidez_weights: Pesos do subscore de fluidez (tempo, trafego, paradas, divisor)
+
+    Returns:
+        list: Um dict por rota com ecoscore e scores individuais (não arredondados,
+              exceto ecoscore, que segue a regra de calculate_ecoscore)
+    """
+    columns = factor_columns(factors)
+    score_tempo = columns['score_tempo']
+    score_elevacao = columns['score_elevacao']
+    score_paradas = columns['score_paradas']
+    score_trafego = columns['score_trafego']
+    score_distancia = columns['score_distancia']
+    score_via = columns['score_via']
+
+    # PASSO 2: Subscore de Fluidez
+    score_fluidez = (
+        (score_tempo * fluidez_weights['tempo']) +
+        (score_trafego * fluidez_weights['trafego']) +
+        (score_paradas * fluidez_weights['paradas'])
+    ) / fluidez_weights['divisor']
+
+    # PASSO 3: EcoScore final
+    ecoscore = (
+        (weights['fluidez'] * score_fluidez) +
+        (weights['elevacao'] * score_elevacao) +
+        (weights['distancia'] * score_distancia) +
+        (weights['via'] * score_via) +
+        weights['reserva']
+    )
+    ecoscore = np.minimum(ecoscore, 100)
+
+    return as_rows(dict(columns, ecoscore=ecoscore, score_fluidez=score_fluidez), len(factors))
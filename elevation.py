@@ -0,0 +1,277 @@
+"""
+EcoRouter - Ganho de elevação das rotas
+Amostra pontos ao longo da overview_polyline, consulta as altitudes em lote
+em um provedor plugável e calcula o ganho acumulado (soma das subidas)
+
+Provedores:
+- GoogleElevationProvider: Google Maps Elevation API
+- SRTMTileProvider: arquivos .hgt do SRTM (offline, mapeados em memória)
+"""
+
+import math
+import mmap
+import os
+import struct
+import threading
+
+import requests
+
+import polyline
+from cache import LRUCache
+from ratelimit import RateLimitExceeded
+
+# Valor de "sem dados" nos arquivos SRTM
+SRTM_VOID = -32768
+
+EARTH_RADIUS_M = 6371000
+
+
+def haversine_m(a, b):
+    """
+    Distância em metros entre dois pontos (lat, lng)
+    """
+    lat1, lng1 = map(math.radians, a)
+    lat2, lng2 = map(math.radians, b)
+    h = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(h))
+
+
+def sample_path(points, max_samples=64):
+    """
+    Escolhe até max_samples pontos igualmente espaçados (por distância) ao longo do trajeto
+
+    Args:
+        points: Lista de (lat, lng) da polyline
+        max_samples: Número máximo de amostras
+
+    Returns:
+        list: Pontos amostrados (incluindo início e fim)
+    """
+    if len(points) <= max_samples:
+        return list(points)
+
+    cumulative = [0.0]
+    for previous, current in zip(points, points[1:]):
+        cumulative.append(cumulative[-1] + haversine_m(previous, current))
+
+    total = cumulative[-1]
+    if total == 0:
+        return [points[0], points[-1]]
+
+    samples = []
+    j = 0
+    for i in range(max_samples):
+        target = total * i / (max_samples - 1)
+        while j < len(points) - 2 and cumulative[j + 1] < target:
+            j += 1
+
+        # Interpolar entre os vértices j e j+1
+        span = cumulative[j + 1] - cumulative[j]
+        t = (target - cumulative[j]) / span if span else 0.0
+        t = min(max(t, 0.0), 1.0)
+        lat = points[j][0] + (points[j + 1][0] - points[j][0]) * t
+        lng = points[j][1] + (points[j + 1][1] - points[j][1]) * t
+        samples.append((lat, lng))
+
+    return samples
+
+
+def cumulative_gain(heights):
+    """
+    Soma das subidas ao longo de uma sequência de altitudes
+
+    Args:
+        heights: Altitudes em metros (None = sem dados, ignorado)
+
+    Returns:
+        float: Ganho de elevação acumulado em metros
+    """
+    gain = 0.0
+    previous = None
+    for height in heights:
+        if height is None:
+            continue
+        if previous is not None and height > previous:
+            gain += height - previous
+        previous = height
+    return gain
+
+
+class GoogleElevationProvider:
+    """
+    Altitudes via Google Maps Elevation API (requisições em lote)
+    """
+
+    def __init__(self, client, batch_size=256):
+        self.client = client
+        self.batch_size = batch_size
+
+    def lookup(self, points):
+        """
+        Args:
+            points: Lista de (lat, lng)
+
+        Returns:
+            list: Altitude de cada ponto em metros (None se indisponível)
+        """
+        heights = []
+        for start in range(0, len(points), self.batch_size):
+            batch = points[start:start + self.batch_size]
+            # Polyline codificada: URL bem menor que "lat,lng|lat,lng|..."
+            locations = 'enc:' + polyline.encode(batch)
+
+            try:
+                data = self.client.get_json('elevation', {'locations': locations})
+            except (requests.exceptions.RequestException, ValueError, RateLimitExceeded):
+                # Sem altitude a rota segue sem ganho de elevação (e sem cache)
+                data = {}
+
+            results = data.get('results', []) if data.get('status') == 'OK' else []
+            if len(results) != len(batch):
+                heights.extend([None] * len(batch))
+            else:
+                heights.extend(result.get('elevation') for result in results)
+
+        return heights
+
+
+class SRTMTileProvider:
+    """
+    Altitudes a partir de arquivos SRTM .hgt (ex.: S24W048.hgt)
+
+    Cada tile cobre 1°×1° com 1201×1201 (SRTM3) ou 3601×3601 (SRTM1)
+    amostras int16 big-endian. Os arquivos são mapeados em memória
+    (mmap) e mantidos abertos: consultas repetidas não fazem I/O.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._tiles = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def tile_name(lat, lng):
+        lat_floor = math.floor(lat)
+        lng_floor = math.floor(lng)
+        return (f"{'N' if lat_floor >= 0 else 'S'}{abs(lat_floor):02d}"
+                f"{'E' if lng_floor >= 0 else 'W'}{abs(lng_floor):03d}.hgt")
+
+    def _tile(self, name):
+        """
+        Returns:
+            tuple: (mmap, lado) ou None se o tile não existir
+        """
+        if name in self._tiles:
+            return self._tiles[name]
+
+        with self._lock:
+            if name not in self._tiles:
+                path = os.path.join(self.directory, name)
+                tile = None
+                if os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    side = int(math.isqrt(len(data) // 2))
+                    tile = (data, side)
+                self._tiles[name] = tile
+        return self._tiles[name]
+
+    def height(self, lat, lng):
+        """
+        Altitude de um ponto por interpolação bilinear
+
+        Returns:
+            float: Altitude em metros ou None sem dados
+        """
+        tile = self._tile(self.tile_name(lat, lng))
+        if tile is None:
+            return None
+
+        data, side = tile
+        # Linha 0 = borda norte do tile
+        y = (1 - (lat - math.floor(lat))) * (side - 1)
+        x = (lng - math.floor(lng)) * (side - 1)
+        row, col = min(int(y), side - 2), min(int(x), side - 2)
+        dy, dx = y - row, x - col
+
+        def sample(r, c):
+            return struct.unpack_from('>h', data, 2 * (r * side + c))[0]
+
+        corners = (sample(row, col), sample(row, col + 1),
+                   sample(row + 1, col), sample(row + 1, col + 1))
+        if SRTM_VOID in corners:
+            valid = [h for h in corners if h != SRTM_VOID]
+            return sum(valid) / len(valid) if valid else None
+
+        top = corners[0] + (corners[1] - corners[0]) * dx
+        bottom = corners[2] + (corners[3] - corners[2]) * dx
+        return top + (bottom - top) * dy
+
+    def lookup(self, points):
+        return [self.height(lat, lng) for lat, lng in points]
+
+
+class ElevationService:
+    """
+    Ganho de elevação de rotas com cache por ponto e por polyline
+    """
+
+    def __init__(self, provider, max_samples=64, precision=4,
+                 point_cache_size=50000, route_cache_size=2048):
+        self.provider = provider
+        self.max_samples = max_samples
+        self.precision = precision  # 4 casas ≈ 11 m
+        self.points = LRUCache(maxsize=point_cache_size)
+        self.routes = LRUCache(maxsize=route_cache_size)
+
+    def routes_gain(self, routes):
+        """
+        Calcula o ganho de elevação de várias rotas com uma única consulta em lote
+
+        Args:
+            routes: Rotas da Directions API (com overview_polyline)
+
+        Returns:
+            list: Ganho de elevação em metros de cada rota (0 sem polyline)
+        """
+        gains = [None] * len(routes)
+        samples = {}
+
+        for i, route in enumerate(routes):
+            encoded = route.get('overview_polyline', {}).get('points', '')
+            if not encoded:
+                gains[i] = 0
+                continue
+
+            cached = self.routes.get(encoded)
+            if cached is not None:
+                gains[i] = cached
+                continue
+
+            samples[i] = (encoded, [
+                (round(lat, self.precision), round(lng, self.precision))
+                for lat, lng in sample_path(polyline.decode(encoded), self.max_samples)
+            ])
+
+        # Buscar no provedor apenas os pontos que não estão em cache
+        missing = list(dict.fromkeys(
+            point
+            for _, points in samples.values()
+            for point in points
+            if self.points.get(point) is None
+        ))
+        if missing:
+            for point, height in zip(missing, self.provider.lookup(missing)):
+                if height is not None:
+                    self.points.set(point, height)
+
+        for i, (encoded, points) in samples.items():
+            heights = [self.points.get(point) for point in points]
+            gains[i] = round(cumulative_gain(heights), 1)
+
+            # Só guardar o ganho se todas as altitudes foram obtidas
+            if None not in heights:
+                self.routes.set(encoded, gains[i])
+
+        return gains
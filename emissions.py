@@ -0,0 +1,292 @@
+"""
+EcoRouter - Emissões anuais de CO₂ por perfil de combustível
+Fator de emissão por faixa de EcoScore e consumo/preço de cada combustível,
+em duas versões:
+
+- emission_factor: uma viagem (usado por calculate_emissions)
+- bulk_emissions: colunas inteiras (frotas, cenários) com NumPy; a faixa de
+  cada linha é encontrada com searchsorted, sem if/elif por linha
+
+As duas fazem as mesmas operações, na mesma ordem, em float64: cada linha do
+cálculo em lote é idêntica ao resultado de calculate_emissions antes do
+arredondamento final.
+"""
+
+import bisect
+import json
+import math
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional: sem ele, bulk_emissions soma linha a linha
+    np = None
+
+WEEKS_PER_YEAR = 52
+TREE_KG_PER_YEAR = 21  # ~21 kg CO₂ absorvidos por árvore por ano
+
+# Limite inferior (EcoScore) de cada faixa acima da primeira:
+# < 35 Congestionado, 35-49 Moderado, 50-64 Normal, 65-79 Muito Bom, ≥ 80 Ideal
+ECOSCORE_BANDS = (35, 50, 65, 80)
+
+DEFAULT_FUEL = 'gasolina'
+
+# band_factors: kg CO₂/km em cada faixa (na ordem de ECOSCORE_BANDS)
+# standard_factor: fator da rota padrão (sempre o pior caso)
+FUEL_PROFILES = {
+    'gasolina': {
+        'band_factors': (0.165, 0.148, 0.135, 0.122, 0.115),
+        'standard_factor': 0.165,
+        'km_per_liter': 9.6,
+        'price': 6.50  # R$/litro
+    }
+}
+
+# Campos de uma linha em bulk_emissions (todos em float64)
+COLUMNS = ('total_standard', 'total_eco', 'savings', 'fuel_saved', 'money_saved',
+           'trees_equivalent', 'km_car_equivalent')
+
+
+def load_fuel_profiles(path):
+    """
+    Acrescenta perfis de combustível de um arquivo JSON a FUEL_PROFILES
+
+    Formato: {"etanol": {"band_factors": [5 valores], "standard_factor": ...,
+    "km_per_liter": ..., "price": ...}, ...}
+    """
+    with open(path, encoding='utf-8') as f:
+        profiles = json.load(f)
+
+    for name, profile in profiles.items():
+        missing = {'band_factors', 'standard_factor', 'km_per_liter', 'price'} - set(profile)
+        if missing:
+            raise ValueError(f"Perfil de combustível {name!r} sem {', '.join(sorted(missing))}")
+        if len(profile['band_factors']) != len(ECOSCORE_BANDS) + 1:
+            raise ValueError(f"Perfil {name!r}: band_factors deve ter {len(ECOSCORE_BANDS) + 1} valores")
+        FUEL_PROFILES[name] = dict(profile, band_factors=tuple(profile['band_factors']))
+
+
+def configure_bands(bands, band_factors=None):
+    """
+    Substitui os limites das faixas de EcoScore e, opcionalmente, os fatores
+    de cada perfil (configuração versionada do EcoScore, ver scoring.py)
+
+    Args:
+        bands: Limites inferiores das faixas acima da primeira, em ordem
+        band_factors: {combustível: fatores kg CO₂/km} (len(bands) + 1 cada)
+    """
+    global ECOSCORE_BANDS
+
+    band_factors = band_factors or {}
+    unknown = set(band_factors) - set(FUEL_PROFILES)
+    if unknown:
+        raise ValueError(f"band_factors de combustível desconhecido: {', '.join(sorted(unknown))} "
+                         "(fatores de perfis adicionais ficam em FUEL_PROFILES_PATH)")
+
+    for name, profile in FUEL_PROFILES.items():
+        if len(band_factors.get(name, profile['band_factors'])) != len(bands) + 1:
+            raise ValueError(f"Perfil {name!r}: informe {len(bands) + 1} band_factors para as novas faixas")
+
+    ECOSCORE_BANDS = tuple(bands)
+    for name, factors in band_factors.items():
+        FUEL_PROFILES[name] = dict(FUEL_PROFILES[name], band_factors=tuple(factors))
+
+
+def fuel_profile(fuel=None):
+    try:
+        return FUEL_PROFILES[fuel or DEFAULT_FUEL]
+    except KeyError:
+        raise ValueError(f"Combustível desconhecido: {fuel} (use {', '.join(sorted(FUEL_PROFILES))})")
+
+
+def emission_factor(ecoscore, fuel=None):
+    """
+    Fator de emissão (kg CO₂/km) correspondente a um EcoScore
+    """
+    profile = fuel_profile(fuel)
+    return profile['band_factors'][bisect.bisect_right(ECOSCORE_BANDS, ecoscore)]
+
+
+def available():
+    """
+    Returns:
+        bool: True se o NumPy estiver instalado
+    """
+    return np is not None
+
+
+def check_fuels(fuel):
+    """
+    Raises:
+        ValueError: fuel não é None, um nome de perfil nem uma lista de nomes
+    """
+    if fuel is None or isinstance(fuel, str):
+        return
+    if isinstance(fuel, (int, float)) or not all(isinstance(name, str) for name in fuel):
+        raise ValueError("fuel deve ser o nome de um perfil ou uma lista de nomes")
+
+
+def numeric_column(name, values, scalar=False):
+    """
+    Coluna (ou escalar) numérica como array float64
+
+    Args:
+        scalar: Aceitar também um valor único (frequency, fuel_price)
+
+    Raises:
+        ValueError: Valores nulos, texto, booleanos, NaN ou infinitos (um NaN
+                    cairia na melhor faixa de EcoScore e geraria JSON inválido)
+                    ou listas aninhadas
+    """
+    array = np.asarray(values)
+    # Listas aninhadas virariam matrizes e somariam com broadcast
+    if array.ndim not in ((0, 1) if scalar else (1,)):
+        raise ValueError(f"{name} deve ser uma lista de números" + (" ou um número" if scalar else ""))
+    # Em listas, NumPy converteria true/false em 1/0 sem erro
+    has_bool = isinstance(values, (list, tuple)) and any(type(value) is bool for value in values)
+    if has_bool or array.dtype.kind not in 'iuf' or not np.isfinite(array).all():
+        raise ValueError(f"{name} deve conter apenas números finitos")
+    return array.astype(np.float64)
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def emission_columns(distance_standard, distance_eco, ecoscore_eco, frequency,
+                     fuel=None, fuel_price=None):
+    """
+    Emissões anuais de várias viagens de uma vez (NumPy)
+
+    Args:
+        distance_standard, distance_eco: Distâncias em km (arrays)
+        ecoscore_eco: EcoScore da rota eco (array)
+        frequency: Viagens por semana (array ou escalar)
+        fuel: Nome do perfil de cada linha (array) ou de todas (str/None)
+        fuel_price: Preço por litro (array ou escalar; padrão: preço do perfil)
+
+    Returns:
+        dict: Uma coluna (array float64) por campo de COLUMNS, com os mesmos
+              valores de calculate_emissions antes do arredondamento
+
+    Raises:
+        ValueError: Valores não numéricos ou não finitos, combustível inválido
+    """
+    distance_standard = numeric_column('distance_standard', distance_standard)
+    distance_eco = numeric_column('distance_eco', distance_eco)
+    ecoscore_eco = numeric_column('ecoscore_eco', ecoscore_eco)
+    frequency = numeric_column('frequency', frequency, scalar=True)
+    check_fuels(fuel)
+
+    # Perfil de cada linha: índice em tabelas com uma linha por combustível
+    # (lista vazia: nenhuma linha, mas as tabelas precisam de um perfil)
+    if fuel is None or isinstance(fuel, str) or not len(fuel):
+        names = [fuel or DEFAULT_FUEL]
+        fuel_index = np.zeros(len(distance_eco), dtype=np.intp)
+    else:
+        names, fuel_index = np.unique(np.asarray(fuel, dtype=str), return_inverse=True)
+    profiles = [fuel_profile(name) for name in names]
+
+    band_table = np.array([p['band_factors'] for p in profiles], dtype=np.float64)
+    standard_factor = np.array([p['standard_factor'] for p in profiles], dtype=np.float64)[fuel_index]
+    consumption = (1 / np.array([p['km_per_liter'] for p in profiles], dtype=np.float64))[fuel_index]
+    if fuel_price is None:
+        price = np.array([p['price'] for p in profiles], dtype=np.float64)[fuel_index]
+    else:
+        price = numeric_column('fuel_price', fuel_price, scalar=True)
+
+    # Faixa de EcoScore de cada linha (mesma regra de bisect_right)
+    band = np.searchsorted(np.array(ECOSCORE_BANDS, dtype=np.float64), ecoscore_eco, side='right')
+    eco_factor = band_table[fuel_index, band]
+
+    # Mesma ordem de operações de calculate_emissions
+    total_standard = distance_standard * standard_factor * frequency * WEEKS_PER_YEAR
+    total_eco = distance_eco * eco_factor * frequency * WEEKS_PER_YEAR
+    savings = total_standard - total_eco
+    fuel_saved = (distance_standard - distance_eco) * consumption * frequency * WEEKS_PER_YEAR
+    money_saved = fuel_saved * price
+
+    positive = savings > 0
+    return {
+        'total_standard': total_standard,
+        'total_eco': total_eco,
+        'savings': np.maximum(savings, 0),
+        'fuel_saved': np.maximum(fuel_saved, 0),
+        'money_saved': np.maximum(money_saved, 0),
+        # np.rint arredonda metade para o par, como o round() do Python
+        'trees_equivalent': np.where(positive, np.rint(savings / TREE_KG_PER_YEAR), 0.0),
+        'km_car_equivalent': np.where(positive, np.rint(savings / standard_factor), 0.0)
+    }
+
+
+def _python_totals(distance_standard, distance_eco, ecoscore_eco, frequency, fuel, fuel_price):
+    """
+    Totais de bulk_emissions sem NumPy (uma linha por vez, sem dict por linha)
+    """
+    count = len(distance_eco)
+    frequencies = frequency if isinstance(frequency, (list, tuple)) else [frequency] * count
+    check_fuels(fuel)
+    fuels = [fuel] * count if fuel is None or isinstance(fuel, str) else fuel
+    prices = fuel_price if isinstance(fuel_price, (list, tuple)) else [fuel_price] * count
+
+    # Mesmas validações de emission_columns
+    columns = [('distance_standard', distance_standard), ('distance_eco', distance_eco),
+               ('ecoscore_eco', ecoscore_eco), ('frequency', frequencies)]
+    if fuel_price is not None:
+        columns.append(('fuel_price', prices))
+    for name, values in columns:
+        if not all(is_number(value) for value in values):
+            raise ValueError(f"{name} deve conter apenas números finitos")
+
+    totals = dict.fromkeys(COLUMNS, 0.0)
+    for d_std, d_eco, score, freq, name, price in zip(
+            distance_standard, distance_eco, ecoscore_eco, frequencies, fuels, prices):
+        profile = fuel_profile(name)
+        standard_factor = profile['standard_factor']
+        total_standard = d_std * standard_factor * freq * WEEKS_PER_YEAR
+        total_eco = d_eco * emission_factor(score, name) * freq * WEEKS_PER_YEAR
+        savings = total_standard - total_eco
+        fuel_saved = (d_std - d_eco) * (1 / profile['km_per_liter']) * freq * WEEKS_PER_YEAR
+        money_saved = fuel_saved * (profile['price'] if price is None else price)
+
+        totals['total_standard'] += total_standard
+        totals['total_eco'] += total_eco
+        totals['savings'] += max(savings, 0)
+        totals['fuel_saved'] += max(fuel_saved, 0)
+        totals['money_saved'] += max(money_saved, 0)
+        if savings > 0:
+            totals['trees_equivalent'] += round(savings / TREE_KG_PER_YEAR)
+            totals['km_car_equivalent'] += round(savings / standard_factor)
+    return totals
+
+
+def bulk_emissions(distance_standard, distance_eco, ecoscore_eco, frequency,
+                   fuel=None, fuel_price=None):
+    """
+    Totais anuais de uma frota ou cenário (soma de todas as linhas)
+
+    Args:
+        Os mesmos de emission_columns (listas ou arrays de mesmo tamanho)
+
+    Returns:
+        dict: rows e a soma de cada campo de COLUMNS
+    """
+    lengths = {len(distance_standard), len(distance_eco), len(ecoscore_eco)}
+    for column in (frequency, fuel, fuel_price):
+        if column is not None and not isinstance(column, (str, int, float)):
+            lengths.add(len(column))
+    if len(lengths) != 1:
+        raise ValueError("Todas as colunas devem ter o mesmo tamanho")
+
+    if np is None:
+        totals = _python_totals(distance_standard, distance_eco, ecoscore_eco,
+                                frequency, fuel, fuel_price)
+    else:
+        columns = emission_columns(distance_standard, distance_eco, ecoscore_eco,
+                                   frequency, fuel, fuel_price)
+        totals = {name: float(column.sum()) for name, column in columns.items()}
+
+    result = {name: round(value, 2) for name, value in totals.items()}
+    result['trees_equivalent'] = int(totals['trees_equivalent'])
+    result['km_car_equivalent'] = int(totals['km_car_equivalent'])
+    result['rows'] = len(distance_eco)
+    return result
@@ -0,0 +1,333 @@
+"""
+EcoRouter - Cliente HTTP das APIs do Google Maps
+Sessão compartilhada com pool de conexões keep-alive, verificação TLS,
+retry com backoff exponencial (jitter), limite de taxa por API e métricas
+de latência por endpoint
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from ratelimit import RateLimitExceeded
+
+# Status da API que indicam falha temporária (vale tentar novamente)
+RETRYABLE_API_STATUSES = {'OVER_QUERY_LIMIT', 'UNKNOWN_ERROR'}
+
+# Status HTTP que indicam falha temporária do servidor
+RETRYABLE_HTTP_STATUSES = {500, 502, 503, 504}
+
+
+class EndpointStats:
+    """
+    Métricas de latência de um endpoint (amostras recentes em janela fixa)
+    """
+
+    def __init__(self, endpoint, window=1000):
+        self.endpoint = endpoint
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.samples = deque(maxlen=window)
+
+    def record(self, elapsed_ms, error=False, response=None, api_status=''):
+        self.requests += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.samples.append(elapsed_ms)
+        if error:
+            self.errors += 1
+
+        # Métricas do Prometheus (GET /metrics)
+        metrics.UPSTREAM_SECONDS.observe(elapsed_ms / 1000, endpoint=self.endpoint)
+        metrics.UPSTREAM_RESPONSES.inc(
+            endpoint=self.endpoint,
+            code=response.status_code if response is not None else 'error',
+            status=api_status
+        )
+        if response is not None:
+            metrics.UPSTREAM_BYTES.observe(len(response.content), endpoint=self.endpoint)
+
+    def snapshot(self):
+        samples = sorted(self.samples)
+
+        def percentile(p):
+            if not samples:
+                return 0.0
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 1)
+
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'retries': self.retries,
+            'avg_ms': round(self.total_ms / self.requests, 1) if self.requests else 0.0,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'max_ms': round(self.max_ms, 1)
+        }
+
+
+class GoogleMapsClient:
+    """
+    Cliente das APIs web do Google Maps (Geocoding, Directions, ...)
+
+    Uma única requests.Session por processo, com pool de conexões
+    dimensionado para as threads que o compartilham.
+    """
+
+    def __init__(self, api_key, base_url='https://maps.googleapis.com/maps/api',
+                 pool_size=20, max_retries=3, backoff_base=0.2, backoff_max=4.0,
+                 timeout=10, verify=True, async_pool_size=100, rate_limiter=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.verify = verify
+        self.async_pool_size = async_pool_size
+        self.rate_limiter = rate_limiter
+
+        self._session = None
+        self._session_pid = None
+        self._async_clients = {}  # event loop -> httpx.AsyncClient
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    @property
+    def session(self):
+        """
+        Sessão HTTP do processo atual (recriada após fork)
+        """
+        if self._session is None or self._session_pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._session_pid != os.getpid():
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=4,
+                        pool_maxsize=self.pool_size
+                    )
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    session.verify = self.verify
+                    self._session = session
+                    self._session_pid = os.getpid()
+        return self._session
+
+    @property
+    def async_client(self):
+        """
+        httpx.AsyncClient do event loop atual (modo ASGI), um por loop
+        """
+        import httpx  # Dependência apenas do modo assíncrono
+
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.async_pool_size,
+                    max_keepalive_connections=self.async_pool_size
+                ),
+                timeout=self.timeout,
+                verify=self.verify
+            )
+            with self._lock:
+                # Loops já encerrados não usam mais seus clientes
+                self._async_clients = {
+                    other: other_client for other, other_client in self._async_clients.items()
+                    if not other.is_closed()
+                }
+                self._async_clients[loop] = client
+        return client
+
+    async def aclose(self):
+        """
+        Fecha os clientes assíncronos (chamado no shutdown do servidor ASGI)
+
+        O do loop atual é fechado aqui e os de outros loops em execução, no
+        próprio loop; os de loops parados são apenas descartados.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients, self._async_clients = self._async_clients, {}
+
+        for client_loop, client in clients.items():
+            if client_loop is loop:
+                await client.aclose()
+            elif client_loop.is_running():
+                await asyncio.wrap_future(
+                    asyncio.run_coroutine_threadsafe(client.aclose(), client_loop)
+                )
+
+    def _endpoint_stats(self, endpoint):
+        stats = self._stats.get(endpoint)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(endpoint, EndpointStats(endpoint))
+        return stats
+
+    def _backoff(self, attempt):
+        """
+        Espera com backoff exponencial e jitter completo
+        """
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        time.sleep(random.uniform(0, delay))
+
+    def get_json(self, endpoint, params):
+        """
+        Faz GET em {base_url}/{endpoint}/json com retry
+
+        Tenta novamente em erros de conexão, HTTP 5xx e status
+        OVER_QUERY_LIMIT/UNKNOWN_ERROR da API. Cada tentativa consome
+        um token do limite de taxa do endpoint.
+
+        Args:
+            endpoint (str): Nome da API ('geocode', 'directions', ...)
+            params (dict): Parâmetros da requisição (sem a chave)
+
+        Returns:
+            dict: JSON da resposta (o chamador verifica o campo status)
+
+        Raises:
+            requests.exceptions.RequestException: Falha após todas as tentativas
+            RateLimitExceeded: Limite local atingido ou OVER_QUERY_LIMIT persistente
+        """
+        url = f"{self.base_url}/{endpoint}/json"
+        params = dict(params, key=self.api_key)
+        stats = self._endpoint_stats(endpoint)
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            if attempt:
+                stats.retries += 1
+
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(endpoint)
+
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                stats.record((time.perf_counter() - started) * 1000, error=True)
+                if last_attempt:
+                    raise
+                self._backoff(attempt)
+                continue
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            if response.status_code in RETRYABLE_HTTP_STATUSES and not last_attempt:
+                stats.record(elapsed_ms, error=True, response=response)
+                self._backoff(attempt)
+                continue
+
+            try:
+                response.raise_for_status()
+                data = response.json()
+            except (requests.exceptions.RequestException, ValueError):
+                stats.record(elapsed_ms, error=True, response=response)
+                raise
+
+            api_status = data.get('status', '')
+            if api_status in RETRYABLE_API_STATUSES and not last_attempt:
+                stats.record(elapsed_ms, error=True, response=response, api_status=api_status)
+                self._backoff(attempt)
+                continue
+
+            stats.record(elapsed_ms, error=api_status in RETRYABLE_API_STATUSES,
+                         response=response, api_status=api_status)
+            return self._check_quota(endpoint, data)
+
+    async def aget_json(self, endpoint, params):
+        """
+        Versão assíncrona de get_json (httpx, sem bloquear o event loop)
+
+        Raises:
+            httpx.HTTPError: Falha após todas as tentativas
+            RateLimitExceeded: Limite local atingido ou OVER_QUERY_LIMIT persistente
+        """
+        import httpx
+
+        url = f"{self.base_url}/{endpoint}/json"
+        params = dict(params, key=self.api_key)
+        stats = self._endpoint_stats(endpoint)
+        client = self.async_client
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            if attempt:
+                stats.retries += 1
+
+            if self.rate_limiter is not None:
+                await self.rate_limiter.aacquire(endpoint)
+
+            started = time.perf_counter()
+            try:
+                response = await client.get(url, params=params)
+            except httpx.TransportError:
+                stats.record((time.perf_counter() - started) * 1000, error=True)
+                if last_attempt:
+                    raise
+                await self._abackoff(attempt)
+                continue
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            if response.status_code in RETRYABLE_HTTP_STATUSES and not last_attempt:
+                stats.record(elapsed_ms, error=True, response=response)
+                await self._abackoff(attempt)
+                continue
+
+            try:
+                response.raise_for_status()
+                data = response.json()
+            except (httpx.HTTPError, ValueError):
+                stats.record(elapsed_ms, error=True, response=response)
+                raise
+
+            api_status = data.get('status', '')
+            if api_status in RETRYABLE_API_STATUSES and not last_attempt:
+                stats.record(elapsed_ms, error=True, response=response, api_status=api_status)
+                await self._abackoff(attempt)
+                continue
+
+            stats.record(elapsed_ms, error=api_status in RETRYABLE_API_STATUSES,
+                         response=response, api_status=api_status)
+            return self._check_quota(endpoint, data)
+
+    def _check_quota(self, endpoint, data):
+        """
+        OVER_QUERY_LIMIT mesmo após os retries: cota do Google esgotada
+        """
+        if data.get('status') == 'OVER_QUERY_LIMIT':
+            raise RateLimitExceeded(endpoint, self.backoff_max)
+        return data
+
+    async def _abackoff(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        await asyncio.sleep(random.uniform(0, delay))
+
+    def stats(self):
+        """
+        Returns:
+            dict: Métricas de latência por endpoint
+        """
+        return {endpoint: stats.snapshot() for endpoint, stats in sorted(self._stats.items())}
+
+    def quota_stats(self):
+        """
+        Returns:
+            dict: Consumo de cota por API (vazio sem limitador)
+        """
+        return self.rate_limiter.stats() if self.rate_limiter is not None else {}
@@ -0,0 +1,52 @@
+"""
+EcoRouter - Configuração de produção do gunicorn
+
+WSGI (Flask, threads):
+    gunicorn -c gunicorn.conf.py 'app:create_app()'
+
+ASGI (/calculate assíncrono, demais rotas pelo Flask):
+    WEB_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py asgi:application
+
+O app é importado uma única vez no processo mestre (preload_app): Flask,
+NumPy e a configuração ficam compartilhados (copy-on-write) e cada worker
+nasce de um fork, sem reimportar nada. Após o fork, init_worker cria os
+pools do worker e aquece os caches em segundo plano; GET /healthz responde
+200 quando o worker estiver pronto.
+"""
+
+import os
+
+
+def available_cores():
+    # Respeita o cpuset do container (Linux)
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+bind = os.getenv('WEB_BIND', f"0.0.0.0:{os.getenv('PORT', 5000)}")
+
+# gthread: as requisições passam a maior parte do tempo esperando o Google,
+# então cada worker (um por núcleo) atende várias ao mesmo tempo em threads
+worker_class = os.getenv('WEB_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('WEB_CONCURRENCY', available_cores()))
+threads = int(os.getenv('WEB_THREADS', 8))
+
+preload_app = True
+timeout = int(os.getenv('WEB_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('WEB_KEEPALIVE', 5))
+
+# Reciclagem periódica dos workers (0 = desativada), com jitter para não
+# reiniciar todos ao mesmo tempo
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.getenv('WEB_ACCESS_LOG', '-') or None
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    import app
+
+    app.init_worker()
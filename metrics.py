@@ -0,0 +1,249 @@
+"""
+EcoRouter - Métricas no formato texto do Prometheus
+Histogramas de latência por etapa do pipeline de /calculate, contadores de
+respostas do Google Maps e tamanhos de payload, expostos em GET /metrics.
+
+Cada processo mantém suas próprias métricas (com vários workers, o Prometheus
+deve coletar cada um ou agregar pelo label de instância).
+
+Server-Timing: com SERVER_TIMING=true, as etapas medidas durante uma
+requisição voltam no cabeçalho Server-Timing (visível no DevTools).
+"""
+
+import contextvars
+import functools
+import inspect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Buckets de latência (segundos) e de tamanho (bytes)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Etapas medidas na requisição atual (None = requisição sem Server-Timing)
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Contador monotônico com labels
+    """
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield self.name, tuple(zip(self.labelnames, key)), value
+
+
+class Histogram:
+    """
+    Histograma com buckets fixos e labels
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Contagens por bucket (não cumulativas) + soma
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts = series[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in values:
+            labels = tuple(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield self.name + '_bucket', labels + (('le', format_value(float(bound))),), cumulative
+            yield self.name + '_sum', labels, total
+            yield self.name + '_count', labels, cumulative
+
+
+class Registry:
+    """
+    Conjunto de métricas e coletores (funções chamadas a cada leitura)
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        """
+        Args:
+            collector: Função que retorna [(nome, tipo, descrição, [(labels, valor)])]
+        """
+        self._collectors.append(collector)
+        return collector
+
+    def render(self):
+        """
+        Returns:
+            str: Todas as métricas no formato texto do Prometheus
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+
+        for collector in self._collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    lines.append(f'{name}{format_labels(sorted(labels.items()))} {format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'ecorouter_stage_seconds', 'Latência de cada etapa do cálculo de rota', ['stage']
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'ecorouter_request_seconds', 'Latência das requisições HTTP', ['endpoint', 'code']
+))
+RESPONSE_BYTES = REGISTRY.register(Histogram(
+    'ecorouter_response_bytes', 'Tamanho das respostas HTTP', ['endpoint'], SIZE_BUCKETS
+))
+UPSTREAM_SECONDS = REGISTRY.register(Histogram(
+    'ecorouter_upstream_seconds', 'Latência das chamadas ao Google Maps', ['endpoint']
+))
+UPSTREAM_RESPONSES = REGISTRY.register(Counter(
+    'ecorouter_upstream_responses_total', 'Respostas do Google Maps por status HTTP e da API',
+    ['endpoint', 'code', 'status']
+))
+UPSTREAM_BYTES = REGISTRY.register(Histogram(
+    'ecorouter_upstream_response_bytes', 'Tamanho das respostas do Google Maps',
+    ['endpoint'], SIZE_BUCKETS
+))
+
+
+def start_request_timing():
+    """
+    Passa a registrar as etapas da requisição atual (para o Server-Timing)
+
+    Returns:
+        list: Etapas medidas [(nome, ms)], preenchida durante a requisição
+    """
+    timings = []
+    _request_timings.set(timings)
+    return timings
+
+
+def record_stage(name, seconds):
+    STAGE_SECONDS.observe(seconds, stage=name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds * 1000))
+
+
+@contextmanager
+def stage(name):
+    """
+    Mede um bloco como etapa do pipeline
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def timed(name):
+    """
+    Decorator que mede a função (síncrona ou corrotina) como etapa do pipeline
+    """
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    record_stage(name, time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record_stage(name, time.perf_counter() - started)
+        return wrapper
+
+    return decorator
+
+
+def server_timing_header(timings, total_seconds=None):
+    """
+    Monta o cabeçalho Server-Timing (etapas repetidas aparecem uma vez por chamada)
+    """
+    entries = [f'{name};dur={ms:.1f}' for name, ms in timings]
+    if total_seconds is not None:
+        entries.append(f'total;dur={total_seconds * 1000:.1f}')
+    return ', '.join(entries)
@@ -0,0 +1,248 @@
+"""
+EcoRouter - Polylines codificadas do Google Maps
+Decodificação/codificação do formato "Encoded Polyline Algorithm"
+e simplificação Douglas–Peucker
+
+- decode_array: coordenadas em array('d') compacto [lat0, lng0, lat1, lng1, ...]
+- decode_numpy: decodificação vetorizada em array NumPy (n, 2), se disponível
+- decode: lista de tuplas (lat, lng)
+- encode / simplify / simplify_encoded
+"""
+
+import math
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional: decode_array não depende dele
+    np = None
+
+# Metros por grau de latitude (aproximação equirretangular)
+METERS_PER_DEGREE = 111320
+
+# Tamanho mínimo de trecho para usar a busca vetorizada em simplify()
+VECTORIZE_MIN_POINTS = 64
+
+
+def decode_array(encoded, precision=5):
+    """
+    Decodifica uma polyline em um array('d') intercalado
+
+    Percorre os bytes uma única vez, sem ord() nem listas intermediárias.
+
+    Args:
+        encoded (str): Polyline codificada (ex.: overview_polyline.points)
+        precision (int): Casas decimais da codificação (Google usa 5)
+
+    Returns:
+        array: [lat0, lng0, lat1, lng1, ...]
+    """
+    factor = 10 ** precision
+    coords = array('d')
+    append = coords.append
+
+    value = shift = 0
+    lat = lng = 0
+    is_lat = True
+
+    for byte in encoded.encode('ascii'):
+        byte -= 63
+        value |= (byte & 0x1f) << shift
+        if byte >= 0x20:
+            shift += 5
+            continue
+
+        delta = ~(value >> 1) if value & 1 else value >> 1
+        value = shift = 0
+
+        if is_lat:
+            lat += delta
+        else:
+            lng += delta
+            append(lat / factor)
+            append(lng / factor)
+        is_lat = not is_lat
+
+    return coords
+
+
+def decode_numpy(encoded, precision=5):
+    """
+    Decodificação vetorizada com NumPy (útil para polylines longas)
+
+    Returns:
+        ndarray: Array (n, 2) com lat/lng
+    """
+    if np is None:
+        raise RuntimeError("decode_numpy requer o NumPy")
+
+    chunks = np.frombuffer(encoded.encode('ascii'), dtype=np.uint8).astype(np.int64) - 63
+    if not len(chunks):
+        return np.empty((0, 2))
+
+    # Cada valor termina no primeiro byte < 0x20
+    ends = np.flatnonzero(chunks < 0x20)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    position = np.arange(len(chunks)) - np.repeat(starts, ends - starts + 1)
+
+    values = np.add.reduceat((chunks & 0x1f) << (5 * position), starts)
+    deltas = np.where(values & 1, ~(values >> 1), values >> 1)
+
+    return np.cumsum(deltas[:len(deltas) // 2 * 2].reshape(-1, 2), axis=0) / 10 ** precision
+
+
+def decode(encoded, precision=5):
+    """
+    Decodifica uma polyline do Google Maps
+
+    Args:
+        encoded (str): Polyline codificada (ex.: overview_polyline.points)
+        precision (int): Casas decimais da codificação (Google usa 5)
+
+    Returns:
+        list: Lista de tuplas (lat, lng)
+    """
+    coords = decode_array(encoded, precision)
+    return list(zip(coords[0::2], coords[1::2]))
+
+
+def _encode_value(value, out):
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        out.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+
+def encode(points, precision=5):
+    """
+    Codifica pontos no formato de polyline do Google Maps
+
+    Args:
+        points: Sequência de (lat, lng)
+        precision (int): Casas decimais da codificação
+
+    Returns:
+        str: Polyline codificada
+    """
+    factor = 10 ** precision
+    out = []
+    previous_lat = previous_lng = 0
+
+    for lat, lng in points:
+        lat = round(lat * factor)
+        lng = round(lng * factor)
+        _encode_value(lat - previous_lat, out)
+        _encode_value(lng - previous_lng, out)
+        previous_lat, previous_lng = lat, lng
+
+    return ''.join(out)
+
+
+def _farthest_python(xs, ys, first, last):
+    """
+    Ponto entre first e last mais distante do segmento first–last
+
+    Returns:
+        tuple: (índice, distância ao quadrado)
+    """
+    x1, y1 = xs[first], ys[first]
+    dx, dy = xs[last] - x1, ys[last] - y1
+    length_sq = dx * dx + dy * dy
+
+    max_dist_sq = -1.0
+    index = first
+    for i in range(first + 1, last):
+        px, py = xs[i] - x1, ys[i] - y1
+        if length_sq:
+            # Distância ao segmento (projeção limitada às extremidades)
+            t = max(0.0, min(1.0, (px * dx + py * dy) / length_sq))
+            px -= t * dx
+            py -= t * dy
+        dist_sq = px * px + py * py
+        if dist_sq > max_dist_sq:
+            max_dist_sq = dist_sq
+            index = i
+
+    return index, max_dist_sq
+
+
+def _farthest_numpy(xs, ys, first, last):
+    """
+    Versão vetorizada de _farthest_python
+    """
+    x1, y1 = xs[first], ys[first]
+    dx, dy = xs[last] - x1, ys[last] - y1
+    length_sq = dx * dx + dy * dy
+
+    px = xs[first + 1:last] - x1
+    py = ys[first + 1:last] - y1
+    if length_sq:
+        t = np.clip((px * dx + py * dy) / length_sq, 0.0, 1.0)
+        px = px - t * dx
+        py = py - t * dy
+    dist_sq = px * px + py * py
+
+    offset = int(np.argmax(dist_sq))
+    return first + 1 + offset, float(dist_sq[offset])
+
+
+def simplify(points, tolerance_m):
+    """
+    Simplificação Douglas–Peucker (iterativa) com tolerância em metros
+
+    Usa projeção equirretangular local, suficiente para trajetos urbanos
+    e intermunicipais.
+
+    Args:
+        points: Sequência de (lat, lng)
+        tolerance_m: Distância máxima (m) entre a linha original e a simplificada
+
+    Returns:
+        list: Pontos mantidos (sempre inclui o primeiro e o último)
+    """
+    points = list(points)
+    count = len(points)
+    if count < 3 or tolerance_m <= 0:
+        return points
+
+    mean_lat = sum(lat for lat, _ in points) / count
+    scale_x = METERS_PER_DEGREE * math.cos(math.radians(mean_lat))
+
+    keep = bytearray(count)
+    keep[0] = keep[-1] = 1
+    tolerance_sq = tolerance_m * tolerance_m
+
+    xs = [lng * scale_x for _, lng in points]
+    ys = [lat * METERS_PER_DEGREE for lat, _ in points]
+    xs_array = ys_array = None
+    if np is not None:
+        xs_array, ys_array = np.array(xs), np.array(ys)
+
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        # NumPy só compensa em trechos longos (custo fixo por chamada)
+        if xs_array is not None and last - first > VECTORIZE_MIN_POINTS:
+            index, max_dist_sq = _farthest_numpy(xs_array, ys_array, first, last)
+        else:
+            index, max_dist_sq = _farthest_python(xs, ys, first, last)
+
+        if max_dist_sq > tolerance_sq:
+            keep[index] = 1
+            if index - first > 1:
+                stack.append((first, index))
+            if last - index > 1:
+                stack.append((index, last))
+
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def simplify_encoded(encoded, tolerance_m, precision=5):
+    """
+    Decodifica, simplifica e recodifica uma polyline
+
+    Returns:
+        str: Polyline simplificada
+    """
+    return encode(simplify(decode(encoded, precision), tolerance_m), precision)
@@ -0,0 +1,266 @@
+"""
+EcoRouter - Profiling sob demanda das requisições (middleware WSGI)
+
+Perfila uma fração das requisições de /calculate, ou as que trazem o
+cabeçalho X-EcoRouter-Profile assinado com PROFILE_SECRET, e grava o
+resultado em PROFILE_DIR:
+
+- cprofile: arquivo .prof (pstats, snakeviz)
+- pyinstrument: relatório .html (requer pip install pyinstrument)
+- collapsed: pilhas amostradas em .folded (flamegraph.pl, speedscope)
+
+Sem PROFILE_ENABLED nem PROFILE_SECRET o middleware não é instalado
+(custo zero). Só o formato collapsed se limita à thread da requisição: o
+cProfile no Python 3.12+ (sys.monitoring) e o pyinstrument também registram
+outras threads do processo, como o pool de upstream e requisições simultâneas.
+"""
+
+import cProfile
+import hashlib
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+
+PROFILE_HEADER = 'HTTP_X_ECOROUTER_PROFILE'
+
+# Validade de um token assinado (segundos)
+TOKEN_TTL = 300
+
+
+def make_token(secret, timestamp=None):
+    """
+    Gera o valor do cabeçalho X-EcoRouter-Profile: "<timestamp>.<hmac>"
+    """
+    timestamp = str(int(timestamp if timestamp is not None else time.time()))
+    signature = hmac.new(secret.encode(), timestamp.encode(), hashlib.sha256).hexdigest()
+    return f"{timestamp}.{signature}"
+
+
+def verify_token(secret, token, now=None):
+    timestamp, _, signature = token.partition('.')
+    if not timestamp.isdigit() or not signature:
+        return False
+    now = now if now is not None else time.time()
+    if abs(now - int(timestamp)) > TOKEN_TTL:
+        return False
+    return hmac.compare_digest(make_token(secret, int(timestamp)), token)
+
+
+class StackSampler:
+    """
+    Amostrador de pilhas de uma thread (formato "collapsed" dos flamegraphs)
+    """
+
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                key = ';'.join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+
+class CProfileRecorder:
+    extension = 'prof'
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+
+    def dump(self, path):
+        self.profiler.dump_stats(path)
+
+
+class PyinstrumentRecorder:
+    extension = 'html'
+
+    def __init__(self):
+        from pyinstrument import Profiler  # Dependência opcional
+
+        self.profiler = Profiler(async_mode='disabled')
+
+    def start(self):
+        self.profiler.start()
+
+    def stop(self):
+        self.profiler.stop()
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.profiler.output_html())
+
+
+class CollapsedRecorder:
+    extension = 'folded'
+
+    def __init__(self):
+        self.sampler = StackSampler(threading.get_ident())
+
+    def start(self):
+        self.sampler.start()
+
+    def stop(self):
+        self.sampler.stop()
+
+    def dump(self, path):
+        self.sampler.dump(path)
+
+
+RECORDERS = {
+    'cprofile': CProfileRecorder,
+    'pyinstrument': PyinstrumentRecorder,
+    'collapsed': CollapsedRecorder,
+}
+
+
+class ProfiledBody:
+    """
+    Iterável da resposta WSGI perfilada: repassa os blocos sem materializar
+    o corpo e, no close(), fecha o iterável original e encerra o perfil
+    """
+
+    def __init__(self, iterable, on_close):
+        self.iterable = iterable
+        self.iterator = iter(iterable)
+        self.on_close = on_close
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.iterator)
+
+    def close(self):
+        on_close, self.on_close = self.on_close, None
+        if on_close is None:
+            return
+        try:
+            close = getattr(self.iterable, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            on_close()
+
+
+class ProfilingMiddleware:
+    """
+    Middleware WSGI que perfila requisições amostradas ou assinadas
+
+    Args:
+        app: Aplicação WSGI (ex.: flask_app.wsgi_app)
+        directory: Pasta onde os perfis são gravados
+        sample_rate: Fração das requisições perfiladas (0 = só com cabeçalho)
+        secret: Chave do HMAC do cabeçalho X-EcoRouter-Profile ('' = desativado)
+        profiler: 'cprofile', 'pyinstrument' ou 'collapsed'
+        paths: Caminhos elegíveis
+        max_files: Perfis mantidos na pasta (os mais antigos são apagados)
+    """
+
+    def __init__(self, app, directory='profiles', sample_rate=0.0, secret='',
+                 profiler='cprofile', paths=('/calculate',), max_files=200):
+        if profiler not in RECORDERS:
+            raise ValueError(f"PROFILE_FORMAT inválido: {profiler}")
+        if profiler == 'pyinstrument':
+            try:
+                import pyinstrument  # noqa: F401
+            except ImportError:
+                raise RuntimeError("PROFILE_FORMAT=pyinstrument requer: pip install pyinstrument")
+        self.app = app
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.secret = secret
+        self.recorder_class = RECORDERS[profiler]
+        self.paths = frozenset(paths)
+        self.max_files = max_files
+        os.makedirs(directory, exist_ok=True)
+
+    def should_profile(self, environ):
+        if environ.get('PATH_INFO') not in self.paths:
+            return False
+        token = environ.get(PROFILE_HEADER)
+        if token and self.secret and verify_token(self.secret, token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, environ, start_response):
+        if not self.should_profile(environ):
+            return self.app(environ, start_response)
+
+        try:
+            recorder = self.recorder_class()
+            recorder.start()
+        except (ValueError, RuntimeError):
+            # Outro profiler já ativo nesta thread/interpretador
+            return self.app(environ, start_response)
+
+        slug = environ['PATH_INFO'].strip('/').replace('/', '-') or 'root'
+        filename = (f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{os.getpid()}-"
+                    f"{threading.get_ident()}.{recorder.extension}")
+
+        def profiled_start_response(status, headers, exc_info=None):
+            headers.append(('X-EcoRouter-Profile-File', filename))
+            return start_response(status, headers, exc_info)
+
+        try:
+            body = self.app(environ, profiled_start_response)
+        except BaseException:
+            recorder.stop()
+            self._save(recorder, filename)
+            raise
+
+        # O perfil continua enquanto o servidor consome a resposta (inclui a
+        # serialização) e termina no close(): streams seguem em streaming
+        return ProfiledBody(body, lambda: self._finish(recorder, filename))
+
+    def _finish(self, recorder, filename):
+        recorder.stop()
+        self._save(recorder, filename)
+
+    def _save(self, recorder, filename):
+        try:
+            recorder.dump(os.path.join(self.directory, filename))
+            self._prune()
+        except OSError:
+            pass  # Profiling é best-effort
+
+    def _prune(self):
+        files = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.is_file()),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in files[:max(0, len(files) - self.max_files)]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
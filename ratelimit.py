@@ -0,0 +1,303 @@
+"""
+EcoRouter - Limite de taxa e cota das APIs do Google Maps
+Token bucket por API (geocode, directions, elevation) com cota diária
+opcional, compartilhado entre processos:
+
+- LocalBucketStore: apenas o processo atual
+- FileBucketStore: processos da mesma máquina (arquivo + flock)
+- RedisBucketStore: várias máquinas (script Lua atômico)
+
+Requisições aguardam por um token até um prazo (deadline); se a espera
+necessária ultrapassar o prazo, a requisição é recusada imediatamente
+(RateLimitExceeded → HTTP 429 com Retry-After).
+"""
+
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: FileBucketStore indisponível
+    fcntl = None
+
+
+class RateLimitExceeded(Exception):
+    """
+    Limite de taxa/cota atingido para uma API do Google Maps
+    """
+
+    def __init__(self, budget, retry_after):
+        self.budget = budget
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(
+            f"Limite de requisições ao Google Maps ({budget}) atingido. "
+            f"Tente novamente em {self.retry_after}s"
+        )
+
+
+def seconds_until_tomorrow(now):
+    """
+    Segundos até a virada do dia (UTC), quando a cota diária é renovada
+    """
+    return 86400 - (now % 86400)
+
+
+def take_token(state, rate, burst, daily_quota, max_wait, now):
+    """
+    Reserva um token do bucket (o saldo pode ficar negativo: é a fila)
+
+    Args:
+        state: Dict com tokens, updated, day e used (pode estar vazio)
+        rate: Tokens por segundo
+        burst: Capacidade do bucket
+        daily_quota: Máximo de chamadas por dia (0 = ilimitado)
+        max_wait: Espera máxima aceita pelo chamador em segundos
+        now: Timestamp atual
+
+    Returns:
+        tuple: (novo estado, reservado?, espera em segundos). Se reservado,
+               o chamador aguarda a espera e segue; senão, a espera é o
+               Retry-After sugerido
+    """
+    day = int(now // 86400)
+    tokens = state.get('tokens', burst)
+    updated = state.get('updated', now)
+    used = state.get('used', 0) if state.get('day') == day else 0
+
+    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+    state = {'tokens': tokens, 'updated': now, 'day': day, 'used': used}
+
+    if daily_quota and used >= daily_quota:
+        return state, False, seconds_until_tomorrow(now)
+
+    wait = max(0.0, (1 - tokens) / rate)
+    if wait > max_wait:
+        return state, False, wait
+
+    state['tokens'] = tokens - 1
+    state['used'] = used + 1
+    return state, True, wait
+
+
+class LocalBucketStore:
+    """
+    Buckets em memória (somente o processo atual)
+    """
+
+    blocking = False  # take não faz I/O: pode rodar no event loop
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states = {}
+
+    def take(self, budget, rate, burst, daily_quota, max_wait):
+        with self._lock:
+            state, granted, wait = take_token(
+                self._states.get(budget, {}), rate, burst, daily_quota, max_wait, time.time()
+            )
+            self._states[budget] = state
+            return granted, wait, state['used']
+
+
+class FileBucketStore:
+    """
+    Buckets em arquivos com flock (todos os workers da mesma máquina)
+    """
+
+    blocking = True
+
+    def __init__(self, path):
+        if fcntl is None:
+            raise RuntimeError("FileBucketStore requer fcntl (Linux/macOS)")
+        self.path = path
+
+    def take(self, budget, rate, burst, daily_quota, max_wait):
+        fd = os.open(f"{self.path}.{budget}", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.read(fd, 4096)
+            try:
+                state = json.loads(raw) if raw else {}
+            except ValueError:
+                state = {}
+
+            state, granted, wait = take_token(
+                state, rate, burst, daily_quota, max_wait, time.time()
+            )
+
+            data = json.dumps(state).encode()
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, data)
+            return granted, wait, state['used']
+        finally:
+            os.close(fd)  # Fechar o descritor libera o flock
+
+
+class RedisBucketStore:
+    """
+    Buckets no Redis (várias máquinas), atualizados atomicamente via Lua
+    """
+
+    blocking = True
+
+    SCRIPT = """
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local daily_quota = tonumber(ARGV[3])
+    local max_wait = tonumber(ARGV[4])
+    local day = math.floor(now / 86400)
+
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated', 'day', 'used')
+    local tokens = tonumber(state[1]) or burst
+    local updated = tonumber(state[2]) or now
+    local used = 0
+    if tonumber(state[3]) == day then used = tonumber(state[4]) or 0 end
+
+    tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+
+    local granted = 0
+    local wait = math.max(0, (1 - tokens) / rate)
+    if daily_quota > 0 and used >= daily_quota then
+        wait = 86400 - (now % 86400)
+    elseif wait <= max_wait then
+        granted = 1
+        tokens = tokens - 1
+        used = used + 1
+    end
+
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now, 'day', day, 'used', used)
+    redis.call('EXPIRE', KEYS[1], 172800)
+    return {granted, tostring(wait), used}
+    """
+
+    def __init__(self, url, prefix='ecorouter:ratelimit:'):
+        import redis  # Dependência opcional
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(self.SCRIPT)
+
+    def take(self, budget, rate, burst, daily_quota, max_wait):
+        granted, wait, used = self._script(
+            keys=[self.prefix + budget], args=[rate, burst, daily_quota, max_wait]
+        )
+        return bool(granted), float(wait), int(used)
+
+
+class BudgetStats:
+    def __init__(self):
+        self.granted = 0
+        self.delayed = 0
+        self.shed = 0
+        self.wait_ms = 0.0
+        self.used_today = 0
+
+    def snapshot(self):
+        return {
+            'granted': self.granted,
+            'delayed': self.delayed,
+            'shed': self.shed,
+            'wait_ms': round(self.wait_ms, 1),
+            'used_today': self.used_today
+        }
+
+
+class RateLimiter:
+    """
+    Limitador de taxa com orçamentos separados por API
+
+    Args:
+        store: LocalBucketStore, FileBucketStore ou RedisBucketStore
+        budgets: {api: {'rate': req/s, 'burst': tokens, 'daily_quota': n}}
+        max_wait: Tempo máximo (s) que uma requisição aguarda na fila
+
+    Raises:
+        ValueError: rate ou burst não positivos (take_token divide por rate)
+    """
+
+    def __init__(self, store, budgets, max_wait=2.0):
+        for budget, config in budgets.items():
+            rate = config['rate']
+            if not rate > 0 or rate == math.inf:
+                raise ValueError(f"Taxa de {budget} deve ser um número positivo (recebido: {rate})")
+            if not config.get('burst', rate) > 0:
+                raise ValueError(f"Rajada de {budget} deve ser positiva (recebido: {config['burst']})")
+        self.store = store
+        self.budgets = budgets
+        self.max_wait = max_wait
+        self._stats = {budget: BudgetStats() for budget in budgets}
+
+    def _reserve(self, budget, deadline):
+        """
+        Reserva um token e retorna quanto esperar por ele
+
+        Raises:
+            RateLimitExceeded: Se o token não fica disponível antes do prazo
+        """
+        config = self.budgets[budget]
+        stats = self._stats[budget]
+        max_wait = self.max_wait if deadline is None else max(0.0, deadline - time.monotonic())
+
+        granted, wait, used = self.store.take(
+            budget, config['rate'], config.get('burst', config['rate']),
+            config.get('daily_quota', 0), max_wait
+        )
+        stats.used_today = used
+
+        if not granted:
+            stats.shed += 1
+            raise RateLimitExceeded(budget, wait)
+
+        stats.granted += 1
+        if wait > 0:
+            stats.delayed += 1
+            stats.wait_ms += wait * 1000
+        return wait
+
+    def acquire(self, budget, deadline=None):
+        """
+        Aguarda um token da API (threads)
+
+        Args:
+            budget: Nome da API ('geocode', 'directions', ...)
+            deadline: Prazo absoluto (time.monotonic); padrão: agora + max_wait
+
+        Raises:
+            RateLimitExceeded: Se não houver token antes do prazo
+        """
+        if budget not in self.budgets:
+            return
+
+        wait = self._reserve(budget, deadline)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, budget, deadline=None):
+        """
+        Versão assíncrona de acquire (não bloqueia o event loop enquanto espera)
+
+        Stores com I/O (flock, Redis) são consultados em uma thread.
+        """
+        if budget not in self.budgets:
+            return
+
+        if getattr(self.store, 'blocking', True):
+            wait = await asyncio.to_thread(self._reserve, budget, deadline)
+        else:
+            wait = self._reserve(budget, deadline)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Consumo por API (concedidas, atrasadas, recusadas, uso do dia)
+        """
+        return {budget: stats.snapshot() for budget, stats in sorted(self._stats.items())}
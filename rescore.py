@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+EcoRouter - Reprocessamento offline do EcoScore
+Reavalia respostas arquivadas da Directions API (JSONL ou JSONL.gz) com
+pesos candidatos, sem chamar o Google novamente
+
+Cada linha do arquivo pode ser:
+- o payload bruto da Directions API ({"routes": [...]})
+- um registro de DIRECTIONS_ARCHIVE_PATH ({"directions": {...}, ...}),
+  opcionalmente com "id", "frequency" e "elevation_gains" (m, um por rota)
+
+Nenhuma API é consultada, nem a de elevação (mesmo com ELEVATION_PROVIDER=google):
+o ganho de elevação vem de "elevation_gains" do registro ou é zero.
+
+Uso:
+    python rescore.py arquivo.jsonl.gz --output resultados.csv \\
+        --weights '{"fluidez": 0.40, "distancia": 0.20}'
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import math
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import app
+import scoring
+
+OUTPUT_FIELDS = [
+    'source', 'line', 'id', 'routes', 'frequency',
+    'eco_index', 'std_index', 'baseline_eco_index', 'selection_changed',
+    'ecoscore_eco', 'ecoscore_std', 'distance_eco', 'distance_standard',
+    'co2_savings', 'baseline_co2_savings', 'co2_delta', 'error'
+]
+
+
+def open_archive(path):
+    """
+    Abre um arquivo JSONL, descompactando gzip automaticamente
+    """
+    with open(path, 'rb') as f:
+        is_gzip = f.read(2) == b'\x1f\x8b'
+    if is_gzip:
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def iter_chunks(paths, chunk_size):
+    """
+    Lê os arquivos linha a linha, agrupando em blocos de linhas brutas
+
+    O JSON é interpretado nos processos de trabalho; aqui só se lê texto.
+
+    Yields:
+        list: Tuplas (arquivo, número da linha, texto)
+    """
+    chunk = []
+    for path in paths:
+        source = os.path.basename(path)
+        with open_archive(path) as archive:
+            for line_no, line in enumerate(archive, start=1):
+                if not line.strip():
+                    continue
+                chunk.append((source, line_no, line))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
+
+
+def route_index(routes, route):
+    """
+    Posição de uma rota (por identidade) na lista da Directions API
+    """
+    return next(i for i, candidate in enumerate(routes) if candidate is route)
+
+
+def select_routes(data, frequency, weights=None, fluidez_weights=None, elevation_gains=None):
+    """
+    Escolhe as rotas eco/padrão e calcula a economia anual de CO₂
+
+    Args:
+        elevation_gains: Ganho de elevação arquivado de cada rota (None = zero;
+                         o provedor de elevação nunca é consultado)
+
+    Returns:
+        dict: Índices escolhidos, EcoScores, distâncias e economia
+    """
+    routes = data['routes']
+    if elevation_gains is None:
+        elevation_gains = [0] * len(routes)
+    std_route, eco_route, analysis = app.analyze_routes(
+        data, weights, fluidez_weights, elevation_gains=elevation_gains
+    )
+
+    distance_standard = analysis['std_totals']['distance_km']
+    distance_eco = analysis['eco_totals']['distance_km']
+    emissions = app.calculate_emissions(
+        distance_standard, distance_eco, analysis['ecoscore_eco'], frequency,
+        same_route=analysis['eco_index'] == analysis['std_index']
+    )
+
+    return {
+        'eco_index': route_index(routes, eco_route),
+        'std_index': route_index(routes, std_route),
+        'ecoscore_eco': analysis['ecoscore_eco'],
+        'ecoscore_std': analysis['ecoscore_std'],
+        'distance_eco': round(distance_eco, 3),
+        'distance_standard': round(distance_standard, 3),
+        'co2_savings': emissions['savings']
+    }
+
+
+def rescore_chunk(chunk, weights, fluidez_weights, default_frequency):
+    """
+    Reavalia um bloco de linhas (executado em um processo de trabalho)
+
+    Compara a escolha com os pesos candidatos com a escolha dos pesos atuais.
+
+    Returns:
+        list: Uma linha de saída por registro
+    """
+    rows = []
+    for source, line_no, line in chunk:
+        row = {'source': source, 'line': line_no}
+        try:
+            record = json.loads(line)
+            data = record.get('directions', record)
+            row['id'] = record.get('id')
+            frequency = int(record.get('frequency', default_frequency))
+            row['frequency'] = frequency
+            row['routes'] = len(data.get('routes', []))
+            elevation_gains = record.get('elevation_gains')
+
+            baseline = select_routes(data, frequency, elevation_gains=elevation_gains)
+            candidate = select_routes(data, frequency, weights, fluidez_weights, elevation_gains)
+
+            row.update(candidate)
+            row['baseline_eco_index'] = baseline['eco_index']
+            row['baseline_co2_savings'] = baseline['co2_savings']
+            row['selection_changed'] = candidate['eco_index'] != baseline['eco_index']
+            row['co2_delta'] = round(candidate['co2_savings'] - baseline['co2_savings'], 2)
+        except (ValueError, KeyError, TypeError, AttributeError, StopIteration) as e:
+            row['error'] = f'{type(e).__name__}: {e}'
+        rows.append(row)
+    return rows
+
+
+def iter_results(chunks, workers, **options):
+    """
+    Distribui os blocos entre processos mantendo no máximo 2 blocos por
+    processo em andamento (memória limitada, independente do tamanho da entrada)
+
+    Yields:
+        dict: Linhas de saída, na ordem de entrada
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield from rescore_chunk(chunk, **options)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(pool.submit(rescore_chunk, chunk, **options))
+            if len(in_flight) >= workers * 2:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+
+class CSVWriter:
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=OUTPUT_FIELDS)
+        self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """
+    Escrita incremental em Parquet (requer pyarrow)
+    """
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("❌ Saída Parquet requer o pacote pyarrow (pip install pyarrow)")
+
+        self.pa = pa
+        self.schema = pa.schema([
+            ('source', pa.string()), ('line', pa.int64()), ('id', pa.string()),
+            ('routes', pa.int64()), ('frequency', pa.int64()),
+            ('eco_index', pa.int64()), ('std_index', pa.int64()),
+            ('baseline_eco_index', pa.int64()), ('selection_changed', pa.bool_()),
+            ('ecoscore_eco', pa.float64()), ('ecoscore_std', pa.float64()),
+            ('distance_eco', pa.float64()), ('distance_standard', pa.float64()),
+            ('co2_savings', pa.float64()), ('baseline_co2_savings', pa.float64()),
+            ('co2_delta', pa.float64()), ('error', pa.string())
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        columns = {
+            name: [
+                str(row[name]) if name == 'id' and row.get(name) is not None else row.get(name)
+                for row in rows
+            ]
+            for name in OUTPUT_FIELDS
+        }
+        self.writer.write_table(self.pa.table(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def summarize(summary, row):
+    """
+    Atualiza os totais agregados com uma linha de saída
+    """
+    summary['records'] += 1
+    if row.get('error'):
+        summary['errors'] += 1
+        return
+
+    summary['scored'] += 1
+    if row['eco_index'] != row['std_index']:
+        summary['eco_differs_from_standard'] += 1
+    if row['selection_changed']:
+        summary['selection_changes'] += 1
+    summary['co2_savings'] += row['co2_savings']
+    summary['baseline_co2_savings'] += row['baseline_co2_savings']
+
+
+def parse_weights(flag, text, base):
+    """
+    Pesos de base sobrescritos pelo objeto JSON da linha de comando
+
+    Raises:
+        ValueError: JSON inválido, valor que não é um objeto, pesos
+                    desconhecidos ou não numéricos
+    """
+    overrides = json.loads(text)
+    if not isinstance(overrides, dict):
+        raise ValueError(f"{flag} deve ser um objeto JSON, ex.: '{{\"fluidez\": 0.4}}'")
+    unknown = set(overrides) - set(base)
+    if unknown:
+        raise ValueError(f"Pesos desconhecidos em {flag}: {', '.join(sorted(unknown))}")
+    for key, value in overrides.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f"{flag}.{key} deve ser um número")
+    return {**base, **overrides}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Reprocessa respostas arquivadas da Directions API')
+    parser.add_argument('inputs', nargs='+', help='Arquivos JSONL (ou .gz)')
+    parser.add_argument('--output', required=True, help='Arquivo de saída (.csv ou .parquet)')
+    parser.add_argument('--format', choices=['csv', 'parquet'],
+                        help='Formato de saída (padrão: pela extensão)')
+    parser.add_argument('--config',
+                        help='Configuração candidata do EcoScore (JSON de SCORING_CONFIG_PATH; '
+                             'usa os pesos, as faixas de emissão são as da configuração ativa)')
+    parser.add_argument('--weights', default='{}',
+                        help='Pesos candidatos do EcoScore em JSON (sobrescrevem ECOSCORE_WEIGHTS)')
+    parser.add_argument('--fluidez-weights', default='{}',
+                        help='Pesos candidatos da fluidez em JSON (sobrescrevem FLUIDEZ_WEIGHTS)')
+    parser.add_argument('--frequency', type=int, default=5,
+                        help='Frequência semanal quando o registro não informa (padrão: 5)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Processos de trabalho (1 = sem pool)')
+    parser.add_argument('--chunk-size', type=int, default=256,
+                        help='Registros por bloco enviado a cada processo')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    try:
+        base = scoring.load_config(args.config) if args.config else app.SCORING_CONFIG
+        weights = parse_weights('--weights', args.weights, base['weights'])
+        fluidez_weights = parse_weights('--fluidez-weights', args.fluidez_weights, base['fluidez_weights'])
+        if fluidez_weights['divisor'] == 0:
+            raise ValueError("--fluidez-weights.divisor não pode ser zero")
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"❌ Pesos inválidos: {e}")
+
+    output_format = args.format or ('parquet' if args.output.endswith('.parquet') else 'csv')
+    writer = ParquetWriter(args.output) if output_format == 'parquet' else CSVWriter(args.output)
+
+    summary = {
+        'records': 0, 'scored': 0, 'errors': 0,
+        'eco_differs_from_standard': 0, 'selection_changes': 0,
+        'co2_savings': 0.0, 'baseline_co2_savings': 0.0
+    }
+
+    results = iter_results(
+        iter_chunks(args.inputs, args.chunk_size),
+        args.workers,
+        weights=weights,
+        fluidez_weights=fluidez_weights,
+        default_frequency=args.frequency
+    )
+
+    batch = []
+    try:
+        for row in results:
+            summarize(summary, row)
+            batch.append(row)
+            if len(batch) >= args.chunk_size:
+                writer.write(batch)
+                batch = []
+        if batch:
+            writer.write(batch)
+    finally:
+        writer.close()
+
+    summary['co2_savings'] = round(summary['co2_savings'], 2)
+    summary['baseline_co2_savings'] = round(summary['baseline_co2_savings'], 2)
+    summary['co2_delta'] = round(summary['co2_savings'] - summary['baseline_co2_savings'], 2)
+    summary['weights'] = weights
+    summary['fluidez_weights'] = fluidez_weights
+    summary['baseline_version'] = app.SCORING_VERSION
+    if (weights, fluidez_weights) == (base['weights'], base['fluidez_weights']):
+        summary['candidate_version'] = base['version']
+    else:
+        summary['candidate_version'] = app.scoring_version(weights, fluidez_weights)
+
+    json.dump(summary, sys.stdout, indent=2, ensure_ascii=False)
+    print()
+
+
+if __name__ == '__main__':
+    main()
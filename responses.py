@@ -0,0 +1,112 @@
+"""
+EcoRouter - Serialização e compressão das respostas JSON
+- dumps: orjson quando instalado (opcional), senão json da biblioteca padrão
+- negotiate_encoding: br (se o módulo brotli estiver instalado) ou gzip,
+  conforme o Accept-Encoding do cliente
+- EncodedResponse: corpo serializado uma única vez e comprimido uma única
+  vez por codificação (pode ser guardado em cache já pronto)
+"""
+
+import gzip
+import json
+import threading
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional: sem ele, json da biblioteca padrão
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele, só gzip
+    brotli = None
+
+# Media type do modo compacto (alternativa a ?compact=1)
+COMPACT_MEDIA_TYPE = 'application/vnd.ecorouter.compact+json'
+
+# Corpos menores que isso não compensam a compressão
+MIN_COMPRESS_BYTES = 512
+
+# Codificações suportadas, em ordem de preferência
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def dumps(payload):
+    """
+    Returns:
+        bytes: JSON em UTF-8, sem espaços
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def wants_compact(query_value, accept):
+    """
+    Modo compacto pedido por ?compact=1 ou Accept: application/vnd.ecorouter.compact+json
+    """
+    return (query_value or '').lower() in ('1', 'true', 'yes') or COMPACT_MEDIA_TYPE in (accept or '')
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Escolhe a codificação do corpo a partir do cabeçalho Accept-Encoding
+
+    Returns:
+        str: 'br', 'gzip' ou None (sem compressão)
+    """
+    accepted = set()
+    for item in (accept_encoding or '').split(','):
+        token, _, params = item.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(token.strip().lower())
+
+    for encoding in ENCODINGS:
+        if encoding in accepted or '*' in accepted:
+            return encoding
+    return None
+
+
+class EncodedResponse:
+    """
+    Corpo JSON serializado, com as versões comprimidas criadas sob demanda
+    (ou antecipadamente, com precompress) e reaproveitadas
+    """
+
+    def __init__(self, payload):
+        self.body = dumps(payload)
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def precompress(self):
+        if len(self.body) >= MIN_COMPRESS_BYTES:
+            for encoding in ENCODINGS:
+                self.encoded(encoding)
+        return self
+
+    def encoded(self, encoding):
+        """
+        Returns:
+            tuple: (codificação usada ou None, corpo)
+        """
+        if encoding is None or len(self.body) < MIN_COMPRESS_BYTES:
+            return None, self.body
+
+        body = self._encoded.get(encoding)
+        if body is None:
+            body = compress(self.body, encoding)
+            with self._lock:
+                self._encoded[encoding] = body
+        return encoding, body
@@ -0,0 +1,162 @@
+"""
+EcoRouter - Análise dos trechos (steps) das rotas
+Classifica cada step da Directions API por tipo de via e estima paradas,
+em uma única passada por legs[].steps[]
+
+Classificação (nesta ordem):
+1. Nome da via nas html_instructions (Rodovia, SP-280, Avenida, Rua, ...)
+2. Manobra (merge/ramp indicam via expressa)
+3. Velocidade média do trecho (distância ÷ duração)
+"""
+
+import re
+
+# Tabelas compiladas uma única vez na importação
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+
+ROAD_NAME_PATTERNS = [
+    ('trunk', re.compile(
+        # \b final só nas palavras: depois de "Rod." vem espaço, não letra
+        r'\b(?:(?:rodovia|via expressa|marginal|anel vi[aá]rio|highway|hwy|freeway|'
+        r'expressway|motorway|interstate|(?:br|sp|rj|mg|pr|sc|rs|go|ba|pe)-\d{2,3}|i-\d+)\b|rod\.)',
+        re.IGNORECASE
+    )),
+    ('primary', re.compile(
+        r'\b(avenida|av\.|estrada|estr\.|avenue|ave\.|boulevard|blvd|parkway)',
+        re.IGNORECASE
+    )),
+    ('residential', re.compile(
+        r'\b(rua|r\.|travessa|tv\.|alameda|al\.|viela|vila|passagem|street|st\.|lane|ln\.|'
+        r'court|ct\.|drive|dr\.|place|pl\.)',
+        re.IGNORECASE
+    )),
+]
+
+# Manobras típicas de acesso a vias expressas
+TRUNK_MANEUVERS = frozenset({'merge', 'ramp-left', 'ramp-right'})
+
+# Manobras que normalmente exigem parada ou quase parada
+STOP_MANEUVERS = frozenset({
+    'turn-left', 'turn-right', 'turn-sharp-left', 'turn-sharp-right',
+    'uturn-left', 'uturn-right', 'roundabout-left', 'roundabout-right'
+})
+
+# Paradas adicionais (semáforos, cruzamentos) por km em cada tipo de via
+STOPS_PER_KM = {
+    'trunk': 0.0,
+    'primary': 1.0,
+    'secondary': 1.5,
+    'residential': 2.0
+}
+
+# Limites de velocidade média (km/h) para classificação sem nome reconhecido
+SPEED_CLASSES = (
+    (70, 'trunk'),
+    (45, 'primary'),
+    (25, 'secondary'),
+)
+
+DEFAULT_ROAD_TYPE = 'secondary'
+
+
+def classify_step(step):
+    """
+    Classifica um step por tipo de via
+
+    Args:
+        step: Step da Directions API
+
+    Returns:
+        str: 'trunk', 'primary', 'secondary' ou 'residential'
+    """
+    distance_m = step.get('distance', {}).get('value', 0)
+    duration_s = step.get('duration', {}).get('value', 0)
+    speed_kmh = (distance_m / duration_s) * 3.6 if duration_s else 0
+
+    if step.get('maneuver') in TRUNK_MANEUVERS:
+        return 'trunk'
+
+    instructions = HTML_TAG_RE.sub(' ', step.get('html_instructions', ''))
+    for road_type, pattern in ROAD_NAME_PATTERNS:
+        if pattern.search(instructions):
+            # "Rua" rápida é, na prática, uma via coletora
+            if road_type == 'residential' and speed_kmh >= 40:
+                return 'secondary'
+            return road_type
+
+    for min_speed, road_type in SPEED_CLASSES:
+        if speed_kmh >= min_speed:
+            return road_type
+
+    return 'residential' if duration_s else DEFAULT_ROAD_TYPE
+
+
+def analyze_steps(route):
+    """
+    Percorre todos os steps de todas as legs uma única vez
+
+    Args:
+        route: Rota da Directions API
+
+    Returns:
+        dict: road_type (dominante por distância), road_shares (fração da
+              distância por tipo de via), estimated_stops, totais da rota
+              (distance_km, duration_min, duration_in_traffic_min) e legs
+              (os mesmos totais por trecho entre paradas)
+    """
+    distance_by_type = {}
+    total_distance = 0
+    stops = 0.0
+    legs = []
+    leg_distance = leg_duration = leg_traffic = 0
+
+    for leg in route.get('legs', []):
+        leg_stops = 0.0
+
+        for step in leg.get('steps', []):
+            road_type = classify_step(step)
+            distance_m = step.get('distance', {}).get('value', 0)
+
+            distance_by_type[road_type] = distance_by_type.get(road_type, 0) + distance_m
+            total_distance += distance_m
+
+            if step.get('maneuver') in STOP_MANEUVERS:
+                leg_stops += 1
+            leg_stops += STOPS_PER_KM[road_type] * distance_m / 1000
+
+        distance = leg.get('distance', {}).get('value', 0)
+        duration = leg.get('duration', {}).get('value', 0)
+        traffic = leg.get('duration_in_traffic', {}).get('value', duration)
+        leg_distance += distance
+        leg_duration += duration
+        leg_traffic += traffic
+        stops += leg_stops
+
+        legs.append({
+            'start_address': leg.get('start_address', ''),
+            'end_address': leg.get('end_address', ''),
+            'distance_km': distance / 1000,
+            'duration_min': duration / 60,
+            'duration_in_traffic_min': traffic / 60,
+            'estimated_stops': int(round(leg_stops))
+        })
+
+    totals = {
+        'estimated_stops': int(round(stops)),
+        'distance_km': leg_distance / 1000,
+        'duration_min': leg_duration / 60,
+        'duration_in_traffic_min': leg_traffic / 60,
+        'legs': legs
+    }
+
+    if not total_distance:
+        return dict(totals, road_type=DEFAULT_ROAD_TYPE, road_shares={})
+
+    return dict(
+        totals,
+        road_type=max(distance_by_type, key=distance_by_type.get),
+        road_shares={
+            road_type: round(distance / total_distance, 3)
+            for road_type, distance in distance_by_type.items()
+        }
+    )
@@ -0,0 +1,120 @@
+"""
+EcoRouter - Configuração versionada do EcoScore
+Pesos do EcoScore v4, pesos do subscore de fluidez e faixas de emissão em
+um único arquivo JSON (SCORING_CONFIG_PATH), identificado por uma versão
+
+Os resultados armazenados (índice de corredores) guardam os scores por fator
+de cada rota e a versão usada; com outra versão ativa, são repesados sem
+chamar o Google nem renormalizar (app.reweight_route_data).
+
+Formato (todas as chaves são opcionais; o que faltar vem de DEFAULT_CONFIG):
+    {"version": "v4.1",
+     "weights": {"fluidez": 0.40, "distancia": 0.20},
+     "fluidez_weights": {"tempo": 0.8, "trafego": 0.3, "paradas": 0.2, "divisor": 1.3},
+     "ecoscore_bands": [35, 50, 65, 80],
+     "band_factors": {"gasolina": [0.165, 0.148, 0.135, 0.122, 0.115]}}
+"""
+
+import hashlib
+import json
+
+DEFAULT_VERSION = 'v4'
+
+DEFAULT_CONFIG = {
+    'version': DEFAULT_VERSION,
+    # EcoScore v4 = 0.35 * fluidez + 0.20 * elevacao + 0.25 * distancia + 0.15 * via + 0.05
+    'weights': {
+        'fluidez': 0.35,
+        'elevacao': 0.20,
+        'distancia': 0.25,
+        'via': 0.15,
+        'reserva': 0.05  # Margem/reserva
+    },
+    # Fluidez = (Tempo × 0.8 + Tráfego × 0.3 + Paradas × 0.2) / 1.3
+    'fluidez_weights': {
+        'tempo': 0.8,
+        'trafego': 0.3,
+        'paradas': 0.2,
+        'divisor': 1.3
+    },
+    # Limites inferiores das faixas de emissão (ver emissions.ECOSCORE_BANDS)
+    'ecoscore_bands': [35, 50, 65, 80],
+    # Fatores kg CO₂/km por faixa, por combustível (vazio = emissions.FUEL_PROFILES)
+    'band_factors': {}
+}
+
+# Campos que definem o resultado (entram na impressão digital da versão)
+SCORING_FIELDS = ('weights', 'fluidez_weights', 'ecoscore_bands', 'band_factors')
+
+
+def fingerprint(config):
+    """
+    Impressão digital (8 caracteres hex) dos pesos e faixas de uma configuração
+    """
+    canonical = json.dumps({name: config[name] for name in SCORING_FIELDS}, sort_keys=True)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:8]
+
+
+def validate(config):
+    """
+    Raises:
+        ValueError: Pesos ausentes ou não numéricos, faixas fora de ordem
+                    ou fatores em quantidade diferente do número de faixas
+    """
+    for name in ('weights', 'fluidez_weights'):
+        for key, value in config[name].items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"{name}.{key} deve ser um número")
+    if config['fluidez_weights']['divisor'] == 0:
+        raise ValueError("fluidez_weights.divisor não pode ser zero")
+
+    bands = config['ecoscore_bands']
+    if not bands or any(low >= high for low, high in zip(bands, bands[1:])):
+        raise ValueError("ecoscore_bands deve ser uma lista crescente de limites")
+    for fuel, factors in config['band_factors'].items():
+        if len(factors) != len(bands) + 1:
+            raise ValueError(f"band_factors.{fuel} deve ter {len(bands) + 1} valores")
+
+
+def load_config(path=None):
+    """
+    Configuração de EcoScore ativa: DEFAULT_CONFIG com as chaves do arquivo
+
+    Sem "version" no arquivo, a versão é "custom-<impressão digital>": pesos
+    diferentes nunca compartilham a mesma versão.
+
+    Returns:
+        dict: version, weights, fluidez_weights, ecoscore_bands e band_factors
+    """
+    config = json.loads(json.dumps(DEFAULT_CONFIG))  # Cópia profunda
+    if not path:
+        return config
+
+    with open(path, encoding='utf-8') as f:
+        overrides = json.load(f)
+
+    unknown = set(overrides) - set(DEFAULT_CONFIG)
+    if unknown:
+        raise ValueError(f"Chaves desconhecidas na configuração do EcoScore: {', '.join(sorted(unknown))}")
+
+    for name in ('weights', 'fluidez_weights'):
+        extra = set(overrides.get(name, {})) - set(config[name])
+        if extra:
+            raise ValueError(f"Pesos desconhecidos em {name}: {', '.join(sorted(extra))}")
+        config[name].update(overrides.get(name, {}))
+    if 'ecoscore_bands' in overrides:
+        config['ecoscore_bands'] = list(overrides['ecoscore_bands'])
+    config['band_factors'] = {
+        fuel: list(factors) for fuel, factors in overrides.get('band_factors', {}).items()
+    }
+
+    validate(config)
+    config['version'] = str(overrides.get('version') or f"custom-{fingerprint(config)}")
+    return config
+
+
+def custom_version(config, weights, fluidez_weights):
+    """
+    Versão de pesos candidatos (ex.: rescore.py) sobre uma configuração
+    """
+    return f"custom-{fingerprint(dict(config, weights=weights, fluidez_weights=fluidez_weights))}"
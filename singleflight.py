@@ -0,0 +1,107 @@
+"""
+EcoRouter - Coalescência de requisições em andamento (single-flight)
+Chamadas concorrentes com a mesma chave compartilham uma única execução:
+a primeira faz a chamada ao Google e as demais aguardam o mesmo resultado
+(ou a mesma exceção)
+
+- SingleFlight: modo com threads (Flask/WSGI)
+- AsyncSingleFlight: modo assíncrono (ASGI)
+"""
+
+import asyncio
+import threading
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Single-flight para código com threads
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Executa fn(*args, **kwargs), ou aguarda a execução já em andamento para key
+
+        Returns:
+            O resultado de fn (compartilhado entre todas as chamadas concorrentes)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def stats(self):
+        return {'calls': self.calls, 'coalesced': self.coalesced, 'in_flight': len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """
+    Single-flight para corrotinas (uma task compartilhada por chave)
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key, coro_fn, *args, **kwargs):
+        """
+        Aguarda coro_fn(*args, **kwargs), compartilhando a task com chamadas
+        concorrentes de mesma chave
+
+        O cancelamento de um dos chamadores não cancela a task compartilhada.
+        """
+        task = self._tasks.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(coro_fn(*args, **kwargs))
+            self._tasks[key] = task
+            self.calls += 1
+
+            def forget(done, key=key):
+                if self._tasks.get(key) is done:
+                    del self._tasks[key]
+
+            task.add_done_callback(forget)
+
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {'calls': self.calls, 'coalesced': self.coalesced, 'in_flight': len(self._tasks)}
@@ -170,6 +170,7 @@ async function calculateRoute() {
         document.getElementById('kmCarEquivalent').textContent = data.emissions.km_car_equivalent;
         document.getElementById('impactMessage').textContent = data.impact_message;
         document.getElementById('analysisMessage').textContent = data.analysis_message || '';
+        showFreshness(data.freshness);
 
         // Preencher EcoScore resumido
         if (data.ecoscore) {
@@ -209,6 +210,20 @@ async function calculateRoute() {
 }
 
 // ============ Geração do Mapa Embed ============
+// Aviso quando os dados de trânsito vêm de um cache em atualização
+function showFreshness(freshness) {
+    const notice = document.getElementById('freshnessNotice');
+
+    if (freshness && freshness.status === 'stale') {
+        const minutes = Math.max(1, Math.round((freshness.age_seconds || 0) / 60));
+        notice.textContent = `⏳ Trânsito aproximado (dados de ${minutes} min atrás, atualizando)`;
+        notice.style.display = 'block';
+    } else {
+        notice.textContent = '';
+        notice.style.display = 'none';
+    }
+}
+
 function generateMapEmbed(data) {
     // Cria um iframe do Google Maps mostrando a rota ecológica
     const origin = `${data.origin_coords.lat},${data.origin_coords.lng}`;
@@ -0,0 +1,119 @@
+"""
+Configuração comum dos testes: raiz do projeto no sys.path e um ambiente
+isolado (caches em pasta temporária, sem elevação nem chamadas ao Google)
+antes de importar app.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# O .env local não sobrescreve estas variáveis (load_dotenv não substitui)
+_cache_dir = tempfile.mkdtemp(prefix='ecorouter-tests-')
+os.environ.update({
+    'GEOCODE_CACHE_PATH': os.path.join(_cache_dir, 'cache.sqlite3'),
+    'ROUTE_CACHE_PATH': os.path.join(_cache_dir, 'cache.sqlite3'),
+    'CORRIDOR_INDEX_PATH': os.path.join(_cache_dir, 'cache.sqlite3'),
+    'CORRIDOR_LOG_PATH': '',
+    'DIRECTIONS_ARCHIVE_PATH': '',
+    'ELEVATION_PROVIDER': 'none',
+    'RATE_LIMIT_BACKEND': 'none',
+    'SCORING_CONFIG_PATH': '',
+    'FUEL_PROFILES_PATH': '',
+    'PROFILE_ENABLED': '',
+    'PROFILE_SECRET': '',
+    'GOOGLE_MAPS_API_KEY': '',
+})
+
+FIXTURES_DIR = os.path.join(ROOT, 'benchmarks', 'fixtures')
+
+
+@pytest.fixture(scope='session')
+def directions_payloads():
+    """
+    Respostas gravadas da Directions API (2 e 3 rotas por payload)
+    """
+    with open(os.path.join(FIXTURES_DIR, 'directions.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+class FakeMapsClient:
+    """
+    Substituto de app.maps_client: Geocoding com coordenadas derivadas do
+    endereço e Directions com os payloads gravados, contando as chamadas e
+    o máximo de chamadas simultâneas
+    """
+
+    def __init__(self, payloads, delay=0.0):
+        self.payloads = payloads
+        self.delay = delay
+        self.directions = lambda params: payloads[0]  # Substituível por teste
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def respond(self, endpoint, params):
+        if endpoint == 'geocode':
+            address = params['address']
+            if 'inexistente' in address.lower():
+                return {'status': 'ZERO_RESULTS', 'results': []}
+            # Coordenadas estáveis por endereço (ao redor de São Paulo)
+            digest = zlib.crc32(address.strip().lower().encode('utf-8'))
+            location = {'lat': -23.5 - (digest % 1000) / 10000, 'lng': -46.6 - (digest // 1000 % 1000) / 10000}
+            return {'status': 'OK', 'results': [
+                {'geometry': {'location': location}, 'formatted_address': address}
+            ]}
+        return self.directions(params)
+
+    def get_json(self, endpoint, params):
+        with self._lock:
+            self.calls.append((endpoint, dict(params)))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+            return self.respond(endpoint, params)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def endpoint_calls(self, endpoint):
+        return [params for name, params in self.calls if name == endpoint]
+
+    def stats(self):
+        return {}
+
+    def quota_stats(self):
+        return {}
+
+
+@pytest.fixture
+def maps(directions_payloads, monkeypatch):
+    """
+    app.py com o Google Maps simulado e caches vazios (só em memória)
+    """
+    import app
+    from cache import GeocodeCache, RouteCache, TwoTierCache
+    from corridors import CorridorIndex
+    from singleflight import AsyncSingleFlight, SingleFlight
+
+    client = FakeMapsClient(directions_payloads)
+    monkeypatch.setattr(app, 'maps_client', client)
+    monkeypatch.setattr(app, 'GOOGLE_MAPS_API_KEY', 'test-key')
+    monkeypatch.setattr(app, 'geocode_cache', GeocodeCache())
+    monkeypatch.setattr(app, 'route_cache', RouteCache(bucket_minutes=app.route_cache.bucket_minutes))
+    monkeypatch.setattr(app, 'response_cache', TwoTierCache(table='responses'))
+    monkeypatch.setattr(app, 'upstream_flight', SingleFlight())
+    monkeypatch.setattr(app, 'async_upstream_flight', AsyncSingleFlight())
+    return client
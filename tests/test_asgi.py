@@ -0,0 +1,132 @@
+"""
+Modo ASGI (asgi.py) via httpx.ASGITransport, com o Google Maps simulado
+atrás do cliente assíncrono real (GoogleMapsClient.aget_json)
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import app
+import asgi
+from google_client import GoogleMapsClient
+
+TRIP = {'origin': 'Sorocaba, SP', 'destination': 'Av. Paulista, 1000, São Paulo', 'frequency': 5}
+
+
+class MockTransportClient(GoogleMapsClient):
+    """
+    GoogleMapsClient cujo httpx.AsyncClient responde por um MockTransport
+    """
+
+    def __init__(self, handler):
+        super().__init__(api_key='test-key', base_url='https://maps.test/api',
+                         max_retries=1, backoff_base=0)
+        self.transport = httpx.MockTransport(handler)
+
+    @property
+    def async_client(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_clients:
+            self._async_clients[loop] = httpx.AsyncClient(transport=self.transport)
+        return self._async_clients[loop]
+
+
+@pytest.fixture
+def google(maps, monkeypatch):
+    """
+    Requisições recebidas pelo "Google"; failures[endpoint] respostas 503 antes da resposta normal
+    """
+    received = []
+    failures = {}
+
+    def handler(request):
+        endpoint = request.url.path.split('/')[-2]
+        params = dict(request.url.params)
+        received.append((endpoint, params))
+        if failures.get(endpoint):
+            failures[endpoint] -= 1
+            return httpx.Response(503)
+        return httpx.Response(200, json=maps.respond(endpoint, params))
+
+    client = MockTransportClient(handler)
+    monkeypatch.setattr(app, 'maps_client', client)
+    return SimpleNamespace(received=received, failures=failures, client=client)
+
+
+def post(*requests):
+    """
+    Envia as requisições em sequência a asgi.application (um único event loop)
+    """
+    async def run():
+        transport = httpx.ASGITransport(app=asgi.application)
+        async with httpx.AsyncClient(transport=transport, base_url='http://ecorouter') as client:
+            try:
+                return [await client.request(method, url, **kwargs) for method, url, kwargs in requests]
+            finally:
+                await app.maps_client.aclose()
+
+    return asyncio.run(run())
+
+
+def endpoints(google):
+    return [endpoint for endpoint, _ in google.received]
+
+
+def test_calculate_through_async_client(google):
+    first, repeat = post(
+        ('POST', '/calculate', {'json': TRIP, 'headers': {'Accept-Encoding': 'br'}}),
+        ('POST', '/calculate', {'json': TRIP, 'headers': {'Accept-Encoding': 'gzip'}}),
+    )
+
+    assert first.status_code == 200
+    assert first.headers['content-encoding'] == 'br'
+    assert first.json()['ecoscore']['eco'] > 0
+    assert first.json()['origin_coords'] == {
+        key: app.geocode_cache.get(TRIP['origin'])[key] for key in ('lat', 'lng')
+    }
+    assert sorted(endpoints(google)) == ['directions', 'geocode', 'geocode']
+    assert all(params['key'] == 'test-key' for _, params in google.received)
+
+    # Repetição: corpo do response_cache, sem novas chamadas ao Google
+    assert repeat.status_code == 200
+    assert repeat.headers['content-encoding'] == 'gzip'
+    assert repeat.json() == first.json()
+    assert len(google.received) == 3
+    assert google.client._async_clients == {}  # fechado por aclose()
+
+
+def test_calculate_retries_upstream_errors(google):
+    google.failures['directions'] = 1
+    (response,) = post(('POST', '/calculate', {'json': TRIP}))
+
+    assert response.status_code == 200
+    assert endpoints(google).count('directions') == 2
+    assert app.maps_client.stats()['directions']['retries'] == 1
+
+
+def test_calculate_errors(google):
+    google.failures['directions'] = 2  # Além de max_retries
+    invalid, not_a_dict, not_found, upstream = post(
+        ('POST', '/calculate', {'content': b'{', 'headers': {'Content-Type': 'application/json'}}),
+        ('POST', '/calculate', {'json': [TRIP]}),
+        ('POST', '/calculate', {'json': dict(TRIP, origin='Rua Inexistente, 0')}),
+        ('POST', '/calculate', {'json': TRIP}),
+    )
+
+    assert (invalid.status_code, invalid.json()) == (400, {'error': 'JSON inválido'})
+    assert not_a_dict.status_code == 400
+    assert not_found.status_code == 400
+    assert not_found.json() == {'error': 'Endereço não encontrado: Rua Inexistente, 0'}
+    assert upstream.status_code == 400
+    assert upstream.json()['error'].startswith('Erro ao calcular rota:')
+
+
+def test_other_routes_are_served_by_flask(google):
+    (response,) = post(('GET', '/stats', {}))
+
+    assert response.status_code == 200
+    assert set(response.json()) >= {'route_cache', 'upstream', 'singleflight'}
+    assert google.received == []
@@ -0,0 +1,90 @@
+"""
+Lote de deslocamentos (/calculate/batch) com o Google Maps simulado
+"""
+
+import json
+
+import app
+
+
+def trip(origin, destination, frequency=5, **extra):
+    return {'origin': origin, 'destination': destination, 'frequency': frequency, **extra}
+
+
+def test_batch_streams_ndjson(maps):
+    items = [trip('Sorocaba, SP', 'Av. Paulista, 1000, São Paulo', id='a'),
+             trip('Campinas, SP', 'Av. Paulista, 1000, São Paulo', id='b')]
+    response = app.app.test_client().post('/calculate/batch', json={'items': items})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert sorted((line['index'], line['id']) for line in lines[:-1]) == [(0, 'a'), (1, 'b')]
+    assert all(line['result']['ecoscore']['eco'] for line in lines[:-1])
+    assert lines[-1] == {'summary': {'total': 2, 'ok': 2, 'errors': 0,
+                                     'geocode_calls': 3, 'route_calls': 2}}
+
+
+def test_batch_rejects_empty_or_oversized(maps, monkeypatch):
+    client = app.app.test_client()
+    assert client.post('/calculate/batch', json={'items': []}).status_code == 400
+    assert client.post('/calculate/batch', json={'origin': 'Sorocaba'}).status_code == 400
+
+    monkeypatch.setattr(app, 'BATCH_MAX_ITEMS', 1)
+    response = client.post('/calculate/batch', json=[trip('A', 'B'), trip('C', 'D')])
+    assert response.status_code == 400
+    assert maps.calls == []
+
+
+def test_batch_reports_errors_per_item(maps):
+    items = [
+        'não é um deslocamento',
+        trip('', 'Av. Paulista, 1000, São Paulo'),
+        trip('Sorocaba, SP', 'Av. Paulista, 1000, São Paulo', frequency=9),
+        trip('Rua Inexistente, 0', 'Av. Paulista, 1000, São Paulo'),
+        trip('Sorocaba, SP', 'Av. Paulista, 1000, São Paulo'),
+    ]
+    lines = list(app.iter_batch_results(items, concurrency=4))
+    by_index = {line['index']: line for line in lines[:-1]}
+
+    assert by_index[0]['error'] == 'Item inválido'
+    assert by_index[1]['error'] == 'Por favor, preencha origem e destino'
+    assert by_index[2]['error'] == 'Frequência deve ser entre 1 e 7 vezes por semana'
+    assert by_index[3]['error'] == 'Endereço não encontrado: Rua Inexistente, 0'
+    assert 'result' in by_index[4]
+    assert lines[-1]['summary']['ok'] == 1
+    assert lines[-1]['summary']['errors'] == 4
+    # O destino em comum é geocodificado uma vez; só o par válido chama a Directions API
+    assert len(maps.endpoint_calls('geocode')) == 3
+    assert len(maps.endpoint_calls('directions')) == 1
+
+
+def test_batch_coalesces_duplicates(maps):
+    items = [
+        trip('Sorocaba, SP', 'Av. Paulista, 1000, São Paulo', frequency=5),
+        trip('  sorocaba ,SP ', 'av. paulista, 1000,  são paulo', frequency=2),
+        trip('Sorocaba, SP', 'Av. Paulista, 1000, São Paulo', frequency=7),
+    ]
+    lines = list(app.iter_batch_results(items, concurrency=4))
+    results = {line['index']: line['result'] for line in lines[:-1]}
+
+    assert lines[-1]['summary']['geocode_calls'] == 2
+    assert lines[-1]['summary']['route_calls'] == 1
+    assert len(maps.endpoint_calls('geocode')) == 2
+    assert len(maps.endpoint_calls('directions')) == 1
+    # Mesma rota, emissões proporcionais à frequência de cada item
+    assert len({results[i]['ecoscore']['eco'] for i in results}) == 1
+    totals = [results[i]['emissions']['total_standard'] for i in range(3)]
+    assert totals[2] > totals[0] > totals[1]
+
+
+def test_batch_bounds_concurrent_calls(maps):
+    maps.delay = 0.02
+    items = [trip(f'Rua {i}, Sorocaba', f'Rua {i}, São Paulo') for i in range(6)]
+    lines = list(app.iter_batch_results(items, concurrency=2))
+
+    assert lines[-1]['summary'] == {'total': 6, 'ok': 6, 'errors': 0,
+                                    'geocode_calls': 12, 'route_calls': 6}
+    assert len(maps.calls) == 18
+    assert maps.max_in_flight == 2
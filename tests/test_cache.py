@@ -0,0 +1,113 @@
+"""
+Cache em dois níveis, geocodificação e chaves do cache de rotas
+"""
+
+import time
+
+import pytest
+
+import cache as cache_module
+from cache import GeocodeCache, LRUCache, RouteCache, TwoTierCache, normalize_address
+
+ORIGIN = {'lat': -23.5015, 'lng': -47.4526}
+DEST = {'lat': -23.5489, 'lng': -46.6388}
+PAYLOAD = {'status': 'OK', 'routes': [{'legs': [{'duration': {'value': 600}}]}]}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Relógio controlado pelo teste (cache.time.time)"""
+    now = [1_800_000_000.0]
+    monkeypatch.setattr(cache_module.time, 'time', lambda: now[0])
+    return now
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(maxsize=2)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    assert lru.get('a') == 1  # "b" passa a ser o menos usado
+    lru.set('c', 3)
+
+    assert lru.get('b') is None
+    assert (lru.get('a'), lru.get('c')) == (1, 3)
+    assert len(lru) == 2
+
+
+def test_lru_entries_expire(clock):
+    lru = LRUCache(maxsize=8, ttl=60)
+    lru.set('padrao', 1)
+    lru.set('curto', 2, ttl=10)
+    lru.set('eterno', 3, ttl=0)
+
+    clock[0] += 30
+    assert (lru.get('padrao'), lru.get('curto'), lru.get('eterno')) == (1, None, 3)
+    clock[0] += 31
+    assert (lru.get('padrao'), lru.get('eterno')) == (None, 3)
+    assert len(lru) == 1
+
+
+def test_disk_hit_is_promoted_to_memory(tmp_path, clock):
+    path = str(tmp_path / 'cache.db')
+    TwoTierCache(path=path, ttl=60).set_key('k', {'v': 1})
+
+    fresh = TwoTierCache(path=path, ttl=60)  # outro processo: LRU vazio
+    assert fresh.get_key('k') == {'v': 1}
+    assert fresh.get_key('k') == {'v': 1}
+    assert fresh.stats() == {'memory_hits': 1, 'disk_hits': 1, 'misses': 0,
+                             'hit_ratio': 1.0, 'memory_size': 1}
+
+    # A entrada promovida mantém a expiração gravada no disco
+    clock[0] += 61
+    assert fresh.get_key('k') is None
+    assert fresh.stats()['misses'] == 1
+
+
+def test_warm_up_loads_most_recent_entries(tmp_path, clock):
+    path = str(tmp_path / 'cache.db')
+    writer = TwoTierCache(path=path, ttl=60)
+    for i in range(3):
+        writer.set_key(f'k{i}', i)
+        clock[0] += 1
+
+    reader = TwoTierCache(path=path, ttl=60, maxsize=2)
+    assert reader.warm_up() == 2
+    assert reader.memory.get('k2') == 2 and reader.memory.get('k1') == 1
+    assert reader.memory.get('k0') is None
+
+
+def test_geocode_cache_normalizes_addresses(tmp_path):
+    geocode = GeocodeCache(path=str(tmp_path / 'geo.db'))
+    coords = {'lat': -23.5614, 'lng': -46.6559, 'address': 'Av. Paulista, 1000 - São Paulo, SP'}
+    geocode.set('  Av. Paulista ,1000 , São Paulo. ', coords)
+
+    assert normalize_address('  Av. Paulista ,1000 , São Paulo. ') == 'av. paulista, 1000, são paulo'
+    assert geocode.get('av. paulista, 1000,   SÃO PAULO') == coords
+    assert geocode.get('Av. Paulista, 1001, São Paulo') is None
+    assert GeocodeCache(path=str(tmp_path / 'geo.db')).get('AV. PAULISTA, 1000, SÃO PAULO') == coords
+
+
+def local_timestamp(day, hour, minute):
+    return time.mktime((2026, 10, day, hour, minute, 0, 0, 0, -1))
+
+
+def test_route_key_includes_departure_date():
+    cache = RouteCache(bucket_minutes=30)
+    today = local_timestamp(17, 8, 0)
+    tomorrow = local_timestamp(18, 8, 10)  # mesma faixa horária, outro dia
+
+    assert cache.make_key(ORIGIN, DEST, today) == cache.make_key(ORIGIN, DEST, local_timestamp(17, 8, 29))
+    assert cache.make_key(ORIGIN, DEST, today) != cache.make_key(ORIGIN, DEST, tomorrow)
+
+    cache.set(ORIGIN, DEST, PAYLOAD, today)
+    assert cache.lookup(ORIGIN, DEST, today)[0] == PAYLOAD
+    assert cache.lookup(ORIGIN, DEST, tomorrow) is None
+
+
+def test_route_key_snaps_to_grid():
+    cache = RouteCache(grid_meters=50)
+    nearby = {'lat': ORIGIN['lat'] + 0.00001, 'lng': ORIGIN['lng']}
+    far = {'lat': ORIGIN['lat'] + 0.01, 'lng': ORIGIN['lng']}
+    now = time.time()
+    assert cache.make_key(ORIGIN, DEST, now) == cache.make_key(nearby, DEST, now)
+    assert cache.make_key(ORIGIN, DEST, now) != cache.make_key(far, DEST, now)
@@ -0,0 +1,127 @@
+"""
+Índice pré-calculado de corredores: chaves, validade, pré-cálculo e consulta
+"""
+
+import time
+
+import pytest
+
+import app
+import cache
+from corridors import CorridorIndex, CorridorLog, corridor_key, learn_corridors, next_departures
+
+ORIGIN = 'Sorocaba, SP'
+DESTINATION = 'Av. Paulista, 1000, São Paulo'
+
+
+def tomorrow_at(hour, minute):
+    local = time.localtime(time.time() + 24 * 3600)
+    return int(time.mktime((local.tm_year, local.tm_mon, local.tm_mday, hour, minute, 0, 0, 0, -1)))
+
+
+@pytest.fixture
+def index(maps, tmp_path, monkeypatch):
+    corridor_index = CorridorIndex(path=str(tmp_path / 'corridors.sqlite3'), ttl=3600, bucket_minutes=30)
+    monkeypatch.setattr(app, 'corridor_index', corridor_index)
+    return corridor_index
+
+
+def test_corridor_key_uses_normalized_addresses_and_slot():
+    index = CorridorIndex(bucket_minutes=30)
+    eight, eight_twenty, eight_forty = tomorrow_at(8, 0), tomorrow_at(8, 20), tomorrow_at(8, 40)
+
+    assert index.slot(eight) == index.slot(eight_twenty) == 16
+    assert index.slot(eight_forty) == 17
+    assert corridor_key(' Sorocaba ,SP', 'AV. PAULISTA, 1000,SÃO PAULO', 16) == \
+        corridor_key(ORIGIN, DESTINATION, 16) == 'sorocaba, sp|av. paulista, 1000, são paulo|16'
+
+
+def test_index_without_path_is_disabled():
+    index = CorridorIndex(path=None)
+    index.set(ORIGIN, DESTINATION, tomorrow_at(8, 0), {'route_data': {}})
+    assert index.get(ORIGIN, DESTINATION, tomorrow_at(8, 0)) is None
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    now = [time.time()]
+    monkeypatch.setattr(cache.time, 'time', lambda: now[0])
+    path = str(tmp_path / 'corridors.sqlite3')
+    departure = tomorrow_at(8, 0)
+    CorridorIndex(path=path, ttl=60).set(ORIGIN, DESTINATION, departure, {'computed_at': now[0]})
+
+    index = CorridorIndex(path=path, ttl=60)
+    assert index.get(ORIGIN, DESTINATION, departure) == {'computed_at': now[0]}
+    now[0] += 61
+    assert index.get(ORIGIN, DESTINATION, departure) is None
+    assert CorridorIndex(path=path, ttl=60).get(ORIGIN, DESTINATION, departure) is None
+
+
+def test_precompute_then_lookup_without_google(index, maps):
+    entry = app.precompute_corridor(ORIGIN, DESTINATION, tomorrow_at(8, 10))
+
+    assert sorted(endpoint for endpoint, _ in maps.calls) == ['directions', 'geocode', 'geocode']
+    assert 'freshness' not in entry['route_data']
+
+    found = app.lookup_corridor(' sorocaba ,sp', DESTINATION, tomorrow_at(8, 25))
+    assert found is not None
+    origin_coords, dest_coords, route_data = found
+    assert (origin_coords, dest_coords) == (entry['origin_coords'], entry['dest_coords'])
+    assert route_data['analysis'] == entry['route_data']['analysis']
+    assert route_data['freshness']['status'] == 'precomputed'
+
+    assert app.lookup_corridor(ORIGIN, DESTINATION, tomorrow_at(8, 40)) is None
+    assert len(maps.calls) == 3
+
+
+def test_calculate_is_served_from_index(index, maps):
+    departure = tomorrow_at(7, 30)
+    app.precompute_corridor(ORIGIN, DESTINATION, departure)
+    calls = len(maps.calls)
+
+    response = app.app.test_client().post('/calculate', json={
+        'origin': ORIGIN, 'destination': DESTINATION, 'frequency': 5, 'departure_time': departure + 60
+    })
+
+    assert response.status_code == 200
+    assert response.get_json()['freshness']['status'] == 'precomputed'
+    assert len(maps.calls) == calls
+
+
+def test_lookup_reweights_entries_from_older_versions(index, maps):
+    departure = tomorrow_at(8, 0)
+    entry = app.precompute_corridor(ORIGIN, DESTINATION, departure)
+    analysis = dict(entry['route_data']['analysis'], ecoscore_version='v-anterior')
+    index.set(ORIGIN, DESTINATION, departure, dict(entry, route_data=dict(entry['route_data'], analysis=analysis)))
+
+    _, _, route_data = app.lookup_corridor(ORIGIN, DESTINATION, departure)
+    assert route_data['analysis']['ecoscore_version'] == app.SCORING_VERSION
+    assert route_data['analysis']['eco_index'] == entry['route_data']['analysis']['eco_index']
+
+    # Resultados sem scores por fator não podem ser repesados
+    legacy = dict(entry, route_data=dict(entry['route_data'], analysis={'ecoscore_version': 'v0'}))
+    index.set(ORIGIN, DESTINATION, departure, legacy)
+    assert app.lookup_corridor(ORIGIN, DESTINATION, departure) is None
+
+
+def test_next_departures():
+    now = time.mktime((2026, 10, 17, 7, 0, 0, 0, 0, -1))
+    departures = next_departures('06:30-07:30, 12:00', 30, now=now)
+
+    assert [time.strftime('%d %H:%M', time.localtime(t)) for t in departures] == [
+        '17 07:30', '17 12:00', '18 06:30', '18 07:00'
+    ]
+    with pytest.raises(ValueError):
+        next_departures('7h-9h', 30, now=now)
+
+
+def test_learn_corridors(tmp_path):
+    log = CorridorLog(str(tmp_path / 'requests.jsonl'))
+    for origin, destination in [(ORIGIN, DESTINATION), ('sorocaba, sp', DESTINATION),
+                                (ORIGIN, DESTINATION), ('Campinas', DESTINATION),
+                                ('Santos', 'Guarujá'), ('Santos', 'Guarujá')]:
+        log.append(origin, destination)
+
+    assert learn_corridors([log.path]) == [(ORIGIN, DESTINATION), ('Santos', 'Guarujá')]
+    assert learn_corridors([log.path], top=1) == [(ORIGIN, DESTINATION)]
+    assert learn_corridors([log.path], min_count=1)[-1] == ('Campinas', DESTINATION)
+    assert learn_corridors([log.path], since=time.time() + 60) == []
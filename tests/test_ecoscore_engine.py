@@ -0,0 +1,39 @@
+"""
+Motor vetorizado do EcoScore: mesmos valores do cálculo rota a rota
+"""
+
+import pytest
+
+import app
+import ecoscore_engine
+
+pytestmark = pytest.mark.skipif(not ecoscore_engine.available(), reason='NumPy não instalado')
+
+
+def routes_data(payload):
+    return [app.extract_route_factors(route, 0) for route in payload['routes']]
+
+
+def test_factor_scores_match_python(directions_payloads):
+    for payload in directions_payloads:
+        data = routes_data(payload)
+        expected = [app.route_factor_scores(factors, data) for factors in data]
+        assert ecoscore_engine.factor_scores(data) == expected
+
+
+def test_score_routes_match_calculate_ecoscore(directions_payloads):
+    for payload in directions_payloads:
+        data = routes_data(payload)
+        scores = ecoscore_engine.score_routes(data, app.ECOSCORE_WEIGHTS, app.FLUIDEZ_WEIGHTS)
+        for route, vectorized in zip(payload['routes'], scores):
+            expected = app.calculate_ecoscore(route, data)
+            assert round(vectorized['ecoscore'], 1) == expected['ecoscore']
+            assert round(vectorized['score_fluidez'], 1) == expected['score_fluidez']
+
+
+def test_analyze_routes_same_with_and_without_numpy(directions_payloads, monkeypatch):
+    vectorized = [app.analyze_routes(payload)[2] for payload in directions_payloads]
+
+    monkeypatch.setattr(ecoscore_engine, 'np', None)
+    assert not ecoscore_engine.available()
+    assert [app.analyze_routes(payload)[2] for payload in directions_payloads] == vectorized
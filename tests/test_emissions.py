@@ -0,0 +1,117 @@
+"""
+Emissões em lote: cada linha igual a calculate_emissions, com e sem NumPy
+"""
+
+import random
+
+import pytest
+
+import app
+import emissions
+
+
+@pytest.fixture
+def fleet():
+    rng = random.Random(7)
+    count = 200
+    distance_standard = [round(rng.uniform(2, 80), 2) for _ in range(count)]
+    return {
+        'distance_standard': distance_standard,
+        'distance_eco': [round(d * rng.uniform(0.8, 1.1), 2) for d in distance_standard],
+        # Inclui os limites exatos das faixas (bisect_right)
+        'ecoscore_eco': [rng.choice([20, 34.9, 35, 50, 64.9, 65, 80, 99.5]) for _ in range(count)],
+        'frequency': [rng.randint(1, 7) for _ in range(count)]
+    }
+
+
+def scalar_rows(fleet):
+    return [
+        app.calculate_emissions(*row)
+        for row in zip(fleet['distance_standard'], fleet['distance_eco'],
+                       fleet['ecoscore_eco'], fleet['frequency'])
+    ]
+
+
+@pytest.mark.skipif(not emissions.available(), reason='NumPy não instalado')
+def test_columns_match_calculate_emissions(fleet):
+    columns = emissions.emission_columns(**fleet)
+    for i, expected in enumerate(scalar_rows(fleet)):
+        for name in ('total_standard', 'total_eco', 'savings', 'fuel_saved', 'money_saved'):
+            assert round(float(columns[name][i]), 2) == expected[name]
+        assert int(columns['trees_equivalent'][i]) == expected['trees_equivalent']
+        assert int(columns['km_car_equivalent'][i]) == expected['km_car_equivalent']
+
+
+def test_bulk_totals_match_scalar_sum(fleet, monkeypatch):
+    expected = scalar_rows(fleet)
+    results = [emissions.bulk_emissions(**fleet)]
+    monkeypatch.setattr(emissions, 'np', None)
+    results.append(emissions.bulk_emissions(**fleet))
+
+    for totals in results:
+        assert totals['rows'] == len(expected)
+        for name in ('trees_equivalent', 'km_car_equivalent'):
+            assert totals[name] == sum(row[name] for row in expected)
+        for name in ('total_standard', 'total_eco', 'savings', 'fuel_saved', 'money_saved'):
+            # Soma sem arredondar cada linha: difere no máximo meio centavo por linha
+            assert totals[name] == pytest.approx(sum(row[name] for row in expected), abs=0.005 * len(expected))
+    assert results[0] == results[1]
+
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+@pytest.mark.parametrize('overrides', [
+    {'ecoscore_eco': [70, None]},
+    {'distance_standard': [10, float('nan')]},
+    {'distance_eco': [9, float('inf')]},
+    {'frequency': '5'},
+    {'ecoscore_eco': [70, True]},
+    {'fuel': ['gasolina', None]},
+    {'fuel': 5},
+    {'fuel_price': [6.5, None]},
+    {'distance_eco': [9]},
+    {'distance_standard': [[10, 1], [12, 1]]},
+    {'frequency': [[5], [5]]},
+    {'fuel_price': [[6.5], [6.5]]},
+])
+def test_invalid_inputs_rejected(overrides, use_numpy, monkeypatch):
+    if not use_numpy:
+        monkeypatch.setattr(emissions, 'np', None)
+    elif not emissions.available():
+        pytest.skip('NumPy não instalado')
+
+    columns = {'distance_standard': [10, 12], 'distance_eco': [9, 11], 'ecoscore_eco': [70, 80],
+               'frequency': 5, **overrides}
+    with pytest.raises(ValueError):
+        emissions.bulk_emissions(**columns)
+
+
+@pytest.mark.parametrize('fuel', [None, [], 'gasolina'])
+def test_empty_columns_give_zero_totals(fuel, monkeypatch):
+    results = [emissions.bulk_emissions([], [], [], [], fuel=fuel)]
+    monkeypatch.setattr(emissions, 'np', None)
+    results.append(emissions.bulk_emissions([], [], [], [], fuel=fuel))
+
+    for totals in results:
+        assert totals == dict(dict.fromkeys(emissions.COLUMNS, 0), rows=0)
+
+
+def test_unknown_fuel_rejected():
+    with pytest.raises(ValueError, match='Combustível desconhecido'):
+        emissions.bulk_emissions([10], [9], [70], 5, fuel='diesel')
+
+
+def test_bulk_endpoint_returns_400_for_null():
+    client = app.app.test_client()
+    response = client.post('/emissions/bulk', json={
+        'distance_standard': [10], 'distance_eco': [9], 'ecoscore_eco': [None]
+    })
+    assert response.status_code == 400
+
+
+def test_bulk_endpoint_accepts_empty_columns():
+    client = app.app.test_client()
+    response = client.post('/emissions/bulk', json={
+        'distance_standard': [], 'distance_eco': [], 'ecoscore_eco': [], 'fuel': []
+    })
+    assert response.status_code == 200
+    assert response.get_json()['rows'] == 0
@@ -0,0 +1,33 @@
+"""
+Blocos da Distance Matrix API: dentro dos limites e cobrindo cada par uma vez
+"""
+
+import pytest
+
+import app
+
+
+@pytest.mark.parametrize('n_origins, n_destinations', [
+    (1, 1), (1, 25), (1, 26), (4, 25), (5, 20), (25, 1), (26, 1), (10, 10),
+    (30, 7), (7, 30), (100, 100), (3, 101), (101, 3),
+])
+def test_tiles_within_limits_and_cover_matrix(n_origins, n_destinations):
+    covered = []
+    for row, row_end, col, col_end in app.matrix_tiles(n_origins, n_destinations):
+        rows, cols = row_end - row, col_end - col
+        assert 0 < rows <= app.MATRIX_TILE_SIDE
+        assert 0 < cols <= app.MATRIX_TILE_SIDE
+        assert rows * cols <= app.MATRIX_TILE_ELEMENTS
+        covered.extend((i, j) for i in range(row, row_end) for j in range(col, col_end))
+
+    assert len(covered) == len(set(covered)) == n_origins * n_destinations
+
+
+def test_custom_limits():
+    tiles = app.matrix_tiles(10, 10, max_elements=12, max_side=5)
+    assert all((r2 - r1) * (c2 - c1) <= 12 and max(r2 - r1, c2 - c1) <= 5 for r1, r2, c1, c2 in tiles)
+
+
+def test_empty_matrix():
+    assert app.matrix_tiles(0, 5) == []
+    assert app.matrix_tiles(5, 0) == []
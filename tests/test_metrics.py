@@ -0,0 +1,90 @@
+"""
+Métricas Prometheus por etapa e cabeçalho Server-Timing
+"""
+
+import contextvars
+import re
+
+import app
+import metrics
+
+TRIP = {'origin': 'Sorocaba, SP', 'destination': 'Av. Paulista, 1000, São Paulo', 'frequency': 5}
+SERVER_TIMING_ENTRY = re.compile(r'^[a-z]+;dur=\d+\.\d$')
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = metrics.Registry()
+    histogram = registry.register(metrics.Histogram('demo_seconds', 'Demo', ['stage'], buckets=(0.1, 1.0)))
+    counter = registry.register(metrics.Counter('demo_total', 'Demo', ['code']))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, stage='geocode')
+    counter.inc(code=200)
+    counter.inc(2, code=200)
+
+    assert registry.render().splitlines() == [
+        '# HELP demo_seconds Demo',
+        '# TYPE demo_seconds histogram',
+        'demo_seconds_bucket{stage="geocode",le="0.1"} 1',
+        'demo_seconds_bucket{stage="geocode",le="1"} 3',
+        'demo_seconds_bucket{stage="geocode",le="+Inf"} 4',
+        'demo_seconds_sum{stage="geocode"} 4.25',
+        'demo_seconds_count{stage="geocode"} 4',
+        '# HELP demo_total Demo',
+        '# TYPE demo_total counter',
+        'demo_total{code="200"} 3',
+    ]
+
+
+def test_label_values_are_escaped():
+    assert metrics.format_labels((('endpoint', 'a"b\\c\nd'),)) == r'{endpoint="a\"b\\c\nd"}'
+
+
+def test_server_timing_header_format():
+    timings = [('geocode', 12.34), ('geocode', 3.0), ('directions', 250.06)]
+    assert metrics.server_timing_header(timings, 0.3) == (
+        'geocode;dur=12.3, geocode;dur=3.0, directions;dur=250.1, total;dur=300.0'
+    )
+    assert metrics.server_timing_header([]) == ''
+
+
+def test_stages_are_recorded_per_request():
+    @metrics.timed('geocode')
+    def geocode():
+        with metrics.stage('serialize'):
+            pass
+
+    def request():
+        timings = metrics.start_request_timing()
+        geocode()
+        return timings
+
+    # Cada requisição tem seu próprio contexto (contextvars)
+    timings = contextvars.copy_context().run(request)
+    assert [name for name, _ in timings] == ['serialize', 'geocode']
+    assert contextvars.copy_context().run(metrics._request_timings.get) is None
+
+
+def test_calculate_reports_stages(maps, monkeypatch):
+    monkeypatch.setattr(app, 'SERVER_TIMING', True)
+    response = app.app.test_client().post('/calculate', json=TRIP)
+
+    assert response.status_code == 200
+    entries = response.headers['Server-Timing'].split(', ')
+    assert all(SERVER_TIMING_ENTRY.match(entry) for entry in entries)
+    names = [entry.split(';')[0] for entry in entries]
+    assert names.count('geocode') == 2
+    assert {'directions', 'analyze', 'emissions', 'serialize'} <= set(names)
+    assert names[-1] == 'total'
+
+    exposition = app.app.test_client().get('/metrics').get_data(as_text=True)
+    for stage in ('geocode', 'directions', 'analyze', 'emissions', 'serialize'):
+        assert f'ecorouter_stage_seconds_count{{stage="{stage}"}}' in exposition
+    assert re.search(r'^ecorouter_request_seconds_bucket\{endpoint="/calculate",code="200",le="\+Inf"\} \d+$',
+                     exposition, re.MULTILINE)
+    assert 'ecorouter_cache_lookups_total{cache="geocode",result="misses"}' in exposition
+
+
+def test_server_timing_is_off_by_default(maps):
+    response = app.app.test_client().post('/calculate', json=TRIP)
+    assert response.status_code == 200
+    assert 'Server-Timing' not in response.headers
@@ -0,0 +1,61 @@
+"""
+Codec de polylines: ida e volta sem perdas e simplificação Douglas–Peucker
+"""
+
+import random
+
+import pytest
+
+import polyline
+
+# Exemplo da documentação do Google (Encoded Polyline Algorithm Format)
+GOOGLE_EXAMPLE = '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+GOOGLE_POINTS = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+
+
+def fixture_polylines(payloads):
+    return [route['overview_polyline']['points'] for payload in payloads for route in payload['routes']]
+
+
+def test_decode_google_example():
+    assert polyline.decode(GOOGLE_EXAMPLE) == GOOGLE_POINTS
+    assert polyline.encode(GOOGLE_POINTS) == GOOGLE_EXAMPLE
+
+
+def test_round_trip_fixtures(directions_payloads):
+    for encoded in fixture_polylines(directions_payloads):
+        assert polyline.encode(polyline.decode(encoded)) == encoded
+
+
+def test_round_trip_random_points():
+    rng = random.Random(42)
+    points = [(round(rng.uniform(-90, 90), 5), round(rng.uniform(-180, 180), 5)) for _ in range(500)]
+    assert polyline.decode(polyline.encode(points)) == points
+    assert polyline.decode(polyline.encode(points, precision=6), precision=6) == points
+
+
+@pytest.mark.skipif(polyline.np is None, reason='NumPy não instalado')
+def test_decode_numpy_matches_decode(directions_payloads):
+    for encoded in fixture_polylines(directions_payloads) + [GOOGLE_EXAMPLE, '']:
+        expected = polyline.decode(encoded)
+        decoded = polyline.decode_numpy(encoded)
+        assert decoded.shape == (len(expected), 2)
+        flat = [value for point in expected for value in point]
+        assert decoded.ravel().tolist() == pytest.approx(flat, abs=1e-9)
+
+
+def test_simplify_keeps_endpoints_and_tolerance(directions_payloads):
+    for encoded in fixture_polylines(directions_payloads):
+        points = polyline.decode(encoded)
+        simplified = polyline.simplify(points, 25)
+        assert simplified[0] == points[0] and simplified[-1] == points[-1]
+        assert len(simplified) <= len(points)
+        # Pontos mantidos aparecem na ordem original
+        positions = [points.index(point) for point in simplified]
+        assert positions == sorted(positions)
+
+
+def test_simplify_drops_collinear_points():
+    line = [(-23.5 + i * 1e-4, -47.4) for i in range(100)]
+    assert polyline.simplify(line, 1) == [line[0], line[-1]]
+    assert polyline.simplify(line, 0) == line
@@ -0,0 +1,151 @@
+"""
+Tokens assinados e encerramento do perfil no middleware de profiling
+"""
+
+import os
+import threading
+
+import pytest
+
+from profiling import TOKEN_TTL, ProfiledBody, ProfilingMiddleware, make_token, verify_token
+
+SECRET = 'segredo'
+NOW = 1_800_000_000
+
+
+def test_valid_token():
+    assert verify_token(SECRET, make_token(SECRET, NOW), now=NOW + TOKEN_TTL)
+    assert verify_token(SECRET, make_token(SECRET, NOW), now=NOW - TOKEN_TTL)
+
+
+def test_expired_token():
+    assert not verify_token(SECRET, make_token(SECRET, NOW), now=NOW + TOKEN_TTL + 1)
+    assert not verify_token(SECRET, make_token(SECRET, NOW + TOKEN_TTL + 1), now=NOW)
+
+
+@pytest.mark.parametrize('token', [
+    make_token('outro segredo', NOW),
+    make_token(SECRET, NOW)[:-1] + '0',
+    f'{NOW + 1}.' + make_token(SECRET, NOW).partition('.')[2],
+    f'{NOW}.',
+    f'{NOW}',
+    'abc.def',
+    '',
+])
+def test_bad_token(token):
+    assert not verify_token(SECRET, token, now=NOW)
+
+
+class Events:
+    def __init__(self):
+        self.log = []
+
+    def recorder_class(self):
+        events = self
+
+        class Recorder:
+            extension = 'txt'
+
+            def start(self):
+                events.log.append('start')
+
+            def stop(self):
+                events.log.append('stop')
+
+            def dump(self, path):
+                events.log.append('dump')
+                with open(path, 'w') as f:
+                    f.write('perfil')
+
+        return Recorder()
+
+
+class Body:
+    def __init__(self, events, chunks, fail_close=False):
+        self.events = events
+        self.chunks = chunks
+        self.fail_close = fail_close
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.events.log.append(chunk.decode())
+            yield chunk
+
+    def close(self):
+        self.events.log.append('body.close')
+        if self.fail_close:
+            raise RuntimeError('falha ao fechar')
+
+
+def test_profiled_body_close_stops_recorder_once():
+    events = Events()
+    body = ProfiledBody(Body(events, [b'a', b'b']), lambda: events.log.append('stop'))
+
+    assert list(body) == [b'a', b'b']
+    body.close()
+    body.close()
+    assert events.log == ['a', 'b', 'body.close', 'stop']
+
+
+def test_profiled_body_stops_recorder_when_close_fails():
+    events = Events()
+    body = ProfiledBody(Body(events, [b'a'], fail_close=True), lambda: events.log.append('stop'))
+
+    with pytest.raises(RuntimeError):
+        body.close()
+    assert events.log == ['body.close', 'stop']
+
+
+def test_middleware_profiles_until_response_is_closed(tmp_path):
+    events = Events()
+
+    def wsgi_app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'application/x-ndjson')])
+        return Body(events, [b'{"index": 0}\n', b'{"summary": {}}\n'])
+
+    middleware = ProfilingMiddleware(wsgi_app, directory=str(tmp_path), secret=SECRET)
+    middleware.recorder_class = events.recorder_class
+    headers = []
+    environ = {'PATH_INFO': '/calculate', 'HTTP_X_ECOROUTER_PROFILE': make_token(SECRET)}
+
+    body = middleware(environ, lambda status, response_headers, exc_info=None: headers.extend(response_headers))
+    chunks = list(body)
+    assert events.log[-1] != 'stop'  # Corpo consumido, mas o perfil só termina no close()
+    body.close()
+
+    assert b''.join(chunks) == b'{"index": 0}\n{"summary": {}}\n'
+    assert events.log == ['start', '{"index": 0}\n', '{"summary": {}}\n', 'body.close', 'stop', 'dump']
+    filename = dict(headers)['X-EcoRouter-Profile-File']
+    assert os.listdir(tmp_path) == [filename]
+
+
+def test_middleware_skips_unsigned_requests(tmp_path):
+    calls = []
+
+    def wsgi_app(environ, start_response):
+        calls.append(environ['PATH_INFO'])
+        return [b'ok']
+
+    middleware = ProfilingMiddleware(wsgi_app, directory=str(tmp_path), secret=SECRET)
+    for environ in ({'PATH_INFO': '/calculate'},
+                    {'PATH_INFO': '/calculate', 'HTTP_X_ECOROUTER_PROFILE': make_token('outro')},
+                    {'PATH_INFO': '/stats', 'HTTP_X_ECOROUTER_PROFILE': make_token(SECRET)}):
+        assert middleware(environ, None) == [b'ok']
+
+    assert len(calls) == 3
+    assert os.listdir(tmp_path) == []
+
+
+def test_cprofile_file_is_written(tmp_path):
+    def wsgi_app(environ, start_response):
+        start_response('200 OK', [])
+        return [b'ok']
+
+    middleware = ProfilingMiddleware(wsgi_app, directory=str(tmp_path), secret=SECRET)
+    body = middleware({'PATH_INFO': '/calculate', 'HTTP_X_ECOROUTER_PROFILE': make_token(SECRET)},
+                      lambda status, headers, exc_info=None: None)
+    assert list(body) == [b'ok']
+    body.close()
+
+    (profile,) = os.listdir(tmp_path)
+    assert profile.endswith(f'-calculate-{os.getpid()}-{threading.get_ident()}.prof')
@@ -0,0 +1,96 @@
+"""
+Token bucket: reposição, fila limitada pelo prazo e cota diária
+"""
+
+import asyncio
+
+import pytest
+
+import ratelimit
+from ratelimit import RateLimitExceeded, take_token
+
+NOW = 1_700_000_000.0
+
+
+def test_burst_then_refill():
+    state = {}
+    for _ in range(3):
+        state, granted, wait = take_token(state, rate=2, burst=3, daily_quota=0, max_wait=0, now=NOW)
+        assert granted and wait == 0
+
+    # Bucket vazio: sem espera aceita, recusa com o tempo até o próximo token
+    state, granted, wait = take_token(state, 2, 3, 0, 0, NOW)
+    assert not granted and wait == pytest.approx(0.5)
+
+    # 0,5 s depois um token foi reposto (2 tokens/s)
+    state, granted, wait = take_token(state, 2, 3, 0, 0, NOW + 0.5)
+    assert granted and wait == 0
+
+
+def test_refill_is_capped_at_burst():
+    state, _, _ = take_token({}, 1, 2, 0, 0, NOW)
+    state, _, _ = take_token(state, 1, 2, 0, 0, NOW + 3600)
+    assert state['tokens'] == pytest.approx(1)
+
+
+def test_waits_within_max_wait():
+    state, _, _ = take_token({}, 10, 1, 0, 0, NOW)
+    state, granted, wait = take_token(state, 10, 1, 0, 1.0, NOW)
+    assert granted and wait == pytest.approx(0.1)
+    # O saldo negativo é a fila: o próximo espera mais
+    state, granted, wait = take_token(state, 10, 1, 0, 1.0, NOW)
+    assert granted and wait == pytest.approx(0.2)
+
+
+def test_daily_quota_resets_next_day():
+    state = {}
+    for _ in range(2):
+        state, granted, _ = take_token(state, 100, 100, 2, 0, NOW)
+        assert granted
+    state, granted, wait = take_token(state, 100, 100, 2, 0, NOW)
+    assert not granted and wait == ratelimit.seconds_until_tomorrow(NOW)
+
+    state, granted, _ = take_token(state, 100, 100, 2, 0, NOW + wait)
+    assert granted and state['used'] == 1
+
+
+@pytest.mark.parametrize('make_store', [
+    lambda tmp_path: ratelimit.LocalBucketStore(),
+    pytest.param(lambda tmp_path: ratelimit.FileBucketStore(str(tmp_path / 'bucket')),
+                 marks=pytest.mark.skipif(ratelimit.fcntl is None, reason='sem fcntl'))
+], ids=['local', 'file'])
+def test_limiter_sheds_after_deadline(make_store, tmp_path):
+    store = make_store(tmp_path)
+    limiter = ratelimit.RateLimiter(store, {'geocode': {'rate': 1, 'burst': 2}}, max_wait=0)
+
+    limiter.acquire('geocode')
+    asyncio.run(limiter.aacquire('geocode'))
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        limiter.acquire('geocode')
+    assert excinfo.value.retry_after == 1
+
+    stats = limiter.stats()['geocode']
+    assert (stats['granted'], stats['shed'], stats['used_today']) == (2, 1, 2)
+    # APIs sem orçamento não são limitadas
+    limiter.acquire('directions')
+
+
+@pytest.mark.parametrize('config', [
+    {'rate': 0},
+    {'rate': -1},
+    {'rate': float('nan')},
+    {'rate': float('inf')},
+    {'rate': 1, 'burst': 0},
+])
+def test_limiter_rejects_non_positive_budgets(config):
+    with pytest.raises(ValueError, match='geocode'):
+        ratelimit.RateLimiter(ratelimit.LocalBucketStore(), {'geocode': config})
+
+
+def test_build_rate_limiter_rejects_zero_qps(monkeypatch):
+    import app
+
+    monkeypatch.setenv('RATE_LIMIT_BACKEND', 'local')
+    monkeypatch.setenv('RATE_LIMIT_DIRECTIONS_QPS', '0')
+    with pytest.raises(ValueError, match='directions'):
+        app.build_rate_limiter()
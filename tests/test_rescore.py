@@ -0,0 +1,102 @@
+"""
+Reprocessamento offline: o baseline reproduz a escolha feita em produção
+"""
+
+import json
+
+import pytest
+
+import app
+import rescore
+
+ORIGIN = {'lat': -23.5015, 'lng': -47.4526}
+DEST = {'lat': -23.5489, 'lng': -46.6388}
+
+
+class FakeElevation:
+    """
+    Ganho de elevação fixo por polyline (sem rede)
+    """
+
+    def __init__(self, gains):
+        self.gains = gains
+        self.calls = 0
+
+    def routes_gain(self, routes):
+        self.calls += 1
+        return [self.gains[route['overview_polyline']['points']] for route in routes]
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    path = tmp_path / 'directions.jsonl'
+    monkeypatch.setattr(app, 'DIRECTIONS_ARCHIVE_PATH', str(path))
+    return path
+
+
+def elevation_that_flips(payload):
+    """
+    Ganhos que tiram da rota eco (sem elevação) a primeira posição
+    """
+    _, eco_route, _ = app.analyze_routes(payload, elevation_gains=[0] * len(payload['routes']))
+    return {
+        route['overview_polyline']['points']: 1000 if route is eco_route else 0
+        for route in payload['routes']
+    }
+
+
+def test_archive_then_rescore_reproduces_production(directions_payloads, archive, monkeypatch):
+    payload = directions_payloads[3]  # 3 rotas; elevação muda a escolha
+    service = FakeElevation(elevation_that_flips(payload))
+    monkeypatch.setattr(app, 'ELEVATION_PROVIDER', 'srtm')
+    monkeypatch.setattr(app, 'get_elevation_service', lambda: service)
+
+    # Produção: arquiva a resposta e escolhe as rotas com a elevação real
+    app.store_directions(ORIGIN, DEST, payload)
+    served = app.build_route_data(payload)['analysis']
+
+    record = json.loads(archive.read_text().splitlines()[0])
+    assert record['elevation_gains'] == service.routes_gain(payload['routes'])
+
+    # Offline: nenhuma consulta de elevação, mesma escolha de produção
+    calls = service.calls
+    [row] = rescore.rescore_chunk([('directions.jsonl', 1, json.dumps(record))],
+                                  app.ECOSCORE_WEIGHTS, app.FLUIDEZ_WEIGHTS, 5)
+    assert service.calls == calls
+    assert row.get('error') is None
+    assert row['baseline_eco_index'] == served['eco_index']
+    assert row['ecoscore_eco'] == served['ecoscore_eco']
+
+    # Sem os ganhos arquivados, a escolha seria outra
+    del record['elevation_gains']
+    [row] = rescore.rescore_chunk([('directions.jsonl', 1, json.dumps(record))],
+                                  app.ECOSCORE_WEIGHTS, app.FLUIDEZ_WEIGHTS, 5)
+    assert row['baseline_eco_index'] != served['eco_index']
+
+
+def test_archive_without_elevation_provider(directions_payloads, archive):
+    app.store_directions(ORIGIN, DEST, directions_payloads[0])
+    record = json.loads(archive.read_text())
+    assert 'elevation_gains' not in record
+    assert record['directions'] == directions_payloads[0]
+
+
+@pytest.mark.parametrize('flag, value', [
+    ('--weights', '[1]'),
+    ('--weights', '3'),
+    ('--weights', '{"fluidez": "alto"}'),
+    ('--weights', '{"fluidez": true}'),
+    ('--weights', '{"fluidez": NaN}'),
+    ('--weights', '{"velocidade": 0.5}'),
+    ('--weights', '{'),
+    ('--fluidez-weights', '[0.8]'),
+    ('--fluidez-weights', '{"divisor": 0}'),
+])
+def test_invalid_weights_exit_cleanly(tmp_path, flag, value):
+    with pytest.raises(SystemExit, match='Pesos inválidos'):
+        rescore.main([str(tmp_path / 'vazio.jsonl'), '--output', str(tmp_path / 'out.csv'), flag, value])
+
+
+def test_weights_override_base():
+    base = {'fluidez': 0.4, 'distancia': 0.2}
+    assert rescore.parse_weights('--weights', '{"distancia": 1}', base) == {'fluidez': 0.4, 'distancia': 1}
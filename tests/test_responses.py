@@ -0,0 +1,128 @@
+"""
+Modo compacto de /calculate e negociação de compressão (gzip/br)
+"""
+
+import gzip
+import json
+
+import brotli
+import pytest
+
+import app
+import polyline
+import responses
+
+ORIGIN = {'lat': -23.5015, 'lng': -47.4526, 'address': 'Sorocaba, SP'}
+DEST = {'lat': -23.5614, 'lng': -46.6559, 'address': 'Av. Paulista, 1000, São Paulo'}
+TRIP = {'origin': 'Sorocaba, SP', 'destination': 'Av. Paulista, 1000, São Paulo', 'frequency': 5}
+
+
+def full_result(payload):
+    route_data = app.build_route_data(payload)
+    return app.build_result('Sorocaba', 'Paulista', ORIGIN, DEST, route_data, 5)
+
+
+@pytest.mark.parametrize('accept_encoding, expected', [
+    ('gzip, deflate, br', 'br'),
+    ('gzip', 'gzip'),
+    ('GZIP;q=0.5', 'gzip'),
+    ('br;q=0, gzip', 'gzip'),
+    ('br;q=0.0, gzip;q=0', None),
+    ('gzip;q=abc', None),
+    ('*', 'br'),
+    ('identity', None),
+    ('', None),
+    (None, None),
+])
+def test_negotiate_encoding(accept_encoding, expected):
+    assert responses.negotiate_encoding(accept_encoding) == expected
+
+
+def test_negotiate_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(responses, 'ENCODINGS', ('gzip',))
+    assert responses.negotiate_encoding('br, gzip') == 'gzip'
+    assert responses.negotiate_encoding('br') is None
+
+
+def test_encoded_response_compresses_once():
+    encoded = responses.EncodedResponse({'routes': ['Rodovia Castelo Branco'] * 100})
+    assert encoded.encoded(None) == (None, encoded.body)
+
+    encoding, body = encoded.encoded('br')
+    assert encoding == 'br' and brotli.decompress(body) == encoded.body
+    assert encoded.encoded('br')[1] is body
+    assert gzip.decompress(encoded.encoded('gzip')[1]) == encoded.body
+
+    small = responses.EncodedResponse({'ok': True}).precompress()
+    assert small.encoded('gzip') == (None, b'{"ok":true}')
+
+
+def test_dumps_without_orjson(monkeypatch):
+    payload = {'origin': 'São Paulo', 'co2_kg': 1.5, 'legs': []}
+    with_orjson = responses.dumps(payload)
+    monkeypatch.setattr(responses, 'orjson', None)
+    assert json.loads(responses.dumps(payload)) == json.loads(with_orjson) == payload
+    assert 'São'.encode() in responses.dumps(payload)
+
+
+@pytest.mark.parametrize('query, accept, expected', [
+    ('1', None, True),
+    ('true', None, True),
+    ('0', None, False),
+    (None, responses.COMPACT_MEDIA_TYPE, True),
+    (None, 'application/json', False),
+])
+def test_wants_compact(query, accept, expected):
+    assert responses.wants_compact(query, accept) is expected
+
+
+def test_compact_result_drops_constants_and_details(directions_payloads):
+    result = full_result(directions_payloads[0])
+    compact = app.compact_result(result)
+
+    assert set(result) - set(compact) == {'legs', 'waypoint_order'}
+    assert set(compact) <= set(result)
+    assert not set(app.COMPACT_DROPPED_EMISSIONS) & set(compact['emissions'])
+    assert compact['emissions']['savings'] == result['emissions']['savings']
+    assert 'eco_details' not in compact['ecoscore']
+    assert compact['ecoscore']['eco'] == result['ecoscore']['eco']
+
+    simplified = polyline.decode(compact['eco_polyline'])
+    original = polyline.decode(result['eco_polyline'])
+    assert 2 <= len(simplified) < len(original)
+    assert (simplified[0], simplified[-1]) == (original[0], original[-1])
+    assert len(responses.dumps(compact)) < len(responses.dumps(result))
+
+
+def test_compact_result_keeps_legs_with_waypoints(directions_payloads):
+    result = full_result(directions_payloads[0])
+    result['legs'] = result['legs'] * 2
+    result['waypoint_order'] = [0]
+    compact = app.compact_result(result)
+
+    assert compact['legs'] == [
+        {key: leg[key] for key in ('distance_km', 'duration_in_traffic_min', 'co2_kg')}
+        for leg in result['legs']
+    ]
+    assert compact['waypoint_order'] == [0]
+
+
+def test_calculate_negotiates_encoding_and_compact_mode(maps):
+    client = app.app.test_client()
+    full = client.post('/calculate', json=TRIP, headers={'Accept-Encoding': 'gzip, br'})
+    compact = client.post('/calculate?compact=1', json=TRIP, headers={'Accept-Encoding': 'gzip'})
+    by_accept = client.post('/calculate', json=TRIP, headers={'Accept': responses.COMPACT_MEDIA_TYPE})
+
+    assert full.headers['Content-Encoding'] == 'br'
+    assert full.headers['Vary'] == 'Accept, Accept-Encoding'
+    full_body = json.loads(brotli.decompress(full.data))
+
+    assert compact.headers['Content-Encoding'] == 'gzip'
+    compact_body = json.loads(gzip.decompress(compact.data))
+    assert 'Content-Encoding' not in by_accept.headers
+    assert by_accept.get_json() == compact_body
+
+    assert 'legs' in full_body and 'legs' not in compact_body
+    assert compact_body['ecoscore']['eco'] == full_body['ecoscore']['eco']
+    # Os dois modos têm entradas separadas no response_cache: uma só chamada à Directions API
+    assert len(maps.endpoint_calls('directions')) == 1
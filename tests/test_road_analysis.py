@@ -0,0 +1,62 @@
+"""
+Classificação dos steps por tipo de via (nome, manobra e velocidade)
+"""
+
+import pytest
+
+from road_analysis import analyze_steps, classify_step
+
+
+def step(instructions, distance_m=1000, duration_s=200, maneuver=None):
+    data = {
+        'html_instructions': instructions,
+        'distance': {'value': distance_m},
+        'duration': {'value': duration_s}
+    }
+    if maneuver:
+        data['maneuver'] = maneuver
+    return data
+
+
+@pytest.mark.parametrize('instructions, road_type', [
+    ('Continue na <b>Rodovia Castelo Branco</b>', 'trunk'),
+    ('Continue na <b>Rod. Castelo Branco</b>', 'trunk'),
+    ('Pegue a <b>Rod.Raposo Tavares</b>', 'trunk'),
+    ('Siga pela <b>SP-280</b>', 'trunk'),
+    ('Siga pela <b>BR-116</b>', 'trunk'),
+    ('Vire à direita na <b>Av. Paulista</b>', 'primary'),
+    ('Vire à direita na <b>Avenida Paulista</b>', 'primary'),
+    ('Continue na <b>Estr. do Campo Limpo</b>', 'primary'),
+    ('Vire à esquerda na <b>R. Augusta</b>', 'residential'),
+    ('Vire à esquerda na <b>Rua Augusta</b>', 'residential'),
+    ('Continue na <b>Tv. das Flores</b>', 'residential'),
+    ('Continue na <b>Al. Santos</b>', 'residential'),
+    ('Turn left onto <b>St. James Pl.</b>', 'residential'),
+    ('Vire à direita na <b>Rodoviária</b>', 'residential'),  # velocidade baixa
+])
+def test_classify_by_road_name(instructions, road_type):
+    # 1 km em 200 s = 18 km/h: sem nome reconhecido, seria residencial
+    assert classify_step(step(instructions)) == road_type
+
+
+def test_word_boundaries():
+    # "sp-2800" e "rodoviária" não são nomes de rodovia
+    assert classify_step(step('Siga pela <b>Rodoviária</b>', duration_s=60)) == 'primary'
+    assert classify_step(step('Código sp-2800', duration_s=60)) == 'primary'
+
+
+def test_fast_street_is_secondary_and_ramp_is_trunk():
+    assert classify_step(step('Rua Augusta', duration_s=60)) == 'secondary'  # 60 km/h
+    assert classify_step(step('Vire à direita', maneuver='ramp-right')) == 'trunk'
+
+
+def test_analyze_steps_shares_and_stops():
+    route = {'legs': [{
+        'distance': {'value': 3000}, 'duration': {'value': 300},
+        'steps': [step('Rod. Castelo Branco', 2000, 80), step('R. Augusta', 1000, 200, 'turn-left')]
+    }]}
+    summary = analyze_steps(route)
+    assert summary['road_type'] == 'trunk'
+    assert summary['road_shares'] == {'trunk': 0.667, 'residential': 0.333}
+    # 1 conversão + 2 paradas/km em 1 km residencial
+    assert summary['estimated_stops'] == 3
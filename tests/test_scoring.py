@@ -0,0 +1,84 @@
+"""
+Configuração versionada do EcoScore: repesar = recalcular do zero
+"""
+
+import json
+
+import pytest
+
+import app
+import scoring
+
+CANDIDATE_WEIGHTS = {'fluidez': 0.20, 'elevacao': 0.10, 'distancia': 0.50, 'via': 0.15, 'reserva': 0.05}
+CANDIDATE_FLUIDEZ = {'tempo': 0.5, 'trafego': 0.6, 'paradas': 0.2, 'divisor': 1.3}
+
+
+@pytest.fixture
+def stored(directions_payloads):
+    """
+    route_data de cada payload na versão ativa (como no índice de corredores)
+    """
+    payloads = directions_payloads + [{'routes': directions_payloads[0]['routes'][:1]}]
+    return payloads, [app.build_route_data(payload) for payload in payloads]
+
+
+@pytest.fixture
+def candidate_config(monkeypatch):
+    monkeypatch.setattr(app, 'ECOSCORE_WEIGHTS', CANDIDATE_WEIGHTS)
+    monkeypatch.setattr(app, 'FLUIDEZ_WEIGHTS', CANDIDATE_FLUIDEZ)
+    monkeypatch.setattr(app, 'SCORING_VERSION', 'v-test')
+
+
+def test_same_version_is_returned_unchanged(stored):
+    _, route_data = stored
+    for data in route_data:
+        assert app.reweight_route_data(data) is data
+
+
+def test_reweight_equals_fresh_score(stored, candidate_config):
+    payloads, route_data = stored
+    selections_changed = 0
+    for payload, data in zip(payloads, route_data):
+        reweighted = app.reweight_route_data(data)
+        fresh = app.build_route_data(payload)
+        assert reweighted == fresh
+        assert reweighted['analysis']['ecoscore_version'] == 'v-test'
+        selections_changed += reweighted['analysis']['eco_index'] != data['analysis']['eco_index']
+    # Os pesos candidatos mudam a escolha em pelo menos um payload
+    assert selections_changed
+
+
+def test_results_without_factor_scores_are_not_reweighted(stored, candidate_config):
+    _, route_data = stored
+    legacy = dict(route_data[0], analysis={
+        key: value for key, value in route_data[0]['analysis'].items() if key != 'routes'
+    })
+    assert app.reweight_route_data(legacy) is None
+
+
+def test_load_config_overrides_and_versions(tmp_path):
+    path = tmp_path / 'scoring.json'
+    path.write_text(json.dumps({'weights': {'fluidez': 0.40, 'distancia': 0.20}}))
+    config = scoring.load_config(str(path))
+    assert config['weights']['fluidez'] == 0.40
+    assert config['weights']['via'] == scoring.DEFAULT_CONFIG['weights']['via']
+    assert config['version'] == f"custom-{scoring.fingerprint(config)}"
+    assert config['version'] != f"custom-{scoring.fingerprint(scoring.load_config())}"
+
+    path.write_text(json.dumps({'version': 'v4.1', 'weights': {'fluidez': 0.40}}))
+    assert scoring.load_config(str(path))['version'] == 'v4.1'
+
+
+@pytest.mark.parametrize('overrides', [
+    {'pesos': {}},
+    {'weights': {'velocidade': 1}},
+    {'weights': {'fluidez': '0.4'}},
+    {'fluidez_weights': {'divisor': 0}},
+    {'ecoscore_bands': [50, 35]},
+    {'band_factors': {'gasolina': [0.165, 0.115]}},
+])
+def test_load_config_rejects_invalid(tmp_path, overrides):
+    path = tmp_path / 'scoring.json'
+    path.write_text(json.dumps(overrides))
+    with pytest.raises(ValueError):
+        scoring.load_config(str(path))
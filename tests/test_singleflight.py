@@ -0,0 +1,109 @@
+"""
+Coalescência de chamadas concorrentes (SingleFlight e AsyncSingleFlight)
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from singleflight import AsyncSingleFlight, SingleFlight
+
+CALLERS = 8
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'tempo esgotado'
+        time.sleep(0.001)
+
+
+def run_concurrently(flight, key, fn):
+    """
+    CALLERS chamadas de flight.do(key, fn) em threads; fn só termina depois
+    que todas as outras estão aguardando a primeira
+
+    Returns:
+        list: Resultado ou exceção de cada chamada
+    """
+    release = threading.Event()
+
+    def blocked():
+        release.wait(5)
+        return fn()
+
+    def call():
+        try:
+            return flight.do(key, blocked)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=CALLERS) as pool:
+        futures = [pool.submit(call) for _ in range(CALLERS)]
+        wait_until(lambda: flight.coalesced == CALLERS - 1)
+        release.set()
+        return [future.result() for future in futures]
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    executions = []
+
+    def fetch():
+        executions.append(threading.get_ident())
+        return {'status': 'OK'}
+
+    results = run_concurrently(flight, 'directions:a', fetch)
+
+    assert len(executions) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {'calls': 1, 'coalesced': CALLERS - 1, 'in_flight': 0}
+
+
+def test_exception_reaches_every_waiter_and_is_cleared():
+    flight = SingleFlight()
+    error = ValueError('Erro ao calcular rota: timeout')
+
+    def failing():
+        raise error
+
+    results = run_concurrently(flight, 'directions:a', failing)
+
+    assert all(result is error for result in results)
+    assert flight.stats()['in_flight'] == 0
+
+    # A falha não fica em cache: a próxima chamada executa de novo
+    assert flight.do('directions:a', lambda: 'ok') == 'ok'
+    assert flight.calls == 2
+
+
+def test_distinct_keys_run_separately():
+    flight = SingleFlight()
+    assert [flight.do(key, lambda key=key: key.upper()) for key in 'ab'] == ['A', 'B']
+    assert flight.stats() == {'calls': 2, 'coalesced': 0, 'in_flight': 0}
+
+
+def test_async_callers_share_one_task():
+    flight = AsyncSingleFlight()
+    executions = []
+
+    async def fetch(value):
+        executions.append(value)
+        await asyncio.sleep(0.01)
+        if value == 'falha':
+            raise ValueError(value)
+        return {'value': value}
+
+    async def run():
+        results = await asyncio.gather(*(flight.do('k', fetch, 'ok') for _ in range(CALLERS)))
+        errors = await asyncio.gather(*(flight.do('k', fetch, 'falha') for _ in range(CALLERS)),
+                                      return_exceptions=True)
+        return results, errors
+
+    results, errors = asyncio.run(run())
+
+    assert executions == ['ok', 'falha']
+    assert all(result is results[0] for result in results)
+    assert all(isinstance(e, ValueError) and e is errors[0] for e in errors)
+    assert flight.stats() == {'calls': 2, 'coalesced': 2 * (CALLERS - 1), 'in_flight': 0}
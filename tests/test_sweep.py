@@ -0,0 +1,103 @@
+"""
+Varredura de horários de partida (/calculate/sweep) com a Directions API simulada
+"""
+
+import time
+
+import pytest
+
+import app
+
+ORIGIN = {'lat': -23.5015, 'lng': -47.4526, 'address': 'Sorocaba, SP'}
+DEST = {'lat': -23.5614, 'lng': -46.6559, 'address': 'Av. Paulista, 1000, São Paulo'}
+
+
+def tomorrow_at(hour, minute):
+    local = time.localtime(time.time() + 24 * 3600)
+    return int(time.mktime((local.tm_year, local.tm_mon, local.tm_mday, hour, minute, 0, 0, 0, -1)))
+
+
+def best_co2(payload):
+    return app.build_route_data(payload)['analysis']['alternatives'][0]['co2_kg']
+
+
+@pytest.fixture
+def by_departure(maps, directions_payloads):
+    """
+    Um payload diferente por horário de partida (departure_time -> índice do payload)
+    """
+    chosen = {}
+    maps.directions = lambda params: directions_payloads[chosen[params['departure_time']]]
+    return chosen
+
+
+def test_sweep_ranks_departures(maps, by_departure, directions_payloads):
+    departures = [tomorrow_at(7, 0) + i * 1800 for i in range(5)]
+    by_departure.update(zip(departures, [0, 3, 1, 4, 2]))
+
+    curve = app.sweep_departures(ORIGIN, DEST, departures, deadline=5, concurrency=4)
+
+    assert [p['departure_time'] for p in curve] == departures
+    assert all(p['status'] == 'ok' for p in curve)
+    assert len(maps.endpoint_calls('directions')) == 5
+    co2 = {d: best_co2(directions_payloads[by_departure[d]]) for d in departures}
+    assert [p['co2_kg'] for p in curve] == [co2[d] for d in departures]
+    best = min(curve, key=lambda p: p['rank'])
+    assert best['co2_kg'] == min(co2.values())
+    assert sorted(p['rank'] for p in curve) == [1, 2, 3, 4, 5]
+
+
+def test_sweep_reuses_route_cache_within_bucket(maps, by_departure):
+    # Intervalo (10 min) menor que a faixa do cache de rotas (30 min): 2 faixas
+    departures = [tomorrow_at(7, 0) + i * 600 for i in range(6)]
+    by_departure.update((d, 0 if d < tomorrow_at(7, 30) else 1) for d in departures)
+
+    curve = app.sweep_departures(ORIGIN, DEST, departures, deadline=5, concurrency=6)
+
+    assert len(curve) == 6 and all(p['status'] == 'ok' for p in curve)
+    assert len(maps.endpoint_calls('directions')) == 2
+    assert len({p['co2_kg'] for p in curve[:3]}) == 1
+    assert len({p['co2_kg'] for p in curve[3:]}) == 1
+
+
+def test_sweep_marks_timeouts_without_cancelling(maps):
+    maps.delay = 0.2
+    departures = [tomorrow_at(7, 0) + i * 1800 for i in range(4)]
+
+    curve = app.sweep_departures(ORIGIN, DEST, departures, deadline=0.01, concurrency=2)
+
+    assert [p['status'] for p in curve] == ['timeout'] * 4
+    # Os horários restantes continuam em segundo plano e alimentam o cache
+    deadline = time.monotonic() + 5
+    while len(maps.endpoint_calls('directions')) < 4 or maps.in_flight:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert maps.max_in_flight == 2
+    assert all(app.route_cache.lookup(ORIGIN, DEST, d) is not None for d in departures)
+
+
+def test_sweep_endpoint(maps, by_departure):
+    start = tomorrow_at(7, 0)
+    by_departure.update({start: 2, start + 1800: 0, start + 3600: 3})
+
+    response = app.app.test_client().post('/calculate/sweep', json={
+        'origin': 'Sorocaba, SP', 'destination': 'Av. Paulista, 1000, São Paulo',
+        'start': start, 'end': start + 3600, 'interval_minutes': 30
+    })
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['summary']['points'] == body['summary']['ok'] == 3
+    assert body['best']['rank'] == 1
+    assert body['best']['co2_kg'] == min(p['co2_kg'] for p in body['curve'])
+
+
+@pytest.mark.parametrize('window, error', [
+    ({'interval_minutes': -5}, 'interval_minutes deve ser positivo'),
+    ({'start': 2_000_000_000, 'end': 1_999_999_000}, 'end deve ser posterior a start'),
+    ({'interval_minutes': 1}, 'Máximo de'),
+    ({'start': 'amanhã'}, 'start, end e interval_minutes devem ser números'),
+])
+def test_sweep_window_errors(window, error):
+    with pytest.raises(ValueError, match=error):
+        app.sweep_window(**window)
@@ -0,0 +1,64 @@
+"""
+Rotas com paradas intermediárias: uma rota com várias legs, EcoScore absoluto
+"""
+
+import copy
+
+import pytest
+
+import app
+
+TRIP = {'origin': 'Sorocaba, SP', 'destination': 'Av. Paulista, 1000, São Paulo', 'frequency': 5}
+
+
+@pytest.fixture
+def multi_leg(maps, directions_payloads):
+    """
+    Resposta com paradas: a Directions API devolve uma única rota, uma leg por trecho
+    """
+    route = copy.deepcopy(directions_payloads[0]['routes'][0])
+    route['legs'] = [copy.deepcopy(payload['routes'][0]['legs'][0]) for payload in directions_payloads[:2]]
+    route['waypoint_order'] = [0]
+    maps.directions = lambda params: {'status': 'OK', 'routes': [route]} if 'waypoints' in params \
+        else directions_payloads[0]
+    return route
+
+
+def test_waypoints_give_absolute_score_without_savings(multi_leg, maps):
+    response = app.app.test_client().post('/calculate', json=dict(TRIP, waypoints=['Campinas, SP']))
+
+    assert response.status_code == 200
+    result = response.get_json()
+    (directions,) = maps.endpoint_calls('directions')
+    stop = app.geocode_cache.get('Campinas, SP')
+    assert directions['waypoints'] == f"{stop['lat']},{stop['lng']}"
+
+    assert result['ecoscore']['scale'] == 'absolute'
+    assert result['ecoscore']['eco'] == result['ecoscore']['standard']
+    assert result['ecoscore']['difference'] == 0
+    assert result['emissions']['savings'] == 0
+    assert result['emissions']['total_eco'] == result['emissions']['total_standard']
+    assert result['emissions']['fuel_saved'] == result['emissions']['money_saved'] == 0
+    assert result['distance_eco'] == result['distance_standard']
+    assert result['waypoint_order'] == [0]
+
+
+def test_leg_totals_are_summed(multi_leg):
+    result = app.app.test_client().post('/calculate', json=dict(TRIP, waypoints=['Campinas, SP'])).get_json()
+    legs = result['legs']
+
+    assert len(legs) == 2
+    meters = sum(leg['distance']['value'] for leg in multi_leg['legs'])
+    assert result['distance_standard'] == pytest.approx(meters / 1000, abs=0.01)
+    assert [leg['distance_km'] for leg in legs] == [
+        round(leg['distance']['value'] / 1000, 2) for leg in multi_leg['legs']
+    ]
+    assert result['duration_standard'] == pytest.approx(sum(leg['duration_min'] for leg in legs), abs=1)
+    assert sum(leg['co2_kg'] for leg in legs) > 0
+
+
+def test_route_without_waypoints_compares_alternatives(multi_leg):
+    result = app.app.test_client().post('/calculate', json=TRIP).get_json()
+
+    assert result['ecoscore']['scale'] == 'relative'
+    assert len(result['legs']) == 1
@@ -0,0 +1,86 @@
+"""
+Inicialização do worker: aquecimento dos caches em segundo plano e /healthz
+"""
+
+import threading
+
+import pytest
+
+import app
+from cache import GeocodeCache, RouteCache
+from corridors import CorridorIndex
+
+ORIGIN = {'lat': -23.5015, 'lng': -47.4526}
+DEST = {'lat': -23.5614, 'lng': -46.6559}
+
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch):
+    """
+    Caches em disco com entradas gravadas por "outro processo" e um worker
+    ainda não inicializado; warm_up do geocode só termina com gate.set()
+    """
+    path = str(tmp_path / 'cache.sqlite3')
+    geocode = GeocodeCache(path=path)
+    for address in ('Sorocaba, SP', 'Campinas, SP', 'Santos, SP'):
+        geocode.set(address, dict(ORIGIN, address=address))
+    RouteCache(path=path).set(ORIGIN, DEST, {'status': 'OK', 'routes': []})
+
+    gate = threading.Event()
+    geocode_cache = GeocodeCache(path=path)
+    warm_up = geocode_cache.warm_up
+    monkeypatch.setattr(geocode_cache, 'warm_up', lambda: gate.wait(5) and warm_up())
+
+    monkeypatch.setattr(app, 'geocode_cache', geocode_cache)
+    monkeypatch.setattr(app, 'route_cache', RouteCache(path=path))
+    monkeypatch.setattr(app, 'corridor_index', CorridorIndex(path=path))
+    monkeypatch.setattr(app, '_worker_pid', None)
+    return gate
+
+
+def test_healthz_reports_warm_up(worker):
+    client = app.app.test_client()
+    app.init_worker()
+
+    warming = client.get('/healthz')
+    assert warming.status_code == 503
+    assert warming.get_json()['status'] == 'warming'
+
+    worker.set()
+    assert app._ready.wait(5)
+    ready = client.get('/healthz')
+    assert ready.status_code == 200
+    body = ready.get_json()
+    assert body['status'] == 'ready'
+    assert body['warm_up']['entries'] == {'geocode': 3, 'route': 1, 'corridor_index': 0}
+    assert body['warm_up']['seconds'] >= 0
+    assert 'error' not in body['warm_up']
+
+    # Entradas já em memória: consultas sem ir ao disco
+    assert app.geocode_cache.get('santos, sp')['address'] == 'Santos, SP'
+    assert app.geocode_cache.stats()['memory_hits'] == 1
+
+
+def test_init_worker_runs_once_per_process(worker):
+    worker.set()
+    app.init_worker()
+    assert app._ready.wait(5)
+    stats = app.warm_up_stats
+
+    app.init_worker()
+    assert app._ready.is_set()
+    assert app.warm_up_stats is stats and stats['entries']['geocode'] == 3
+
+
+def test_failed_warm_up_still_becomes_ready(worker, monkeypatch):
+    def broken():
+        raise OSError('disco indisponível')
+
+    monkeypatch.setattr(app.route_cache, 'warm_up', broken)
+    worker.set()
+    app.init_worker()
+    assert app._ready.wait(5)
+
+    body = app.app.test_client().get('/healthz').get_json()
+    assert body['status'] == 'ready'
+    assert body['warm_up']['error'] == 'disco indisponível'